@@ -0,0 +1,126 @@
+# bench/imports.py
+"""
+Q-NEXUS — Import-time budget (cold start)
+
+    python -m bench.imports
+    python -m bench.imports --check
+
+Every module is imported in a fresh interpreter (median of --repeat runs).
+Time is measured on top of its framework floor (e.g. FastAPI for main),
+so budgets stay meaningful across machines.
+--check exits with status 1 when a module goes over its budget or
+eagerly imports a dependency that must stay lazy.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ImportBudget:
+    module: str
+    floor: Tuple[str, ...] = ()     # imported first, not counted
+    budget_ms: float = 50.0
+    lazy: Tuple[str, ...] = ()      # must not be in sys.modules afterwards
+
+
+BUDGETS: List[ImportBudget] = [
+    ImportBudget("main", floor=("fastapi", "pydantic"), budget_ms=120.0,
+                 lazy=("numpy", "core.engine", "requests")),
+    ImportBudget("core.factory", budget_ms=10.0, lazy=("numpy", "core.engine")),
+    ImportBudget("core.stream", budget_ms=10.0, lazy=("numpy", "core.engine")),
+    ImportBudget("models.wire", budget_ms=10.0, lazy=("numpy",)),
+    ImportBudget("data.market_feed", floor=("asyncio",), budget_ms=10.0, lazy=("requests",)),
+]
+
+# يعمل داخل مفسّر جديد: floor ثم الوحدة المقاسة
+_PROBE = """
+import importlib, json, sys, time
+module, floor, lazy = sys.argv[1], sys.argv[2], sys.argv[3]
+for name in filter(None, floor.split(",")):
+    importlib.import_module(name)
+t0 = time.perf_counter()
+importlib.import_module(module)
+ms = (time.perf_counter() - t0) * 1e3
+print(json.dumps({"ms": ms, "eager": [m for m in lazy.split(",") if m and m in sys.modules]}))
+"""
+
+_READY = """
+import json, time
+t0 = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.ENGINES.get()
+print(json.dumps({"import_ms": (imported - t0) * 1e3, "engine_ms": (time.perf_counter() - imported) * 1e3}))
+"""
+
+
+def _python(code: str, *args: str) -> Dict:
+    out = subprocess.run(
+        [sys.executable, "-c", code, *args],
+        check=True,
+        capture_output=True,
+        text=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure(budget: ImportBudget, repeat: int = 5) -> Dict:
+    runs = [
+        _python(_PROBE, budget.module, ",".join(budget.floor), ",".join(budget.lazy))
+        for _ in range(repeat)
+    ]
+    ms = statistics.median(r["ms"] for r in runs)
+    eager = sorted({m for r in runs for m in r["eager"]})
+    return {
+        "module": budget.module,
+        "floor": list(budget.floor),
+        "ms": ms,
+        "budget_ms": budget.budget_ms,
+        "eager": eager,
+        "ok": ms <= budget.budget_ms and not eager,
+    }
+
+
+def measure_ready(repeat: int = 5) -> Dict:
+    """
+    API process: import main, then the first (cold) engine build
+    """
+    runs = [_python(_READY) for _ in range(repeat)]
+    return {key: statistics.median(r[key] for r in runs) for key in ("import_ms", "engine_ms")}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Q-NEXUS import-time budget")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--modules", help="comma-separated subset")
+    ap.add_argument("--check", action="store_true", help="exit 1 on any budget violation")
+    args = ap.parse_args(argv)
+
+    wanted = set(args.modules.split(",")) if args.modules else None
+    rows = [measure(b, args.repeat) for b in BUDGETS if wanted is None or b.module in wanted]
+
+    status = 0
+    for row in rows:
+        flag = "ok" if row["ok"] else "OVER BUDGET"
+        if row["eager"]:
+            flag = f"EAGER {','.join(row['eager'])}"
+        print(f"{row['module']:<18} {row['ms']:8.1f} ms / {row['budget_ms']:.0f} ms  {flag}", file=sys.stderr)
+        if not row["ok"]:
+            status = 1
+
+    report = {"python": sys.version.split()[0], "imports": rows}
+    if wanted is None or "main" in wanted:
+        report["ready"] = measure_ready(args.repeat)
+
+    print(json.dumps(report, indent=2))
+    return status if args.check else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
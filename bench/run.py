@@ -0,0 +1,243 @@
+# bench/run.py
+"""
+Q-NEXUS — Hot-path benchmark suite
+
+    python -m bench.run --out baseline.json
+    python -m bench.run --compare baseline.json --tolerance 0.10
+
+Targets: compute, decide, backtest, gate, paper_step, api
+Results (throughput + latency percentiles per target/window size) are
+written as JSON. --compare exits with status 1 on any p50 regression
+beyond the tolerance.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from bench.synthetic import random_decisions, random_walk
+from core.backtest import BacktestEngine
+from core.engine import DecisionEngine, MarketStateEngine
+from core.evaluator import LearningGate
+from core.paper_trader import PaperTrader
+
+SIZES = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+TARGETS = ["compute", "decide", "backtest", "gate", "paper_step", "api"]
+API_MAX_SIZE = 100_000     # JSON لمليون شمعة ≈ 20MB لكل طلب
+
+
+# =========================
+# TIMING
+# =========================
+def measure(
+    fn: Callable,
+    setup: Optional[Callable] = None,
+    min_time: float = 0.5,
+    min_iters: int = 3,
+    max_iters: int = 10_000
+) -> Dict:
+    """
+    Calls fn(*setup()) until min_time and min_iters are reached.
+    Only the fn call is timed.
+    """
+    fn(*(setup() if setup else ()))      # warm-up
+
+    samples: List[float] = []
+    clock = time.perf_counter
+    deadline = clock() + min_time
+
+    while len(samples) < max_iters and (len(samples) < min_iters or clock() < deadline):
+        args = setup() if setup else ()
+        t0 = clock()
+        fn(*args)
+        samples.append(clock() - t0)
+
+    s = np.asarray(samples)
+    return {
+        "iterations": len(s),
+        "mean_s": float(s.mean()),
+        "p50_s": float(np.percentile(s, 50)),
+        "p90_s": float(np.percentile(s, 90)),
+        "p99_s": float(np.percentile(s, 99)),
+        "ops_per_s": float(len(s) / s.sum()),
+    }
+
+
+def warmed_engine() -> DecisionEngine:
+    """
+    Engine with non-zero bandit weights (a fresh engine always HOLDs)
+    """
+    engine = DecisionEngine()
+    for st in engine.strategies:
+        engine.weighter.update(st.name, 0.1)
+    return engine
+
+
+# =========================
+# CASES
+# =========================
+def case(target: str, size: int, seed: int):
+    """
+    Returns (fn, setup) for one target/window size, or None to skip
+    """
+    p, v = random_walk(size, seed=seed)
+    prices, volumes = p.tolist(), v.tolist()
+
+    if target == "compute":
+        if size < 10:
+            return None
+        return (lambda: MarketStateEngine.compute(prices, volumes)), None
+
+    if target == "decide":
+        if size < 10:
+            return None
+        engine = warmed_engine()
+        return (lambda: engine.decide(prices, volumes)), None
+
+    if target == "backtest":
+        bt = BacktestEngine()
+        decisions = random_decisions(size, seed=seed)
+        return (lambda: bt.run(prices, decisions)), None
+
+    if target == "gate":
+        decisions = random_decisions(size, seed=seed)
+        old = decisions[:-1]
+        gate = LearningGate()
+        # approve كامل (البادئة المشتركة مرة واحدة)؛ حالة البوابة الجارية في
+        # PaperTrader (قرار واحد لكل شمعة) تُقاس ضمن paper_step
+        return (lambda: gate.approve(prices, old, decisions)), None
+
+    if target == "paper_step":
+        if size < 10:
+            return None
+        trader = PaperTrader(warmed_engine(), symbol="BENCH", market="bench")
+        return (lambda: trader.step(prices, volumes)), None
+
+    if target == "api":
+        if size < 10 or size > API_MAX_SIZE:
+            return None
+        try:
+            from fastapi.testclient import TestClient
+        except (ImportError, RuntimeError):     # httpx غير مثبت
+            return None
+
+        import main
+        from db.memory import create_user
+
+        client = TestClient(main.app)
+        headers = {"authorization": create_user("bench@qnexus", "enterprise")}
+        body = {"prices": prices, "volumes": volumes}
+
+        def call():
+            r = client.post("/api/decide", json=body, headers=headers)
+            r.raise_for_status()
+
+        return call, None
+
+    raise ValueError(f"Unknown target: {target}")
+
+
+def run(targets: List[str], sizes: List[int], seed: int, min_time: float) -> Dict:
+    results = []
+    for target in targets:
+        for size in sizes:
+            built = case(target, size, seed)
+            if built is None:
+                continue
+            fn, setup = built
+            stats = measure(fn, setup, min_time=min_time)
+            results.append({"target": target, "size": size, **stats})
+            print(
+                f"{target:<11} n={size:<9} p50={stats['p50_s'] * 1e3:10.4f}ms "
+                f"p99={stats['p99_s'] * 1e3:10.4f}ms ops/s={stats['ops_per_s']:12.1f}",
+                file=sys.stderr
+            )
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "seed": seed,
+            "min_time": min_time,
+            "timestamp": int(time.time()),
+        },
+        "results": results,
+    }
+
+
+# =========================
+# COMPARE
+# =========================
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """
+    p50 ratio current/baseline per (target, size); regression when the
+    ratio exceeds 1 + tolerance
+    """
+    base = {(r["target"], r["size"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        b = base.get((r["target"], r["size"]))
+        if b is None:
+            continue
+        ratio = r["p50_s"] / b["p50_s"] if b["p50_s"] else float("inf")
+        rows.append({
+            "target": r["target"],
+            "size": r["size"],
+            "baseline_p50_s": b["p50_s"],
+            "p50_s": r["p50_s"],
+            "ratio": ratio,
+            "regression": ratio > 1.0 + tolerance,
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Q-NEXUS hot-path benchmarks")
+    ap.add_argument("--targets", default=",".join(TARGETS))
+    ap.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--min-time", type=float, default=0.5, help="seconds per case")
+    ap.add_argument("--out", help="write results JSON here (default: stdout)")
+    ap.add_argument("--compare", help="baseline results JSON")
+    ap.add_argument("--tolerance", type=float, default=0.10)
+    args = ap.parse_args(argv)
+
+    report = run(
+        targets=[t for t in args.targets.split(",") if t],
+        sizes=[int(s) for s in args.sizes.split(",") if s],
+        seed=args.seed,
+        min_time=args.min_time,
+    )
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report["comparison"] = compare(report, baseline, args.tolerance)
+        for row in report["comparison"]:
+            flag = "REGRESSION" if row["regression"] else "ok"
+            print(
+                f"{row['target']:<11} n={row['size']:<9} x{row['ratio']:.3f} {flag}",
+                file=sys.stderr
+            )
+            if row["regression"]:
+                status = 1
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
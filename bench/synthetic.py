@@ -0,0 +1,24 @@
+# bench/synthetic.py
+"""
+Seeded synthetic market data for benchmarks
+(same random-walk shape as core/engine.py's __main__ example)
+"""
+
+from typing import List, Tuple
+import numpy as np
+
+
+def random_walk(n: int, seed: int = 7, start: float = 100.0, step: float = 0.5) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    n bars of prices (Gaussian random walk) and integer-valued volumes
+    """
+    rng = np.random.default_rng(seed)
+    prices = np.cumsum(rng.normal(0, step, n)) + start
+    prices = np.maximum(prices, 1.0)     # يمنع الأسعار السالبة في السلاسل الطويلة
+    volumes = rng.integers(100, 1000, n).astype(float)
+    return prices, volumes
+
+
+def random_decisions(n: int, seed: int = 7) -> List[str]:
+    rng = np.random.default_rng(seed + 1)
+    return rng.choice(["BUY", "SELL", "HOLD"], n, p=[0.2, 0.2, 0.6]).tolist()
@@ -0,0 +1 @@
+# conftest.py — repo root on sys.path for tests/ (core, db, models, data)
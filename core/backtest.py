@@ -1,6 +1,50 @@
 # core/backtest.py
-from typing import List, Dict
+from dataclasses import dataclass, field, replace
+from typing import List, Dict, Optional, Sequence
 import math
+import numpy as np
+
+# int8 decision codes (vectorized engine)
+BUY, HOLD, SELL = 1, 0, -1
+_CODES = {"BUY": BUY, "SELL": SELL}
+
+def encode_decisions(decisions) -> np.ndarray:
+    """
+    "BUY"/"SELL"/"HOLD" -> int8 codes (1 / -1 / 0)
+    """
+    if isinstance(decisions, np.ndarray) and decisions.dtype.kind in "iu":
+        return decisions.astype(np.int8, copy=False)
+    return np.fromiter(
+        (_CODES.get(d, HOLD) for d in decisions),
+        dtype=np.int8,
+        count=len(decisions)
+    )
+
+def threshold_signals(scores, thresholds: Sequence[float]) -> np.ndarray:
+    """
+    Ensemble scores -> (len(thresholds), T) int8 decision matrix,
+    one row per threshold (same rule as DecisionEngine.decide)
+    """
+    s = np.asarray(scores, dtype=float)[None, :]
+    t = np.asarray(thresholds, dtype=float)[:, None]
+    return (s > t).astype(np.int8) - (s < -t).astype(np.int8)
+
+@dataclass
+class BacktestState:
+    """
+    Resumable run() state (see BacktestEngine.advance)
+    """
+    capital: float
+    peak: float
+    drawdown: float = 0.0
+    position: Optional[str] = None
+    entry_price: float = 0.0
+    returns: List[float] = field(default_factory=list)
+    wins: int = 0
+    trades: int = 0
+
+    def copy(self) -> "BacktestState":
+        return replace(self, returns=list(self.returns))
 
 class BacktestEngine:
     def __init__(self, initial_capital: float = 10_000):
@@ -11,16 +55,32 @@ class BacktestEngine:
         prices: List[float],
         decisions: List[str]
     ) -> Dict:
+        return self.metrics(self.advance(self.start(), prices, decisions))
+
+    def start(self) -> BacktestState:
+        return BacktestState(
+            capital=self.initial_capital,
+            peak=self.initial_capital
+        )
 
-        capital = self.initial_capital
-        peak = capital
-        drawdown = 0.0
+    def advance(
+        self,
+        state: BacktestState,
+        prices: List[float],
+        decisions: List[str]
+    ) -> BacktestState:
+        """
+        Continues a run from state (mutated in place and returned)
+        """
+        capital = state.capital
+        peak = state.peak
+        drawdown = state.drawdown
 
-        position = None
-        entry_price = 0.0
-        returns = []
-        wins = 0
-        trades = 0
+        position = state.position
+        entry_price = state.entry_price
+        returns = state.returns
+        wins = state.wins
+        trades = state.trades
 
         for price, decision in zip(prices, decisions):
 
@@ -39,15 +99,27 @@ class BacktestEngine:
                 peak = max(peak, capital)
                 drawdown = max(drawdown, (peak - capital))
 
-        sharpe = self._sharpe_ratio(returns)
+        state.capital = capital
+        state.peak = peak
+        state.drawdown = drawdown
+        state.position = position
+        state.entry_price = entry_price
+        state.wins = wins
+        state.trades = trades
+        return state
+
+    def metrics(self, state: BacktestState) -> Dict:
+        sharpe = self._sharpe_ratio(state.returns)
+        capital = state.capital
+        trades = state.trades
 
         return {
             "initial_capital": self.initial_capital,
             "final_capital": capital,
             "net_profit": capital - self.initial_capital,
             "trades": trades,
-            "win_rate": wins / trades if trades else 0.0,
-            "max_drawdown": drawdown,
+            "win_rate": state.wins / trades if trades else 0.0,
+            "max_drawdown": state.drawdown,
             "sharpe_ratio": sharpe
         }
 
@@ -58,3 +130,95 @@ class BacktestEngine:
         avg = sum(returns) / len(returns)
         std = math.sqrt(sum((r - avg) ** 2 for r in returns) / len(returns))
         return avg / std if std != 0 else 0.0
+
+    # =========================
+    # VECTORIZED
+    # =========================
+    def run_vectorized(self, prices, decisions) -> Dict:
+        """
+        Same metrics as run(), computed with array operations.
+        decisions: strings or int8 codes
+        """
+        out = self.run_many(prices, encode_decisions(decisions)[None, :])
+        return {
+            "initial_capital": self.initial_capital,
+            "final_capital": float(out["final_capital"][0]),
+            "net_profit": float(out["net_profit"][0]),
+            "trades": int(out["trades"][0]),
+            "win_rate": float(out["win_rate"][0]),
+            "max_drawdown": float(out["max_drawdown"][0]),
+            "sharpe_ratio": float(out["sharpe_ratio"][0])
+        }
+
+    def run_many(self, prices, signals, max_cells: int = 1 << 22) -> Dict:
+        """
+        Backtests M decision sequences against one price series.
+        signals: (M, T) int8 matrix (see encode_decisions / threshold_signals)
+        Returns the run() metrics as arrays of shape (M,)
+        """
+        p = np.asarray(prices, dtype=float)
+        sig = np.atleast_2d(np.asarray(signals, dtype=np.int8))
+        T = min(len(p), sig.shape[1])
+        p = p[:T]
+        sig = sig[:, :T]
+        M = sig.shape[0]
+
+        out = {
+            "final_capital": np.full(M, float(self.initial_capital)),
+            "trades": np.zeros(M, dtype=np.int64),
+            "win_rate": np.zeros(M),
+            "max_drawdown": np.zeros(M),
+            "sharpe_ratio": np.zeros(M),
+        }
+
+        if T:
+            step = max(1, max_cells // T)
+            for lo in range(0, M, step):
+                hi = min(lo + step, M)
+                self._run_block(p, sig[lo:hi], out, lo, hi)
+
+        out["initial_capital"] = self.initial_capital
+        out["net_profit"] = out["final_capital"] - self.initial_capital
+        return out
+
+    def _run_block(self, p: np.ndarray, sig: np.ndarray, out: Dict, lo: int, hi: int):
+        M, T = sig.shape
+        steps = np.arange(T)
+
+        # Position = last non-HOLD signal was BUY
+        last = np.maximum.accumulate(np.where(sig != 0, steps, -1), axis=1)
+        last_sig = np.take_along_axis(sig, np.maximum(last, 0), axis=1)
+        long = (last >= 0) & (last_sig > 0)
+
+        prev = np.zeros_like(long)
+        prev[:, 1:] = long[:, :-1]
+        entries = long & ~prev
+        exits = ~long & prev
+
+        entry_at = np.maximum.accumulate(np.where(entries, steps, 0), axis=1)
+        pnl = np.where(exits, p - p[entry_at], 0.0)
+
+        # Sequential capital curve (same summation order as run())
+        curve = np.empty((M, T + 1))
+        curve[:, 0] = self.initial_capital
+        curve[:, 1:] = pnl
+        capital = np.cumsum(curve, axis=1)
+        peak = np.maximum.accumulate(capital, axis=1)
+
+        trades = entries.sum(axis=1)
+        closed = exits.sum(axis=1)
+        wins = (exits & (pnl > 0)).sum(axis=1)
+
+        n = np.maximum(closed, 1)
+        mean = pnl.sum(axis=1) / n
+        var = np.where(exits, (pnl - mean[:, None]) ** 2, 0.0).sum(axis=1) / n
+        std = np.sqrt(var)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = np.where((closed >= 2) & (std != 0), mean / std, 0.0)
+            win_rate = np.where(trades > 0, wins / np.maximum(trades, 1), 0.0)
+
+        out["final_capital"][lo:hi] = capital[:, -1]
+        out["trades"][lo:hi] = trades
+        out["win_rate"][lo:hi] = win_rate
+        out["max_drawdown"][lo:hi] = (peak - capital).max(axis=1)
+        out["sharpe_ratio"][lo:hi] = sharpe
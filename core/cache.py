@@ -0,0 +1,115 @@
+# core/cache.py
+"""
+Q-NEXUS — Decision Cache
+- LRU + TTL, size-bounded
+- Keys: blake2b over the raw float64 input buffers + bandit weights version
+  (any BanditWeighter.update invalidates every cached decision)
+- Values are plain Python (already-encoded responses): a hit never touches NumPy
+"""
+
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+import hashlib
+import struct
+import threading
+import time
+
+from core.metrics import METRICS
+
+DECISION_CACHE_SIZE = 4096
+DECISION_CACHE_TTL = 30.0       # seconds
+
+_N_LOOKUPS = {
+    result: METRICS.counter("qnexus_decision_cache_total", "DecisionCache lookups", result=result)
+    for result in ("hit", "miss")
+}
+_N_EVICTIONS = METRICS.counter("qnexus_decision_cache_evictions_total", "DecisionCache LRU evictions")
+
+# series length | weights version
+_KEY_PREFIX = struct.Struct("<QQ")
+
+
+def pack_series(values: Sequence[float]) -> bytes:
+    """
+    Python floats → little-endian float64 bytes (same layout as the
+    application/octet-stream body, so JSON and binary requests share keys)
+    """
+    return struct.pack(f"<{len(values)}d", *values)
+
+
+def decision_key(prices: bytes, volumes: bytes, version: int) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(_KEY_PREFIX.pack(memoryview(prices).nbytes, version))
+    h.update(prices)
+    h.update(volumes)
+    return h.digest()
+
+
+class DecisionCache:
+    """
+    capacity=0 disables caching (get always misses, put is a no-op)
+    """
+
+    def __init__(self, capacity: int = DECISION_CACHE_SIZE, ttl: float = DECISION_CACHE_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes) -> Optional[object]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    if METRICS.enabled:
+                        _N_LOOKUPS["hit"].inc()
+                    return value
+                del self._entries[key]
+
+            self.misses += 1
+        if METRICS.enabled:
+            _N_LOOKUPS["miss"].inc()
+        return None
+
+    def put(self, key: bytes, value: object):
+        if self.capacity <= 0:
+            return
+
+        expires = time.monotonic() + self.ttl
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+
+        if evicted and METRICS.enabled:
+            _N_EVICTIONS.inc(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
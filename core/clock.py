@@ -0,0 +1,141 @@
+# core/clock.py
+"""
+Q-NEXUS — Injectable Clocks
+- WallClock: real time (live trading)
+- ReplayClock: discrete-event time; jumps straight to the next
+  scheduled wake-up once every participant is waiting
+Used by the paper runtime, KillSwitch, DecisionEngine and log_trade.
+"""
+
+from datetime import datetime, timezone
+from typing import Awaitable, List, Optional, Tuple
+import asyncio
+import heapq
+import time
+
+
+class Clock:
+    """
+    time(): epoch seconds
+    sleep_until(deadline, stop): waits until time() >= deadline
+    or until `stop` is set
+    """
+
+    def time(self) -> float:
+        raise NotImplementedError
+
+    def utcnow(self) -> datetime:
+        return datetime.fromtimestamp(self.time(), tz=timezone.utc).replace(tzinfo=None)
+
+    def join(self):
+        pass
+
+    def leave(self):
+        pass
+
+    def participate(self, coro: Awaitable) -> Awaitable:
+        """
+        Registers a sleeper now (before any task runs) and unregisters
+        it when `coro` finishes
+        """
+        self.join()
+
+        async def run():
+            try:
+                return await coro
+            finally:
+                self.leave()
+
+        return run()
+
+    async def sleep_until(self, deadline: float, stop: Optional[asyncio.Event] = None):
+        raise NotImplementedError
+
+
+class WallClock(Clock):
+    def time(self) -> float:
+        return time.time()
+
+    async def sleep_until(self, deadline: float, stop: Optional[asyncio.Event] = None):
+        timeout = deadline - time.time()
+        if timeout <= 0:
+            return
+        if stop is None:
+            await asyncio.sleep(timeout)
+            return
+        try:
+            await asyncio.wait_for(stop.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class ReplayClock(Clock):
+    """
+    Event-driven simulated time.
+    Tasks that sleep on the clock are wrapped in participate() (or call
+    join()/leave() themselves) before any of them starts;
+    when all of them are asleep, time advances to the earliest deadline
+    and that sleeper (ties: first come, first served) is woken.
+    Single event loop only.
+    """
+
+    def __init__(self, start: float):
+        self._now = float(start)
+        # heap (deadline, seq, future); stopped waiters are skipped lazily
+        self._waiters: List[Tuple[float, int, asyncio.Future]] = []
+        self._pending = 0       # waiters still asleep
+        self._participants = 0
+        self._seq = 0
+
+    def time(self) -> float:
+        return self._now
+
+    def advance_to(self, t: float):
+        """
+        Manual stepping (no sleepers involved)
+        """
+        self._now = max(self._now, float(t))
+
+    def join(self):
+        self._participants += 1
+
+    def leave(self):
+        self._participants -= 1
+        self._release()
+
+    def _release(self):
+        while self._waiters and self._pending >= self._participants:
+            deadline, _, fut = heapq.heappop(self._waiters)
+            if fut.done():
+                continue        # waiter stopped early
+            self._now = max(self._now, deadline)
+            self._pending -= 1
+            fut.set_result(None)
+            return
+
+    async def sleep_until(self, deadline: float, stop: Optional[asyncio.Event] = None):
+        if stop is not None and stop.is_set():
+            return
+
+        fut = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._waiters, (deadline, self._seq, fut))
+        self._pending += 1
+        self._release()
+
+        stopper = None if stop is None else asyncio.ensure_future(stop.wait())
+        try:
+            if stopper is None:
+                await fut
+            else:
+                await asyncio.wait((fut, stopper), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if stopper is not None:
+                stopper.cancel()
+            if not fut.done():
+                fut.cancel()
+            if fut.cancelled():
+                self._pending -= 1      # stopped (or task cancelled) before its wake-up
+
+
+WALL_CLOCK = WallClock()
@@ -7,14 +7,19 @@ Q-NEXUS OMEGA — Decision Intelligence Core
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from collections import deque
+from typing import Dict, List, Optional, Tuple
 import numpy as np
-import time
 import math
+import warnings
 from core.evaluator import LearningGate
 import copy
-from core.regime import RegimeDetector
+from core.regime import RegimeDetector, regime_names
+from core.metrics import METRICS, Stopwatch
+from core.learning_history import LearningHistory
+from core.clock import Clock, WALL_CLOCK
 EPS = 1e-9
+DECISION_THRESHOLD = 0.15
 
 # =========================
 # MARKET STATE
@@ -27,14 +32,48 @@ class MarketState:
     volume_pressure: float
     trend_strength: float
 
+@dataclass
+class MarketStateBatch:
+    """
+    Structure-of-arrays MarketState (one entry per symbol)
+    """
+    momentum: np.ndarray
+    volatility: np.ndarray
+    entropy: np.ndarray
+    volume_pressure: np.ndarray
+    trend_strength: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.momentum)
+
+    def row(self, i: int) -> MarketState:
+        return MarketState(
+            momentum=float(self.momentum[i]),
+            volatility=float(self.volatility[i]),
+            entropy=float(self.entropy[i]),
+            volume_pressure=float(self.volume_pressure[i]),
+            trend_strength=float(self.trend_strength[i]),
+        )
+
+    @staticmethod
+    def from_states(states: List[MarketState]) -> MarketStateBatch:
+        return MarketStateBatch(
+            momentum=np.array([s.momentum for s in states], dtype=float),
+            volatility=np.array([s.volatility for s in states], dtype=float),
+            entropy=np.array([s.entropy for s in states], dtype=float),
+            volume_pressure=np.array([s.volume_pressure for s in states], dtype=float),
+            trend_strength=np.array([s.trend_strength for s in states], dtype=float),
+        )
+
 class MarketStateEngine:
     @staticmethod
     def compute(prices: List[float], volumes: List[float]) -> MarketState:
         if len(prices) < 10 or len(volumes) != len(prices):
             raise ValueError("Invalid market data")
 
-        p = np.array(prices, dtype=float)
-        v = np.array(volumes, dtype=float)
+        # asarray: float64 buffers (e.g. np.frombuffer) are used without a copy
+        p = np.asarray(prices, dtype=float)
+        v = np.asarray(volumes, dtype=float)
 
         rets = np.diff(p) / (p[:-1] + EPS)
         momentum = (p[-1] - p[0]) / (p[0] + EPS)
@@ -57,34 +96,286 @@ class MarketStateEngine:
             trend_strength=trend_strength,
         )
 
+    @staticmethod
+    def compute_batch(prices, volumes) -> MarketStateBatch:
+        """
+        Same features as compute(), one row per symbol.
+        prices/volumes: (N, T) arrays of equal-length series
+        """
+        p = np.asarray(prices, dtype=float)
+        v = np.asarray(volumes, dtype=float)
+
+        if p.ndim != 2 or p.shape != v.shape or p.shape[1] < 10:
+            raise ValueError("Invalid market data")
+
+        rets = np.diff(p, axis=1) / (p[:, :-1] + EPS)
+        momentum = (p[:, -1] - p[:, 0]) / (p[:, 0] + EPS)
+        volatility = np.std(rets, axis=1)
+
+        probs = np.abs(rets)
+        probs = probs / (np.sum(probs, axis=1, keepdims=True) + EPS)
+        entropy = -np.sum(probs * np.log(probs + EPS), axis=1)
+
+        vol_norm = (v - v.mean(axis=1, keepdims=True)) / (v.std(axis=1, keepdims=True) + EPS)
+        volume_pressure = np.tanh(vol_norm[:, -5:].mean(axis=1))
+
+        trend_strength = np.abs(momentum) / (volatility + EPS)
+
+        return MarketStateBatch(
+            momentum=momentum,
+            volatility=volatility,
+            entropy=entropy,
+            volume_pressure=volume_pressure,
+            trend_strength=trend_strength,
+        )
+
+
+def label_regimes(prices, volumes, window: int = 50, chunk: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Regime of every trailing `window` of a history (training / backtests).
+    Entry i describes bars [i, i + window) → T - window + 1 rows.
+    Returns (regime codes, confidences) as RegimeDetector.detect_batch.
+    """
+    p = np.asarray(prices, dtype=float)
+    v = np.asarray(volumes, dtype=float)
+    if p.ndim != 1 or p.shape != v.shape or len(p) < window:
+        raise ValueError("Invalid market data")
+
+    p_win = np.lib.stride_tricks.sliding_window_view(p, window)
+    v_win = np.lib.stride_tricks.sliding_window_view(v, window)
+
+    codes = np.empty(len(p_win), dtype=np.int8)
+    confidence = np.empty(len(p_win))
+    # على دفعات: (chunk × window) بدل نسخ كل النوافذ دفعة واحدة
+    for start in range(0, len(p_win), chunk):
+        s = MarketStateEngine.compute_batch(p_win[start:start + chunk], v_win[start:start + chunk])
+        codes[start:start + chunk], confidence[start:start + chunk] = RegimeDetector.detect_batch(
+            momentum=s.momentum,
+            volatility=s.volatility,
+            entropy=s.entropy
+        )
+    return codes, confidence
+
+class RollingMarketState:
+    """
+    Streaming MarketStateEngine: O(1) update per new bar.
+    - Ring buffers for prices / volumes / returns
+    - Running sums for return std, entropy and volume z-score
+    - Periodic exact resync to bound float drift
+    Matches compute() on the same window within ~1e-6 (entropy ignores
+    the EPS inside the log).
+    """
+
+    def __init__(self, window: int = 50):
+        if window < 10:
+            raise ValueError("Window must be >= 10")
+
+        self.window = window
+        self.prices: deque = deque(maxlen=window)
+        self.volumes: deque = deque(maxlen=window)
+        self._rets: deque = deque(maxlen=window - 1)
+        self._alog: deque = deque(maxlen=window - 1)
+
+        self._pushes = 0
+        self._resync()
+
+    @property
+    def ready(self) -> bool:
+        return len(self.prices) >= 10
+
+    def _resync(self):
+        self._v_ref = self.volumes[0] if self.volumes else 0.0
+        self._sum_r = math.fsum(self._rets)
+        self._sumsq_r = math.fsum(r * r for r in self._rets)
+        self._sum_a = math.fsum(abs(r) for r in self._rets)
+        self._sum_alog = math.fsum(self._alog)
+        self._sum_v = math.fsum(v - self._v_ref for v in self.volumes)
+        self._sumsq_v = math.fsum((v - self._v_ref) ** 2 for v in self.volumes)
+
+    def push(self, price: float, volume: float) -> Optional[MarketState]:
+        """
+        Adds one bar; returns the MarketState of the current window
+        (None until 10 bars are buffered)
+        """
+        price = float(price)
+        volume = float(volume)
+
+        if self.prices:
+            last = self.prices[-1]
+            r = (price - last) / (last + EPS)
+            a = abs(r)
+            alog = a * math.log(a) if a > 0 else 0.0
+
+            if len(self._rets) == self._rets.maxlen:
+                old = self._rets[0]
+                self._sum_r -= old
+                self._sumsq_r -= old * old
+                self._sum_a -= abs(old)
+                self._sum_alog -= self._alog[0]
+
+            self._rets.append(r)
+            self._alog.append(alog)
+            self._sum_r += r
+            self._sumsq_r += r * r
+            self._sum_a += a
+            self._sum_alog += alog
+
+        if len(self.volumes) == self.volumes.maxlen:
+            old = self.volumes[0] - self._v_ref
+            self._sum_v -= old
+            self._sumsq_v -= old * old
+
+        self.prices.append(price)
+        self.volumes.append(volume)
+        dv = volume - self._v_ref
+        self._sum_v += dv
+        self._sumsq_v += dv * dv
+
+        self._pushes += 1
+        if self._pushes % self.window == 0:
+            self._resync()
+
+        return self.state() if self.ready else None
+
+    def state(self) -> MarketState:
+        if not self.ready:
+            raise ValueError("Invalid market data")
+
+        n = len(self.prices)
+        m = n - 1
+        first = self.prices[0]
+
+        momentum = (self.prices[-1] - first) / (first + EPS)
+
+        mean_r = self._sum_r / m
+        volatility = math.sqrt(max(self._sumsq_r / m - mean_r * mean_r, 0.0))
+
+        total = self._sum_a + EPS
+        if self._sum_a > 0:
+            entropy = (self._sum_a * math.log(total) - self._sum_alog) / total
+        else:
+            entropy = 0.0
+
+        mean_v = self._sum_v / n
+        std_v = math.sqrt(max(self._sumsq_v / n - mean_v * mean_v, 0.0))
+        tail = sum(self.volumes[-i] for i in range(1, 6)) / 5 - self._v_ref
+        volume_pressure = math.tanh((tail - mean_v) / (std_v + EPS))
+
+        trend_strength = abs(momentum) / (volatility + EPS)
+
+        return MarketState(
+            momentum=momentum,
+            volatility=volatility,
+            entropy=entropy,
+            volume_pressure=volume_pressure,
+            trend_strength=trend_strength,
+        )
+
 # =========================
 # STRATEGIES
 # =========================
+STRATEGY_ENTRY_POINT = "qnexus.strategies"
+
 class Strategy:
+    """
+    Strategy protocol
+    - name: unique key (bandit weights, explain)
+    - signal_batch(MarketStateBatch) -> signal vector, one value per symbol
+    - signal(MarketState) -> float (scalar fast path)
+    Implement at least one; the other falls back to it.
+    Third-party strategies register a Strategy subclass (or factory)
+    under the "qnexus.strategies" entry-point group.
+    """
     name: str
+
     def signal(self, s: MarketState) -> float:
-        raise NotImplementedError
+        if type(self).signal_batch is Strategy.signal_batch:
+            raise NotImplementedError
+        return float(self.signal_batch(MarketStateBatch.from_states([s]))[0])
+
+    def signal_batch(self, s: MarketStateBatch) -> np.ndarray:
+        if type(self).signal is Strategy.signal:
+            raise NotImplementedError
+        return np.array([self.signal(s.row(i)) for i in range(len(s))], dtype=float)
 
 class TrendFollowing(Strategy):
     name = "trend"
     def signal(self, s: MarketState) -> float:
         return np.tanh(2.0 * s.momentum) * np.clip(s.trend_strength, 0, 2)
 
+    def signal_batch(self, s: MarketStateBatch) -> np.ndarray:
+        return np.tanh(2.0 * s.momentum) * np.clip(s.trend_strength, 0, 2)
+
 class MeanReversion(Strategy):
     name = "mean_reversion"
     def signal(self, s: MarketState) -> float:
         return -np.tanh(3.0 * s.momentum) * (1.0 / (1.0 + s.volatility))
 
+    def signal_batch(self, s: MarketStateBatch) -> np.ndarray:
+        return -np.tanh(3.0 * s.momentum) * (1.0 / (1.0 + s.volatility))
+
 class VolatilityBreakout(Strategy):
     name = "volatility"
     def signal(self, s: MarketState) -> float:
         return np.tanh(s.volatility * 5.0) * np.sign(s.momentum)
 
+    def signal_batch(self, s: MarketStateBatch) -> np.ndarray:
+        return np.tanh(s.volatility * 5.0) * np.sign(s.momentum)
+
 class Defensive(Strategy):
     name = "defensive"
     def signal(self, s: MarketState) -> float:
         return -np.tanh(s.entropy) * (1.0 if s.volatility > 0.02 else 0.2)
 
+    def signal_batch(self, s: MarketStateBatch) -> np.ndarray:
+        return -np.tanh(s.entropy) * np.where(s.volatility > 0.02, 1.0, 0.2)
+
+BUILTIN_STRATEGIES = (TrendFollowing, MeanReversion, VolatilityBreakout, Defensive)
+
+_PLUGINS: Dict[str, List] = {}     # group → loaded factories
+
+def discover_strategies(group: str = STRATEGY_ENTRY_POINT) -> List[Strategy]:
+    """
+    Instantiates strategies registered under the entry-point group.
+    Entry points are resolved once per group and process; broken
+    plugins are skipped with a warning.
+    """
+    factories = _PLUGINS.get(group)
+    if factories is None:
+        from importlib.metadata import entry_points
+
+        eps = entry_points()
+        found = eps.select(group=group) if hasattr(eps, "select") else eps.get(group, ())
+
+        factories = []
+        for ep in found:
+            try:
+                factories.append(ep.load())
+            except Exception as e:
+                warnings.warn(f"Skipping strategy plugin {ep.name!r}: {e}")
+        _PLUGINS[group] = factories
+
+    return [factory() for factory in factories]
+
+def ensemble(
+    strategies: List[Strategy],
+    weights: Dict[str, float],
+    s: MarketStateBatch
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (strategies × symbols) weight-signal product.
+    Returns (aggregate score per symbol, contribution matrix).
+    The sum runs over strategies in order, so each column equals
+    the scalar decide() accumulation exactly.
+    """
+    signals = np.empty((len(strategies), len(s)))
+    for i, st in enumerate(strategies):
+        signals[i] = st.signal_batch(s)
+
+    w = np.array([weights.get(st.name, 0.0) for st in strategies], dtype=float)
+    contrib = w[:, None] * signals
+    return contrib.sum(axis=0), contrib
+
 # =========================
 # SELF-LEARNING (SAFE)
 # =========================
@@ -106,22 +397,50 @@ class BanditWeighter:
             s.name: StrategyStats(weight=1.0) for s in strategies
         }
         self.t = 0
+        self.version = 0        # يزيد مع كل تحديث (مفاتيح DecisionCache)
 
-    def score(self, name: str) -> float:
-        st = self.stats[name]
-        ucb = math.sqrt(2 * math.log(self.t + 1) / (st.plays + 1))
+    @staticmethod
+    def _score(st: StrategyStats, t: int) -> float:
+        ucb = math.sqrt(2 * math.log(t + 1) / (st.plays + 1))
         return st.ewma_return + 0.1 * ucb
 
-    def normalized_weights(self) -> Dict[str, float]:
-        scores = {k: max(self.score(k), 0.0) for k in self.stats}
+    @staticmethod
+    def _normalize(stats: Dict[str, StrategyStats], t: int) -> Dict[str, float]:
+        scores = {k: max(BanditWeighter._score(st, t), 0.0) for k, st in stats.items()}
         s = sum(scores.values()) + EPS
         return {k: v / s for k, v in scores.items()}
 
+    def score(self, name: str) -> float:
+        return self._score(self.stats[name], self.t)
+
+    def normalized_weights(self) -> Dict[str, float]:
+        return self._normalize(self.stats, self.t)
+
+    def snapshot(self) -> Tuple[Dict[str, StrategyStats], int]:
+        """
+        Copies of the current stats (later updates do not change them)
+        """
+        stats = {k: StrategyStats(st.weight, st.ewma_return, st.plays) for k, st in self.stats.items()}
+        return stats, self.t
+
     def update(self, name: str, realized_return: float):
         st = self.stats[name]
         st.plays += 1
         st.ewma_return = (1 - self.alpha) * st.ewma_return + self.alpha * realized_return
         self.t += 1
+        self.version += 1
+
+    def restore(self, stats: Dict[str, StrategyStats], t: int) -> bool:
+        """
+        Load saved stats (snapshot restore). Strategies missing from
+        `stats` keep their initial values; unknown names are ignored.
+        """
+        for name, st in stats.items():
+            if name in self.stats:
+                self.stats[name] = StrategyStats(st.weight, st.ewma_return, st.plays)
+        self.t = t
+        self.version += 1
+        return True
 
 # =========================
 # RISK ENGINE
@@ -138,31 +457,81 @@ class RiskEngine:
         confidence = float(np.clip(abs(raw_score), 0.0, 1.0))
         return risk, confidence
 
+    @staticmethod
+    def assess_batch(s: MarketStateBatch, raw_score: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        risk = np.where(
+            (s.volatility > 0.03) | (s.entropy > 1.5),
+            "HIGH",
+            np.where(s.volatility > 0.02, "MEDIUM", "LOW")
+        )
+        confidence = np.clip(np.abs(raw_score), 0.0, 1.0)
+        return risk, confidence
+
 # =========================
 # DECISION CORE
 # =========================
+_DECIDE_HELP = "DecisionEngine.decide latency per stage"
+_T_FEATURES = METRICS.histogram("qnexus_decide_seconds", _DECIDE_HELP, stage="features")
+_T_REGIME = METRICS.histogram("qnexus_decide_seconds", _DECIDE_HELP, stage="regime")
+_T_WEIGHTS = METRICS.histogram("qnexus_decide_seconds", _DECIDE_HELP, stage="weights")
+_T_SIGNALS = METRICS.histogram("qnexus_decide_seconds", _DECIDE_HELP, stage="signals")
+_T_RISK = METRICS.histogram("qnexus_decide_seconds", _DECIDE_HELP, stage="risk")
+_T_TOTAL = METRICS.histogram("qnexus_decide_seconds", _DECIDE_HELP, stage="total")
+_N_DECISIONS = {
+    d: METRICS.counter("qnexus_decisions_total", "Decisions by outcome", decision=d)
+    for d in ("BUY", "SELL", "HOLD")
+}
+
 class DecisionEngine:
-    def __init__(self):
-        self.strategies: List[Strategy] = [
-            TrendFollowing(),
-            MeanReversion(),
-            VolatilityBreakout(),
-            Defensive(),
-        ]
+    def __init__(
+        self,
+        strategies: Optional[List[Strategy]] = None,
+        plugins: bool = True,
+        clock: Clock = WALL_CLOCK,
+        history_spill: Optional[str] = None
+    ):
+        self.clock = clock
+        if strategies is None:
+            strategies = [cls() for cls in BUILTIN_STRATEGIES]
+            if plugins:
+                names = {st.name for st in strategies}
+                for st in discover_strategies():
+                    if st.name in names:
+                        warnings.warn(f"Strategy plugin {st.name!r} shadows an existing strategy; skipped")
+                        continue
+                    names.add(st.name)
+                    strategies.append(st)
+
+        self.strategies: List[Strategy] = strategies
         self.weighter = BanditWeighter(self.strategies)
 
         # ✅ هنا بالضبط
         self.gate = LearningGate()
-        self.history = []
+        self.history = LearningHistory(spill_path=history_spill)
 
     def decide(self, prices: List[float], volumes: List[float]) -> Dict:
+        sw = METRICS.enabled and Stopwatch()
         s = MarketStateEngine.compute(prices, volumes)
+        if sw: sw.lap(_T_FEATURES)
+        return self._decide(s, sw)
+
+    def decide_state(self, s: MarketState) -> Dict:
+        """
+        decide() on a precomputed MarketState (e.g. from RollingMarketState)
+        """
+        return self._decide(s, METRICS.enabled and Stopwatch())
+
+    def _decide(self, s: MarketState, sw) -> Dict:
         regime = RegimeDetector.detect(
             momentum=s.momentum,
             volatility=s.volatility,
             entropy=s.entropy
                  )
+        if sw: sw.lap(_T_REGIME)
+
         weights = self.weighter.normalized_weights()
+        if sw: sw.lap(_T_WEIGHTS)
+
         agg = 0.0
         contrib = {}
 
@@ -171,16 +540,22 @@ class DecisionEngine:
             w = weights.get(st.name, 0.0)
             agg += w * sig
             contrib[st.name] = float(w * sig)
+        if sw: sw.lap(_T_SIGNALS)
 
         risk, confidence = RiskEngine.assess(s, agg)
 
-        if agg > 0.15:
+        if agg > DECISION_THRESHOLD:
             decision = "BUY"
-        elif agg < -0.15:
+        elif agg < -DECISION_THRESHOLD:
             decision = "SELL"
         else:
             decision = "HOLD"
 
+        if sw:
+            sw.lap(_T_RISK)
+            sw.total(_T_TOTAL)
+            _N_DECISIONS[decision].inc()
+
         return {
     "decision": decision,
     "confidence": round(confidence, 3),
@@ -188,9 +563,81 @@ class DecisionEngine:
     "regime": regime.name,
     "regime_confidence": regime.confidence,
     "explain": contrib,
-    "timestamp": int(time.time()),
+    "timestamp": int(self.clock.time()),
         }
 
+    def decide_batch(self, prices, volumes) -> List[Dict]:
+        """
+        Vectorized decide() over N symbols.
+        Series are stacked per window length; results keep input order
+        and match decide() symbol by symbol.
+        """
+        if len(prices) != len(volumes):
+            raise ValueError("Invalid market data")
+
+        weights = self.weighter.normalized_weights()
+        timestamp = int(self.clock.time())
+
+        if isinstance(prices, np.ndarray) and prices.ndim == 2:
+            return self._decide_block(prices, volumes, weights, timestamp)
+
+        groups: Dict[Tuple[int, int], List[int]] = {}
+        for i, (p, v) in enumerate(zip(prices, volumes)):
+            groups.setdefault((len(p), len(v)), []).append(i)
+
+        out: List[Dict] = [None] * len(prices)
+        for (n_p, n_v), idx in groups.items():
+            if n_p != n_v:
+                raise ValueError("Invalid market data")
+
+            block = self._decide_block(
+                np.array([prices[i] for i in idx], dtype=float),
+                np.array([volumes[i] for i in idx], dtype=float),
+                weights,
+                timestamp
+            )
+            for i, d in zip(idx, block):
+                out[i] = d
+
+        return out
+
+    def _decide_block(self, prices, volumes, weights: Dict[str, float], timestamp: int) -> List[Dict]:
+        s = MarketStateEngine.compute_batch(prices, volumes)
+        regimes, regime_conf = RegimeDetector.detect_batch(
+            momentum=s.momentum,
+            volatility=s.volatility,
+            entropy=s.entropy
+        )
+
+        agg, matrix = ensemble(self.strategies, weights, s)
+        contrib = {st.name: row for st, row in zip(self.strategies, matrix.tolist())}
+
+        risk, confidence = RiskEngine.assess_batch(s, agg)
+        decision = np.where(
+            agg > DECISION_THRESHOLD,
+            "BUY",
+            np.where(agg < -DECISION_THRESHOLD, "SELL", "HOLD")
+        )
+
+        decision = decision.tolist()
+        confidence = confidence.tolist()
+        risk = risk.tolist()
+        regimes = regime_names(regimes).tolist()
+        regime_conf = regime_conf.tolist()
+
+        return [
+            {
+                "decision": decision[i],
+                "confidence": round(confidence[i], 3),
+                "risk": risk[i],
+                "regime": regimes[i],
+                "regime_confidence": regime_conf[i],
+                "explain": {name: c[i] for name, c in contrib.items()},
+                "timestamp": timestamp,
+            }
+            for i in range(len(decision))
+        ]
+
     # ✅ هذه داخل الكلاس
     def learn(
         self,
@@ -207,22 +654,18 @@ class DecisionEngine:
         )
 
         if not verdict["approved"]:
-            self.history.append({
-                "status": "rejected",
-                "reason": verdict.get("reason"),
-                "details": verdict
-            })
+            self.history.record("rejected", reason=verdict.get("reason"))
             return {"status": "rejected", "verdict": verdict}
 
         # ✅ التحديث يتم فقط بعد الموافقة
         self.weighter.update(executed_strategy, realized_return)
 
-        self.history.append({
-            "status": "approved",
-            "strategy": executed_strategy,
-            "return": realized_return,
-            "metrics": verdict.get("metrics")
-        })
+        self.history.record(
+            "approved",
+            strategy=executed_strategy,
+            pnl=realized_return,
+            improvement=verdict.get("improvement")
+        )
 
         return {"status": "approved", "verdict": verdict}
 
@@ -1,6 +1,14 @@
 # core/evaluator.py
-from core.backtest import BacktestEngine
+from core.backtest import BacktestEngine, BacktestState
 from typing import Dict
+import numpy as np
+
+
+def _same_prefix(seq, prefix) -> bool:
+    head = seq[:len(prefix)]
+    if isinstance(head, np.ndarray) or isinstance(prefix, np.ndarray):
+        return bool(np.array_equal(head, prefix))
+    return list(head) == list(prefix)
 
 class LearningGate:
     def __init__(self):
@@ -25,15 +33,51 @@ class LearningGate:
             - metrics["max_drawdown"] * self.weights["max_drawdown"]
         )
 
+    # =========================
+    # RUNNING STATE (one decision at a time)
+    # =========================
+    def start(self) -> BacktestState:
+        return self.backtester.start()
+
+    def feed(self, state: BacktestState, price: float, decision: str) -> BacktestState:
+        """
+        Adds one (price, decision) step to a running gate state (in place)
+        """
+        return self.backtester.advance(state, (price,), (decision,))
+
+    def metrics(self, state: BacktestState) -> Dict:
+        return self.backtester.metrics(state)
+
+    def _backtest(self, prices, old_decisions, new_decisions):
+        """
+        One pass for both runs: new_decisions normally extends
+        old_decisions, so the new run is the old state plus the delta
+        """
+        bt = self.backtester
+        n_old = min(len(prices), len(old_decisions))
+        n_new = min(len(prices), len(new_decisions))
+
+        if n_new < n_old or not _same_prefix(new_decisions, old_decisions[:n_old]):
+            return bt.run(prices, old_decisions), bt.run(prices, new_decisions)
+
+        state = bt.advance(bt.start(), prices[:n_old], new_decisions[:n_old])
+        old_metrics = bt.metrics(state)
+        bt.advance(state, prices[n_old:n_new], new_decisions[n_old:n_new])
+        return old_metrics, bt.metrics(state)
+
     def approve(
         self,
         prices,
         old_decisions,
         new_decisions
     ) -> Dict:
-        old_metrics = self.backtester.run(prices, old_decisions)
-        new_metrics = self.backtester.run(prices, new_decisions)
+        old_metrics, new_metrics = self._backtest(prices, old_decisions, new_decisions)
+        return self.judge(old_metrics, new_metrics)
 
+    def judge(self, old_metrics: Dict, new_metrics: Dict) -> Dict:
+        """
+        Verdict from the old/new backtest metrics
+        """
         old_score = self._score(old_metrics)
         new_score = self._score(new_metrics)
 
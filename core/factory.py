@@ -0,0 +1,85 @@
+# core/factory.py
+"""
+Q-NEXUS — Lazy / Pre-warmed DecisionEngine
+- Importing this module is cheap: NumPy, strategy plugins, shared
+  memory and snapshots are only touched when the engine is built
+- get(): build on first use (thread-safe, exactly once)
+- prewarm(): build in a background thread right after startup, so the
+  process answers /health immediately and the first decision is warm
+"""
+
+from typing import TYPE_CHECKING, Callable, Optional
+import threading
+import time
+
+if TYPE_CHECKING:
+    from core.engine import DecisionEngine
+
+WARMUP_BARS = 64
+
+
+def default_engine() -> "DecisionEngine":
+    from core.engine import DecisionEngine
+    return DecisionEngine()
+
+
+def warm_up(engine: "DecisionEngine", bars: int = WARMUP_BARS):
+    """
+    Runs the feature/regime code paths once on a synthetic window.
+    Pure: no decision metrics, no learning state.
+    """
+    from core.engine import MarketStateEngine
+    from core.regime import RegimeDetector
+
+    prices = [100.0 + (i % 7) * 0.5 for i in range(bars)]
+    volumes = [1_000.0 + (i % 5) * 10.0 for i in range(bars)]
+
+    s = MarketStateEngine.compute(prices, volumes)
+    RegimeDetector.detect(s.momentum, s.volatility, s.entropy)
+    batch = MarketStateEngine.compute_batch([prices], [volumes])
+    RegimeDetector.detect_batch(batch.momentum, batch.volatility, batch.entropy)
+    engine.weighter.normalized_weights()
+
+
+class EngineFactory:
+    """
+    One process-wide engine, built by `build` on first use
+    """
+
+    def __init__(self, build: Callable[[], "DecisionEngine"] = default_engine):
+        self._build = build
+        self._engine: Optional["DecisionEngine"] = None
+        self._lock = threading.Lock()
+        self.build_seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._engine is not None
+
+    def peek(self) -> Optional["DecisionEngine"]:
+        """
+        The engine if already built (never builds)
+        """
+        return self._engine
+
+    def get(self) -> "DecisionEngine":
+        engine = self._engine
+        if engine is not None:
+            return engine
+
+        with self._lock:
+            if self._engine is None:
+                t0 = time.perf_counter()
+                engine = self._build()
+                warm_up(engine)
+                self.build_seconds = time.perf_counter() - t0
+                self._engine = engine
+            return self._engine
+
+    def prewarm(self) -> threading.Thread:
+        """
+        Builds in the background; get() callers meanwhile wait on the lock
+        """
+        thread = threading.Thread(target=self.get, name="qnexus-prewarm", daemon=True)
+        thread.start()
+        return thread
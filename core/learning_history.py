@@ -0,0 +1,216 @@
+# core/learning_history.py
+"""
+Bounded learning history for DecisionEngine
+- Fixed-capacity ring of slotted records
+- Running verdict counts + improvement statistics (O(1) stats)
+- Optional spill of evicted records to a JSON-lines file
+"""
+
+from typing import Dict, Iterator, List, Optional
+import json
+import math
+import threading
+import time
+
+HISTORY_CAPACITY = 10_000
+SPILL_BATCH = 256
+
+
+class LearningRecord:
+    __slots__ = ("status", "strategy", "pnl", "reason", "improvement", "timestamp")
+
+    def __init__(
+        self,
+        status: str,
+        strategy: Optional[str] = None,
+        pnl: Optional[float] = None,
+        reason: Optional[str] = None,
+        improvement: Optional[float] = None,
+        timestamp: Optional[float] = None
+    ):
+        self.status = status
+        self.strategy = strategy
+        self.pnl = pnl
+        self.reason = reason
+        self.improvement = improvement
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def to_dict(self) -> Dict:
+        return {
+            "status": self.status,
+            "strategy": self.strategy,
+            "pnl": self.pnl,
+            "reason": self.reason,
+            "improvement": self.improvement,
+            "timestamp": self.timestamp,
+        }
+
+
+class LearningHistory:
+    """
+    Drop-in replacement for the old `history` list:
+    append(dict) still works, but only the compact fields are kept
+    (status, strategy, pnl/return, reason, improvement).
+    """
+
+    def __init__(self, capacity: int = HISTORY_CAPACITY, spill_path: Optional[str] = None):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._ring: List[Optional[LearningRecord]] = [None] * self.capacity
+        self._head = 0          # الموضع التالي للكتابة
+        self._size = 0
+        self._spill: List[str] = []
+
+        self.total = 0
+        self.counts: Dict[str, int] = {}
+        self.pnl_sum = 0.0
+
+        # Welford
+        self._imp_n = 0
+        self._imp_mean = 0.0
+        self._imp_m2 = 0.0
+        self._imp_min = math.inf
+        self._imp_max = -math.inf
+
+    def __len__(self) -> int:
+        return self._size
+
+    def record(
+        self,
+        status: str,
+        strategy: Optional[str] = None,
+        pnl: Optional[float] = None,
+        reason: Optional[str] = None,
+        improvement: Optional[float] = None
+    ) -> LearningRecord:
+        rec = LearningRecord(status, strategy, pnl, reason, improvement)
+
+        with self._lock:
+            evicted = self._ring[self._head]
+            self._ring[self._head] = rec
+            self._head = (self._head + 1) % self.capacity
+            if self._size < self.capacity:
+                self._size += 1
+
+            self.total += 1
+            self.counts[status] = self.counts.get(status, 0) + 1
+            if pnl is not None:
+                self.pnl_sum += pnl
+            if improvement is not None:
+                self._observe_improvement(improvement)
+
+            if evicted is not None and self.spill_path:
+                self._spill.append(json.dumps(evicted.to_dict()))
+                if len(self._spill) >= SPILL_BATCH:
+                    self._flush_spill()
+
+        return rec
+
+    def append(self, entry: Dict) -> LearningRecord:
+        pnl = entry.get("pnl", entry.get("return"))
+        return self.record(
+            status=entry.get("status", "unknown"),
+            strategy=entry.get("strategy"),
+            pnl=pnl,
+            reason=entry.get("reason"),
+            improvement=entry.get("improvement")
+        )
+
+    def _observe_improvement(self, x: float):
+        self._imp_n += 1
+        delta = x - self._imp_mean
+        self._imp_mean += delta / self._imp_n
+        self._imp_m2 += delta * (x - self._imp_mean)
+        self._imp_min = min(self._imp_min, x)
+        self._imp_max = max(self._imp_max, x)
+
+    def _flush_spill(self):
+        with open(self.spill_path, "a") as f:
+            f.write("\n".join(self._spill) + "\n")
+        self._spill.clear()
+
+    def flush(self):
+        with self._lock:
+            if self._spill:
+                self._flush_spill()
+
+    def export_state(self) -> Dict:
+        """
+        Retained records (as tuples) + running counters, for snapshots
+        """
+        with self._lock:
+            start = (self._head - self._size) % self.capacity
+            records = []
+            for i in range(self._size):
+                r = self._ring[(start + i) % self.capacity]
+                records.append((r.status, r.strategy, r.pnl, r.reason, r.improvement, r.timestamp))
+
+            return {
+                "records": records,
+                "total": self.total,
+                "counts": dict(self.counts),
+                "pnl_sum": self.pnl_sum,
+                "improvement": [self._imp_n, self._imp_mean, self._imp_m2, self._imp_min, self._imp_max],
+            }
+
+    def restore_state(self, state: Dict):
+        with self._lock:
+            spill = self._spill
+            self.clear()
+            self._spill = spill
+
+            records = state["records"][-self.capacity:]
+            for i, r in enumerate(records):
+                self._ring[i] = LearningRecord(*r)
+            self._size = len(records)
+            self._head = self._size % self.capacity
+
+            self.total = state["total"]
+            self.counts = dict(state["counts"])
+            self.pnl_sum = state["pnl_sum"]
+            (self._imp_n, self._imp_mean, self._imp_m2,
+             self._imp_min, self._imp_max) = state["improvement"]
+
+    def __iter__(self) -> Iterator[Dict]:
+        """
+        Retained records, oldest first
+        """
+        start = (self._head - self._size) % self.capacity
+        for i in range(self._size):
+            yield self._ring[(start + i) % self.capacity].to_dict()
+
+    def __getitem__(self, i: int) -> Dict:
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("history index out of range")
+        start = (self._head - self._size) % self.capacity
+        return self._ring[(start + i) % self.capacity].to_dict()
+
+    def stats(self) -> Dict:
+        approved = self.counts.get("approved", 0)
+        rejected = self.counts.get("rejected", 0)
+        judged = approved + rejected
+        n = self._imp_n
+
+        return {
+            "total": self.total,
+            "retained": self._size,
+            "counts": dict(self.counts),
+            "approval_rate": approved / judged if judged else 0.0,
+            "pnl": self.pnl_sum,
+            "improvement": {
+                "count": n,
+                "mean": self._imp_mean if n else 0.0,
+                "std": math.sqrt(self._imp_m2 / n) if n else 0.0,
+                "min": self._imp_min if n else 0.0,
+                "max": self._imp_max if n else 0.0,
+            },
+        }
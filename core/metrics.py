@@ -0,0 +1,173 @@
+# core/metrics.py
+"""
+Q-NEXUS — Hot-Path Instrumentation
+- Per-stage latency histograms + counters
+- Off (QNEXUS_METRICS=0) → one flag check per instrumented block
+- Prometheus text exposition + one-line log summary
+"""
+
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+import os
+import threading
+import time
+
+# حدود السلال (ثوانٍ): 1µs → 2.5s
+BUCKETS: Tuple[float, ...] = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5,
+    1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+    1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    return ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+
+
+class Counter:
+    __slots__ = ("name", "labels", "value", "_lock")
+
+    def __init__(self, name: str, labels: Dict[str, str]):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n: int = 1):
+        with self._lock:
+            self.value += n
+
+
+class Histogram:
+    __slots__ = ("name", "labels", "counts", "count", "sum", "_lock")
+
+    def __init__(self, name: str, labels: Dict[str, str]):
+        self.name = name
+        self.labels = labels
+        self.counts = [0] * (len(BUCKETS) + 1)    # + overflow (+Inf)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(BUCKETS, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-quantile
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("inf")
+
+
+class Stopwatch:
+    """
+    Laps successive stages into histograms
+    """
+    __slots__ = ("start", "last")
+
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+
+    def lap(self, hist: Histogram):
+        now = time.perf_counter()
+        hist.observe(now - self.last)
+        self.last = now
+
+    def total(self, hist: Histogram):
+        hist.observe(time.perf_counter() - self.start)
+
+
+class Registry:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._help: Dict[str, Tuple[str, str]] = {}       # name → (type, help)
+        self._series: Dict[Tuple[str, str], object] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, kind: str, name: str, help: str, labels: Dict[str, str]):
+        key = (name, _labels(labels))
+        metric = self._series.get(key)
+        if metric is None:
+            with self._lock:
+                self._help.setdefault(name, (kind, help))
+                metric = self._series.setdefault(key, cls(name, labels))
+        return metric
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        return self._get(Counter, "counter", name, help, labels)
+
+    def histogram(self, name: str, help: str = "", **labels) -> Histogram:
+        return self._get(Histogram, "histogram", name, help, labels)
+
+    def reset(self):
+        for metric in list(self._series.values()):
+            if isinstance(metric, Counter):
+                metric.value = 0
+            else:
+                metric.counts = [0] * (len(BUCKETS) + 1)
+                metric.count = 0
+                metric.sum = 0.0
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format (0.0.4)
+        """
+        lines: List[str] = []
+        by_name: Dict[str, list] = {}
+        for (name, _), metric in sorted(self._series.items()):
+            by_name.setdefault(name, []).append(metric)
+
+        for name, series in by_name.items():
+            kind, help = self._help[name]
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            for m in series:
+                lab = _labels(m.labels)
+                if isinstance(m, Counter):
+                    lines.append(f"{name}{{{lab}}} {m.value}" if lab else f"{name} {m.value}")
+                    continue
+
+                sep = "," if lab else ""
+                cumulative = 0
+                for bound, c in zip(BUCKETS, m.counts):
+                    cumulative += c
+                    lines.append(f'{name}_bucket{{{lab}{sep}le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{lab}{sep}le="+Inf"}} {m.count}')
+                lines.append(f"{name}_sum{{{lab}}} {m.sum!r}" if lab else f"{name}_sum {m.sum!r}")
+                lines.append(f"{name}_count{{{lab}}} {m.count}" if lab else f"{name}_count {m.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """
+        One log line: p50/p99 per histogram, value per counter
+        """
+        parts = []
+        for (name, lab), m in sorted(self._series.items()):
+            short = name.replace("qnexus_", "").replace("_seconds", "").replace("_total", "")
+            label = ",".join(m.labels.values())
+            tag = f"{short}[{label}]" if label else short
+            if isinstance(m, Counter):
+                parts.append(f"{tag}={m.value}")
+            elif m.count:
+                parts.append(
+                    f"{tag} p50≤{m.quantile(0.5) * 1e3:g}ms p99≤{m.quantile(0.99) * 1e3:g}ms n={m.count}"
+                )
+        return " | ".join(parts)
+
+
+METRICS = Registry(enabled=os.getenv("QNEXUS_METRICS", "1") != "0")
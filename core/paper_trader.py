@@ -1,106 +1,250 @@
 # core/paper_trader.py
-from typing import List
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+from core.clock import Clock
 from core.engine import DecisionEngine
+from core.position_sizing import Allocation, PortfolioAllocator, PositionSizer
 from core.attribution import StrategyAttributor
-from core.risk_control import KillSwitch
+from core.risk_control import KillSwitch, risk_flag
+from core.metrics import METRICS, Stopwatch
 from db.history import log_trade
 
+_STEP_HELP = "PaperTrader.step latency per stage"
+_T_DECIDE = METRICS.histogram("qnexus_paper_step_seconds", _STEP_HELP, stage="decide")
+_T_KILL = METRICS.histogram("qnexus_paper_step_seconds", _STEP_HELP, stage="kill_switch")
+_T_LOG = METRICS.histogram("qnexus_paper_step_seconds", _STEP_HELP, stage="log_trade")
+_T_GATE = METRICS.histogram("qnexus_paper_step_seconds", _STEP_HELP, stage="gate")
+_T_TOTAL = METRICS.histogram("qnexus_paper_step_seconds", _STEP_HELP, stage="total")
+_N_KILLED = METRICS.counter("qnexus_paper_killed_total", "Ticks blocked by the kill switch")
+_N_VERDICTS = {
+    status: METRICS.counter("qnexus_gate_verdicts_total", "LearningGate verdicts", status=status)
+    for status in ("approved", "rejected")
+}
+
 
 class PaperTrader:
     """
     Executes paper trades and feeds results back to the engine
     """
 
-    def __init__(self, engine: DecisionEngine, symbol: str, market: str = "crypto"):
+    def __init__(
+        self,
+        engine: DecisionEngine,
+        symbol: str,
+        market: str = "crypto",
+        trade_log: Callable[..., object] = log_trade,
+        clock: Optional[Clock] = None,
+        capital: float = 10_000,
+        volatility_of: Callable[[Sequence[float], Dict], float] = risk_flag
+    ):
         self.engine = engine
+        self.clock = clock or engine.clock       # نفس ساعة المحرك افتراضيًا
         self.symbol = symbol
         self.market = market
+        self.trade_log = trade_log      # simulations swap in an in-memory sink
+        self.capital = capital
+        # (prices, decision) → volatility passed to the kill switch
+        self.volatility_of = volatility_of
 
         self.position = None        # None | "LONG"
-        self.entry_price = None
+        self.entry_price = None     # متوسط سعر الدخول
+        self.quantity = 0.0
 
         self.decisions_buffer: List[str] = []
-        self.kill_switch = KillSwitch()
+        # حالة بوابة التعلم لهذه القرارات (تُحدَّث قرارًا بقرار)
+        # + السعر الذي اقترن به كل قرار فيها
+        self.gate_state = engine.gate.start()
+        self.gate_prices: List[float] = []
+        self.kill_switch = KillSwitch(clock=self.clock)
+
+    def target_quantity(self, decision_payload, price: float) -> float:
+        """
+        Single-name sizing: BUY opens a PositionSizer-sized long,
+        SELL closes, anything else keeps the position
+        """
+        decision = decision_payload["decision"]
+        if decision == "BUY" and self.position is None:
+            size = PositionSizer.size(
+                regime=decision_payload["regime"],
+                risk=decision_payload["risk"],
+                confidence=decision_payload["confidence"]
+            )
+            return self.capital * size.fraction / price
+        if decision == "SELL":
+            return 0.0
+        return self.quantity
+
+    def rebalance(self, target: float, price: float) -> float:
+        """
+        Moves the position to `target` units. Returns the realized PnL
+        of the reduced part (entry price is averaged on increases).
+        """
+        held = self.quantity
+        pnl = 0.0
+        if target < held:
+            pnl = (price - self.entry_price) * (held - target)
+        elif target > held:
+            self.entry_price = (self.entry_price * held + price * (target - held)) / target if held else price
+
+        self.quantity = target
+        if target > 0:
+            self.position = "LONG"
+        else:
+            self.position = None
+            self.entry_price = None
+        return pnl
+
+    def step(self, prices, volumes, target: Optional[float] = None, decision_payload: Optional[Dict] = None):
+        """
+        target: position (units) from a PortfolioAllocator;
+        None → sized from this decision alone
+        decision_payload: precomputed engine output (batch callers)
+        """
+        sw = METRICS.enabled and Stopwatch()
 
-    def step(self, prices, volumes):
         # 1️⃣ قرار الذكاء
-        decision_payload = self.engine.decide(prices, volumes)
+        if decision_payload is None:
+            decision_payload = self.engine.decide(prices, volumes)
+        if sw: sw.lap(_T_DECIDE)
 
         decision = decision_payload["decision"]
         confidence = decision_payload["confidence"]
         explain = decision_payload["explain"]
         regime = decision_payload["regime"]
 
-        # 🚫 فلتر Regime
-        if regime == "DEAD":
+        # 🚫 فلتر Regime (مع target من المخصِّص: نفس مسار التنفيذ)
+        if regime == "DEAD" and target is None:
             return  # لا تداول
 
         current_price = prices[-1]
-        pnl = 0.0
 
         # 2️⃣ تنفيذ وهمي (Paper Execution)
-        if decision == "BUY" and self.position is None:
-            self.position = "LONG"
-            self.entry_price = current_price
-
-        elif decision == "SELL" and self.position == "LONG":
-            pnl = current_price - self.entry_price
-            self.position = None
-            self.entry_price = None
+        if target is None:
+            target = self.target_quantity(decision_payload, current_price)
+        held = self.quantity
+        pnl = self.rebalance(max(float(target), 0.0), current_price)
+        traded = abs(self.quantity - held)
+        realized_return = pnl / self.capital     # حدود المخاطرة نسب من رأس المال
 
         # 3️⃣ تحديث Kill-Switch
         self.kill_switch.update(
-            pnl=pnl,
-            volatility=decision_payload["risk"] == "HIGH"
+            pnl=realized_return,
+            volatility=self.volatility_of(prices, decision_payload)
         )
+        if sw: sw.lap(_T_KILL)
 
         if not self.kill_switch.can_trade():
-            self.engine.history.append({
-                "status": "KILLED",
-                "reason": "Risk limits breached"
-            })
+            if sw: _N_KILLED.inc()
+            self.engine.history.record("KILLED", reason="Risk limits breached")
             return
 
         # 4️⃣ تسجيل الصفقة (حتى HOLD)
-        log_trade(
+        self.trade_log(
             market=self.market,
             symbol=self.symbol,
             strategy="ensemble",
             decision=decision,
             price=current_price,
-            volume=1.0,
+            volume=traded,
             confidence=confidence,
             pnl=pnl,
-            meta=decision_payload
+            meta=decision_payload,
+            timestamp=self.clock.time()
         )
+        if sw: sw.lap(_T_LOG)
 
         # 5️⃣ حفظ القرارات للاختبار
         self.decisions_buffer.append(decision)
+        gate = self.engine.gate
 
         # 6️⃣ التعلم فقط عند إغلاق صفقة
         if pnl != 0.0 and len(self.decisions_buffer) > 10:
 
-            verdict = self.engine.gate.approve(
-                prices=prices[-len(self.decisions_buffer):],
-                old_decisions=self.decisions_buffer[:-1],
-                new_decisions=self.decisions_buffer
-            )
+            verdict = self._gate_verdict(prices, decision)
+            if sw:
+                sw.lap(_T_GATE)
+                _N_VERDICTS["approved" if verdict["approved"] else "rejected"].inc()
 
             if verdict["approved"]:
                 attribution = StrategyAttributor.attribute(
                     explain=explain,
-                    realized_return=pnl
+                    realized_return=realized_return
                 )
 
                 for strategy, strat_pnl in attribution.items():
                     self.engine.weighter.update(strategy, strat_pnl)
 
-            self.engine.history.append({
-                "status": "approved" if verdict["approved"] else "rejected",
-                "pnl": pnl,
-                "reason": verdict.get("reason"),
-                "improvement": verdict.get("improvement"),
-                "details": verdict
-            })
+            self.engine.history.record(
+                "approved" if verdict["approved"] else "rejected",
+                pnl=pnl,
+                reason=verdict.get("reason"),
+                improvement=verdict.get("improvement")
+            )
 
             self.decisions_buffer.clear()
+            self.gate_state = gate.start()
+            self.gate_prices = []
+        else:
+            gate.feed(self.gate_state, current_price, decision)
+            self.gate_prices.append(current_price)
+
+        if sw: sw.total(_T_TOTAL)
+
+    def _gate_verdict(self, prices, decision: str) -> Dict:
+        """
+        LearningGate verdict on the decision buffer (last item: `decision`)
+        against the current price window, paired as
+        approve(prices[-n:], buffer[:-1], buffer).
+        The running gate state is used when it holds exactly those pairs
+        (window slid one bar per tick and covers the buffer); otherwise
+        the full approve() call.
+        """
+        gate = self.engine.gate
+        buffer = self.decisions_buffer
+        window = prices[-len(buffer):]
+
+        if len(window) == len(buffer) and np.array_equal(window[:-1], self.gate_prices):
+            old_metrics = gate.metrics(self.gate_state)
+            gate.feed(self.gate_state, window[-1], decision)
+            return gate.judge(old_metrics, gate.metrics(self.gate_state))
+
+        return gate.approve(
+            prices=window,
+            old_decisions=buffer[:-1],
+            new_decisions=buffer
+        )
+
+
+class PaperBook:
+    """
+    N paper traders sharing one engine and one capital budget.
+    Each tick: decide_batch → PortfolioAllocator → every trader
+    moves to its allocated position.
+    """
+
+    def __init__(
+        self,
+        engine: DecisionEngine,
+        symbols: Sequence[str],
+        allocator: PortfolioAllocator,
+        market: str = "crypto",
+        trade_log: Callable[..., object] = log_trade
+    ):
+        self.engine = engine
+        self.allocator = allocator
+        self.traders = [
+            PaperTrader(engine, symbol, market=market, trade_log=trade_log, capital=allocator.capital)
+            for symbol in symbols
+        ]
+
+    def step(self, prices, volumes) -> Allocation:
+        payloads = self.engine.decide_batch(prices, volumes)
+        allocation = self.allocator.allocate_payloads(
+            payloads,
+            [p[-1] for p in prices],
+            current=[t.quantity for t in self.traders]
+        )
+
+        for i, trader in enumerate(self.traders):
+            trader.step(prices[i], volumes[i], target=allocation.quantity[i], decision_payload=payloads[i])
+        return allocation
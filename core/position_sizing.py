@@ -1,5 +1,33 @@
 # core/position_sizing.py
 from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from core.regime import REGIMES
+
+# 📐 قواعد التحجيم (مشتركة بين size و size_batch)
+_REGIME_BASE = {"VOLATILE": 0.1, "TRENDING": 0.4, "RANGING": 0.25}
+_DEFAULT_BASE = 0.15
+_RISK_SCALE = {"HIGH": 0.4, "MEDIUM": 0.7}
+MIN_FRACTION = 0.01
+MAX_FRACTION = 0.5
+
+# أقرب مسافة من منتصف خانة التقريب تُعامل كحالة حدّية
+_TIE_EPS = 1e-9
+
+
+def _round3(x: np.ndarray) -> np.ndarray:
+    """
+    Python round(x, 3) element-wise. np.round scales by 1000 first, which
+    can land on the other side of a .5 tie → values next to a tie use round().
+    """
+    rounded = np.round(x, 3)
+    scaled = x * 1000.0
+    tie = np.abs(scaled - np.floor(scaled) - 0.5) < _TIE_EPS
+    if tie.any():
+        rounded[tie] = [round(v, 3) for v in x[tie].tolist()]
+    return rounded
 
 
 @dataclass(frozen=True)
@@ -28,29 +56,228 @@ class PositionSizer:
         if regime == "DEAD":
             return PositionSize(0.0, "Market dead")
 
-        # ⚡ سوق خطير
-        if regime == "VOLATILE":
-            base = 0.1
-        elif regime == "TRENDING":
-            base = 0.4
-        elif regime == "RANGING":
-            base = 0.25
-        else:
-            base = 0.15
+        # ⚡ سوق خطير → أصغر حجم
+        base = _REGIME_BASE.get(regime, _DEFAULT_BASE)
 
         # ⚠️ تخفيض حسب المخاطرة
-        if risk == "HIGH":
-            base *= 0.4
-        elif risk == "MEDIUM":
-            base *= 0.7
+        base *= _RISK_SCALE.get(risk, 1.0)
 
         # 🧠 تضخيم/تقليص حسب الثقة
         base *= confidence
 
         # 🧱 حدود أمان
-        base = max(0.01, min(base, 0.5))
+        base = max(MIN_FRACTION, min(base, MAX_FRACTION))
 
         return PositionSize(
             fraction=round(base, 3),
             reason=f"{regime} | {risk} | conf={confidence}"
         )
+
+    @staticmethod
+    def size_batch(
+        *,
+        regime,
+        risk,
+        confidence
+    ) -> np.ndarray:
+        """
+        Vectorized size() over N signals → fractions (float64 array).
+        Same rules, same rounding: matches size(...).fraction element-wise.
+        """
+        regime = np.asarray(regime)
+        risk = np.asarray(risk)
+        confidence = np.asarray(confidence, dtype=float)
+
+        base = np.select(
+            [regime == name for name in _REGIME_BASE],
+            list(_REGIME_BASE.values()),
+            _DEFAULT_BASE
+        )
+        base = base * np.select(
+            [risk == name for name in _RISK_SCALE],
+            list(_RISK_SCALE.values()),
+            1.0
+        )
+        base = base * confidence
+
+        fraction = _round3(np.clip(base, MIN_FRACTION, MAX_FRACTION))
+        fraction[regime == "DEAD"] = 0.0
+        return fraction
+
+
+# =========================
+# PORTFOLIO ALLOCATION
+# =========================
+# سقف مجموع الأوزان لكل Regime (نسبة من رأس المال)
+REGIME_CAPS = {
+    "TRENDING": 0.6,
+    "RANGING": 0.4,
+    "VOLATILE": 0.2,
+}
+# أصغر تغيير (نسبة من رأس المال) يستحق إعادة التوازن
+MIN_CHANGE = 0.001
+
+_SORTED_REGIMES = np.array(sorted(REGIMES))
+_SORTED_CODES = np.array([REGIMES.index(name) for name in _SORTED_REGIMES])
+_OTHER = len(REGIMES)       # Regime غير معروف: بلا سقف خاص
+
+
+def regime_codes(regimes) -> np.ndarray:
+    """
+    Regime names → int codes (index in REGIMES, unknown → len(REGIMES)).
+    Integer arrays (RegimeDetector.detect_batch codes) pass through.
+    """
+    regimes = np.asarray(regimes)
+    if regimes.dtype.kind in "iu":
+        return regimes
+    pos = np.searchsorted(_SORTED_REGIMES, regimes)
+    pos = np.minimum(pos, len(_SORTED_REGIMES) - 1)
+    known = _SORTED_REGIMES[pos] == regimes
+    return np.where(known, _SORTED_CODES[pos], _OTHER)
+
+
+@dataclass(frozen=True)
+class Allocation:
+    fraction: np.ndarray        # نسبة من رأس المال لكل رمز
+    notional: np.ndarray        # fraction × capital
+    quantity: np.ndarray        # notional / price
+    regime_scale: np.ndarray    # التعرض بعد/قبل سقف كل Regime (REGIMES + unknown)
+    budget_scale: float         # التعرض بعد/قبل الميزانية الكلية
+
+    @property
+    def gross(self) -> float:
+        return float(self.fraction.sum())
+
+
+class PortfolioAllocator:
+    """
+    N symbols → target long positions in one vectorized pass
+    - BUY: PositionSizer fraction when flat, keep the position when long
+    - SELL: flat
+    - HOLD: keep the current position (if `current` is given)
+    - Per-regime caps, then the total budget: held positions use the
+      room first and are only cut when they alone breach a limit;
+      new entries are scaled pro-rata into what is left
+    - Changes smaller than min_change (of capital) keep the exact
+      current quantity: no tiny re-targets
+    """
+
+    def __init__(
+        self,
+        capital: float,
+        budget: float = 1.0,
+        regime_caps: Optional[Dict[str, float]] = None,
+        min_change: float = MIN_CHANGE
+    ):
+        if capital <= 0:
+            raise ValueError("capital must be positive")
+        if budget < 0:
+            raise ValueError("budget must be non-negative")
+        if min_change < 0:
+            raise ValueError("min_change must be non-negative")
+
+        self.capital = float(capital)
+        self.budget = float(budget)
+        self.min_change = float(min_change)
+
+        caps = dict(REGIME_CAPS if regime_caps is None else regime_caps)
+        self.caps = np.full(len(REGIMES) + 1, np.inf)
+        for name, cap in caps.items():
+            self.caps[REGIMES.index(name)] = cap
+
+    def allocate(
+        self,
+        decisions,
+        fractions,
+        regimes,
+        prices,
+        current=None
+    ) -> Allocation:
+        """
+        decisions: "BUY" / "SELL" / "HOLD" per symbol
+        fractions: PositionSizer fractions (size_batch)
+        prices: last price per symbol
+        current: held quantity per symbol (None → flat book)
+        """
+        decisions = np.asarray(decisions)
+        fractions = np.asarray(fractions, dtype=float)
+        prices = np.asarray(prices, dtype=float)
+        codes = regime_codes(regimes)
+
+        if not (len(decisions) == len(fractions) == len(codes) == len(prices)):
+            raise ValueError("decisions, fractions, regimes and prices must have the same length")
+        if np.any(prices <= 0):
+            raise ValueError("prices must be positive")
+
+        if current is None:
+            current = np.zeros(len(prices))
+        else:
+            current = np.asarray(current, dtype=float)
+            if len(current) != len(prices):
+                raise ValueError("current must have one quantity per symbol")
+        held = current * prices / self.capital
+
+        # مراكز قائمة تبقى كما هي: HOLD، أو BUY ونحن LONG أصلًا
+        keep = (decisions == "HOLD") | ((decisions == "BUY") & (held > 0))
+        target = np.where(keep, held, np.where(decisions == "BUY", fractions, 0.0))
+        kept = np.where(keep, target, 0.0)
+        new = target - kept
+
+        # 🧱 سقف كل Regime
+        n = len(self.caps)
+        kept_exposure = np.bincount(codes, weights=kept, minlength=n)
+        new_exposure = np.bincount(codes, weights=new, minlength=n)
+        room = np.maximum(self.caps - kept_exposure, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            kept_scale = np.where(kept_exposure > self.caps, self.caps / kept_exposure, 1.0)
+            new_scale = np.where(new_exposure > room, room / new_exposure, 1.0)
+        kept = kept * kept_scale[codes]
+        new = new * new_scale[codes]
+
+        exposure = kept_exposure + new_exposure
+        capped = np.bincount(codes, weights=kept + new, minlength=n)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            regime_scale = np.where(exposure > 0, capped / exposure, 1.0)
+
+        # 💰 الميزانية الكلية
+        kept_gross = kept.sum()
+        new_gross = new.sum()
+        if kept_gross > self.budget:
+            kept = kept * (self.budget / kept_gross)
+            new = np.zeros_like(new)
+        elif new_gross > self.budget - kept_gross:
+            new = new * ((self.budget - kept_gross) / new_gross)
+        target = kept + new
+        gross = kept_gross + new_gross
+        budget_scale = target.sum() / gross if gross > 0 else 1.0
+
+        # 🔇 لا إعادة توازن لتغييرات صغيرة (الإغلاق الكامل دائمًا ينفَّذ)
+        unchanged = (np.abs(target - held) < self.min_change) & (target > 0)
+        target = np.where(unchanged, held, target)
+
+        notional = target * self.capital
+        return Allocation(
+            fraction=target,
+            notional=notional,
+            quantity=np.where(unchanged, current, notional / prices),
+            regime_scale=regime_scale,
+            budget_scale=float(budget_scale)
+        )
+
+    def allocate_payloads(self, payloads: Sequence[Dict], prices, current=None) -> Allocation:
+        """
+        DecisionEngine.decide_batch output → Allocation
+        """
+        regimes = [p["regime"] for p in payloads]
+        fractions = PositionSizer.size_batch(
+            regime=regimes,
+            risk=[p["risk"] for p in payloads],
+            confidence=[p["confidence"] for p in payloads]
+        )
+        return self.allocate(
+            [p["decision"] for p in payloads],
+            fractions,
+            regimes,
+            prices,
+            current
+        )
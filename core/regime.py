@@ -1,7 +1,52 @@
 # core/regime.py
 from dataclasses import dataclass
+from typing import Tuple
+import math
 import numpy as np
 
+# =========================
+# REGIME CODES
+# =========================
+TRENDING, RANGING, VOLATILE, DEAD = range(4)
+REGIMES = ("TRENDING", "RANGING", "VOLATILE", "DEAD")      # code → name
+_REGIME_NAMES = np.array(REGIMES)
+
+# أقرب مسافة من منتصف خانة التقريب تُعامل كحالة حدّية
+_TIE_EPS = 1e-9
+
+
+def regime_names(codes: np.ndarray) -> np.ndarray:
+    """
+    Regime codes → names (same shape)
+    """
+    return _REGIME_NAMES[codes]
+
+
+def _near_tie(scaled: float) -> bool:
+    return abs(scaled - math.floor(scaled) - 0.5) < _TIE_EPS
+
+
+def _round3(x: float) -> float:
+    """
+    np.round(x, 3) on a Python float: scale, round half to even, unscale
+    """
+    y = x * 1000.0
+    if not math.isfinite(y):
+        return x
+    return round(y) / 1000.0
+
+
+def _tanh3(x: float) -> float:
+    """
+    round(np.tanh(x), 3) via math.tanh. The two can differ in the last
+    ulp, which only matters next to a rounding boundary → NumPy decides.
+    """
+    y = math.tanh(x) * 1000.0
+    if _near_tie(y):
+        y = float(np.tanh(x)) * 1000.0
+    return round(y) / 1000.0
+
+
 @dataclass(frozen=True)
 class MarketRegime:
     name: str
@@ -18,26 +63,57 @@ class RegimeDetector:
     @staticmethod
     def detect(momentum: float, volatility: float, entropy: float) -> MarketRegime:
 
-        # Normalize inputs
-        m = abs(momentum)
-        v = volatility
-        e = entropy
+        # Normalize inputs (Python floats: no NumPy scalar overhead)
+        m = abs(float(momentum))
+        v = float(volatility)
+        e = float(entropy)
 
         # ⚫ DEAD: no structure, no energy
         if v < 0.006 and m < 0.008:
-            confidence = 1.0 - (v + m)
-            return MarketRegime("DEAD", round(confidence, 3))
+            return MarketRegime("DEAD", _round3(1.0 - (v + m)))
 
         # ⚡ VOLATILE: unstable, high uncertainty
         if v > 0.04 and e > 1.5:
-            confidence = np.tanh(v + e / 2)
-            return MarketRegime("VOLATILE", round(confidence, 3))
+            return MarketRegime("VOLATILE", _tanh3(v + e / 2))
 
         # 📈 TRENDING: directional conviction
         if m > 0.03 and v < 0.03:
-            confidence = np.tanh(m * 4)
-            return MarketRegime("TRENDING", round(confidence, 3))
+            return MarketRegime("TRENDING", _tanh3(m * 4))
 
         # 🔁 RANGING / MEAN REVERTING
-        confidence = np.clip(1.0 - m * 10, 0.5, 0.9)
-        return MarketRegime("RANGING", round(confidence, 3))
+        confidence = min(max(1.0 - m * 10, 0.5), 0.9)
+        return MarketRegime("RANGING", _round3(confidence))
+
+    @staticmethod
+    def detect_batch(
+        momentum: np.ndarray,
+        volatility: np.ndarray,
+        entropy: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized detect(): same branch order, one regime per row.
+        Returns (regime codes (int8, see REGIMES), confidences);
+        both match detect() bit for bit.
+        """
+        m = np.abs(np.asarray(momentum, dtype=float))
+        v = np.asarray(volatility, dtype=float)
+        e = np.asarray(entropy, dtype=float)
+
+        dead = (v < 0.006) & (m < 0.008)
+        volatile = ~dead & (v > 0.04) & (e > 1.5)
+        trending = ~dead & ~volatile & (m > 0.03) & (v < 0.03)
+        ranging = ~(dead | volatile | trending)
+
+        codes = np.full(m.shape, RANGING, dtype=np.int8)
+        codes[dead] = DEAD
+        codes[volatile] = VOLATILE
+        codes[trending] = TRENDING
+
+        # كل فرع يُحسب على صفوفه فقط
+        confidence = np.empty(m.shape)
+        confidence[ranging] = np.clip(1.0 - m[ranging] * 10, 0.5, 0.9)
+        confidence[trending] = np.tanh(m[trending] * 4)
+        confidence[volatile] = np.tanh(v[volatile] + e[volatile] / 2)
+        confidence[dead] = 1.0 - (v[dead] + m[dead])
+
+        return codes, np.round(confidence, 3)
@@ -1,5 +1,13 @@
 # core/risk_control.py
 from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from core.clock import Clock, WALL_CLOCK
+
+# سبب الإيقاف (RiskBook.reason)
+TRIP_NONE, TRIP_DRAWDOWN, TRIP_LOSSES, TRIP_VOLATILITY = 0, 1, 2, 3
 
 @dataclass
 class RiskLimits:
@@ -7,17 +15,40 @@ class RiskLimits:
     max_consecutive_losses: int = 3
     max_volatility: float = 0.05    # 5%
 
+def risk_flag(prices, decision_payload: Dict) -> float:
+    """
+    Live kill-switch input: the engine's risk label
+    (HIGH → 1.0, which trips any max_volatility <= 1)
+    """
+    return float(decision_payload["risk"] == "HIGH")
+
+def realized_volatility(prices) -> float:
+    """
+    Std of simple returns over the window (same as MarketState.volatility),
+    the figure compared against RiskLimits.max_volatility
+    """
+    p = np.asarray(prices, dtype=float)
+    if len(p) < 2:
+        return 0.0
+    return float(np.std(np.diff(p) / (p[:-1] + 1e-9)))
+
 class KillSwitch:
     """
     Hard risk stop – shuts down trading when limits are breached
     """
 
-    def __init__(self, limits: RiskLimits = RiskLimits()):
+    def __init__(self, limits: RiskLimits = RiskLimits(), clock: Clock = WALL_CLOCK):
         self.limits = limits
+        self.clock = clock
         self.equity = 0.0
         self.peak_equity = 0.0
         self.consecutive_losses = 0
         self.active = True
+        self.tripped_at: Optional[float] = None
+
+    def _trip(self):
+        self.active = False
+        self.tripped_at = self.clock.time()
 
     def update(self, pnl: float, volatility: float):
         if not self.active:
@@ -29,21 +60,156 @@ class KillSwitch:
         # 1️⃣ Drawdown
         drawdown = self.equity - self.peak_equity
         if drawdown <= self.limits.max_drawdown:
-            self.active = False
+            self._trip()
             return
 
         # 2️⃣ Consecutive losses
         if pnl < 0:
             self.consecutive_losses += 1
             if self.consecutive_losses >= self.limits.max_consecutive_losses:
-                self.active = False
+                self._trip()
                 return
         else:
             self.consecutive_losses = 0
 
         # 3️⃣ Volatility spike
         if volatility >= self.limits.max_volatility:
-            self.active = False
+            self._trip()
 
     def can_trade(self) -> bool:
         return self.active
+
+
+class RiskBook:
+    """
+    Struct-of-arrays KillSwitch for many portfolios.
+    update() applies KillSwitch.update to every portfolio in one pass
+    (same order of checks, same early exits) and returns the can-trade mask.
+    Limits are per portfolio.
+    """
+
+    def __init__(self, clock: Clock = WALL_CLOCK):
+        self.clock = clock
+
+        self.equity = np.zeros(0)
+        self.peak_equity = np.zeros(0)
+        self.consecutive_losses = np.zeros(0, dtype=np.int64)
+        self.active = np.zeros(0, dtype=bool)
+        self.tripped_at = np.zeros(0)
+        self.reason = np.zeros(0, dtype=np.int8)
+
+        self.max_drawdown = np.zeros(0)
+        self.max_consecutive_losses = np.zeros(0, dtype=np.int64)
+        self.max_volatility = np.zeros(0)
+
+    def __len__(self) -> int:
+        return len(self.equity)
+
+    def add(self, count: int = 1, limits: Union[RiskLimits, Sequence[RiskLimits]] = RiskLimits()) -> slice:
+        """
+        Appends `count` fresh portfolios; returns their index range
+        """
+        if isinstance(limits, RiskLimits):
+            limits = [limits] * count
+        if len(limits) != count:
+            raise ValueError("need one RiskLimits per portfolio")
+
+        start = len(self)
+        grow = lambda a, fill: np.concatenate((a, np.full(count, fill, dtype=a.dtype)))
+
+        self.equity = grow(self.equity, 0.0)
+        self.peak_equity = grow(self.peak_equity, 0.0)
+        self.consecutive_losses = grow(self.consecutive_losses, 0)
+        self.active = grow(self.active, True)
+        self.tripped_at = grow(self.tripped_at, np.nan)
+        self.reason = grow(self.reason, TRIP_NONE)
+
+        self.max_drawdown = np.concatenate((self.max_drawdown, [l.max_drawdown for l in limits]))
+        self.max_consecutive_losses = np.concatenate(
+            (self.max_consecutive_losses, np.array([l.max_consecutive_losses for l in limits], dtype=np.int64))
+        )
+        self.max_volatility = np.concatenate((self.max_volatility, [l.max_volatility for l in limits]))
+        return slice(start, len(self))
+
+    def set_limits(self, index, limits: RiskLimits):
+        self.max_drawdown[index] = limits.max_drawdown
+        self.max_consecutive_losses[index] = limits.max_consecutive_losses
+        self.max_volatility[index] = limits.max_volatility
+
+    def reset(self, index):
+        """
+        Re-arms portfolios (KillSwitch itself never re-arms; a new one is created)
+        """
+        self.equity[index] = 0.0
+        self.peak_equity[index] = 0.0
+        self.consecutive_losses[index] = 0
+        self.active[index] = True
+        self.tripped_at[index] = np.nan
+        self.reason[index] = TRIP_NONE
+
+    def update(self, pnl, volatility) -> np.ndarray:
+        """
+        pnl / volatility: arrays of len(self) or scalars (broadcast)
+        """
+        pnl = np.broadcast_to(np.asarray(pnl, dtype=float), self.equity.shape)
+        volatility = np.broadcast_to(np.asarray(volatility, dtype=float), self.equity.shape)
+        live = self.active
+
+        # 1️⃣ Drawdown (stopped books add 0; their peak >= equity already)
+        self.equity += pnl * live
+        np.maximum(self.peak_equity, self.equity, out=self.peak_equity)
+        drawdown = self.equity - self.peak_equity <= self.max_drawdown
+        drawdown &= live
+        live = live ^ drawdown
+
+        # 2️⃣ Consecutive losses
+        loss = pnl < 0
+        streak = (self.consecutive_losses + 1) * loss
+        np.copyto(self.consecutive_losses, np.where(live, streak, self.consecutive_losses))
+        losses = streak >= self.max_consecutive_losses
+        losses &= loss
+        losses &= live
+        live ^= losses
+
+        # 3️⃣ Volatility spike
+        spike = volatility >= self.max_volatility
+        spike &= live
+
+        tripped = drawdown | losses | spike
+        if tripped.any():
+            self.reason[drawdown] = TRIP_DRAWDOWN
+            self.reason[losses] = TRIP_LOSSES
+            self.reason[spike] = TRIP_VOLATILITY
+            self.tripped_at[tripped] = self.clock.time()
+            self.active ^= tripped
+        return self.active
+
+    def can_trade(self) -> np.ndarray:
+        return self.active
+
+    @property
+    def drawdown(self) -> np.ndarray:
+        return self.equity - self.peak_equity
+
+    def state(self, index: int) -> Dict:
+        tripped_at = self.tripped_at[index]
+        return {
+            "equity": float(self.equity[index]),
+            "peak_equity": float(self.peak_equity[index]),
+            "consecutive_losses": int(self.consecutive_losses[index]),
+            "active": bool(self.active[index]),
+            "tripped_at": None if np.isnan(tripped_at) else float(tripped_at),
+            "reason": int(self.reason[index]),
+        }
+
+    @classmethod
+    def from_switches(cls, switches: Sequence[KillSwitch], clock: Optional[Clock] = None) -> "RiskBook":
+        book = cls(clock or (switches[0].clock if switches else WALL_CLOCK))
+        book.add(len(switches), [ks.limits for ks in switches])
+        for i, ks in enumerate(switches):
+            book.equity[i] = ks.equity
+            book.peak_equity[i] = ks.peak_equity
+            book.consecutive_losses[i] = ks.consecutive_losses
+            book.active[i] = ks.active
+            book.tripped_at[i] = np.nan if ks.tripped_at is None else ks.tripped_at
+        return book
@@ -0,0 +1,184 @@
+# core/shared_state.py
+"""
+Q-NEXUS — Shared Bandit State (multi-worker)
+- BanditWeighter stats in a named shared-memory block
+- Seqlock reads (lock-free, retry on concurrent write)
+- Writers serialized by a cross-process lock
+Every uvicorn worker attached to the same name sees the same weights.
+"""
+
+from typing import Dict, List, Tuple
+import hashlib
+import struct
+import time
+
+from core.engine import BanditWeighter, Strategy, StrategyStats
+from db.shared import ShardLocks, attach_segment
+
+# seq | t | strategy-set fingerprint
+_HEADER = struct.Struct("<QqQ")
+_SEQ, _T, _FP = 0, 8, 16
+# weight | ewma_return | plays
+_STAT = struct.Struct("<ddq")
+
+_ATTACH_TIMEOUT = 5.0
+
+
+class SharedBanditWeighter(BanditWeighter):
+    """
+    Drop-in BanditWeighter whose state lives in shared memory.
+    `stats` / `t` are consistent snapshots (read-only views).
+    """
+
+    def __init__(self, strategies: List[Strategy], name: str, alpha: float = 0.1):
+        self.alpha = alpha
+        self.name = name
+        self.names = [s.name for s in strategies]
+        self._index = {n: i for i, n in enumerate(self.names)}
+        self._body = struct.Struct("<" + "ddq" * len(self.names))
+
+        digest = hashlib.blake2b("\0".join(self.names).encode(), digest_size=8).digest()
+        self._fingerprint = int.from_bytes(digest, "little") | 1
+
+        self._shm, _ = attach_segment(name, _HEADER.size + self._body.size)
+        self._buf = self._shm.buf
+        self._lock = ShardLocks(name, 1)
+        self._cached: Tuple[int, Dict[str, float]] = (-1, {})
+        self._init_segment()
+
+    def _store(self, offset: int, value: int, signed: bool = False):
+        # كلمة واحدة بنسخة واحدة: pack_into يصفّر الحقول أولًا، فقد يرى
+        # قارئ seq=0 (زوجي) أثناء الكتابة ويقبل حالة ممزقة
+        self._buf[offset:offset + 8] = value.to_bytes(8, "little", signed=signed)
+
+    def _init_segment(self):
+        self._lock.acquire(0)
+        try:
+            _, _, fingerprint = _HEADER.unpack_from(self._buf, 0)
+            if fingerprint == 0:
+                # أول عامل: نفس القيم الابتدائية لـ BanditWeighter
+                values = []
+                for _ in self.names:
+                    values += [1.0, 0.0, 0]
+                self._body.pack_into(self._buf, _HEADER.size, *values)
+                self._store(_FP, self._fingerprint)
+            elif fingerprint != self._fingerprint:
+                raise ValueError(
+                    f"Shared bandit state {self.name!r} was created for a different strategy set"
+                )
+        finally:
+            self._lock.release(0)
+
+    # =========================
+    # SEQLOCK
+    # =========================
+    def _read(self) -> Tuple[int, int, tuple]:
+        buf = self._buf
+        deadline = None
+        while True:
+            seq = _HEADER.unpack_from(buf, 0)[0]
+            if not seq & 1:
+                _, t, _ = _HEADER.unpack_from(buf, 0)
+                body = self._body.unpack_from(buf, _HEADER.size)
+                if _HEADER.unpack_from(buf, 0)[0] == seq:
+                    return seq, t, body
+
+            # كاتب في منتصف التحديث
+            if deadline is None:
+                deadline = time.monotonic() + _ATTACH_TIMEOUT
+            elif time.monotonic() > deadline:
+                raise RuntimeError("Shared bandit state is stuck mid-write")
+
+    def _stats(self, body: tuple) -> Dict[str, StrategyStats]:
+        return {
+            n: StrategyStats(weight=body[3 * i], ewma_return=body[3 * i + 1], plays=body[3 * i + 2])
+            for i, n in enumerate(self.names)
+        }
+
+    def snapshot(self) -> Tuple[Dict[str, StrategyStats], int]:
+        _, t, body = self._read()
+        return self._stats(body), t
+
+    @property
+    def stats(self) -> Dict[str, StrategyStats]:
+        return self.snapshot()[0]
+
+    @property
+    def t(self) -> int:
+        return self._read()[1]
+
+    @property
+    def seq(self) -> int:
+        return self._read()[0]
+
+    @property
+    def version(self) -> int:
+        # seq يزيد مع كل كتابة في أي عامل (زوجي فقط: لا نُرجع حالة نصف مكتوبة)
+        return self._read()[0]
+
+    def score(self, name: str) -> float:
+        stats, t = self.snapshot()
+        return self._score(stats[name], t)
+
+    def normalized_weights(self) -> Dict[str, float]:
+        # المسار السريع: لا كتابة منذ آخر قراءة
+        seq = _HEADER.unpack_from(self._buf, 0)[0]
+        cached_seq, weights = self._cached
+        if seq == cached_seq:
+            return dict(weights)
+
+        seq, t, body = self._read()
+        weights = self._normalize(self._stats(body), t)
+        self._cached = (seq, weights)
+        return dict(weights)
+
+    # =========================
+    # WRITES
+    # =========================
+    def update(self, name: str, realized_return: float):
+        i = self._index[name]
+        off = _HEADER.size + i * _STAT.size
+        buf = self._buf
+
+        self._lock.acquire(0)
+        try:
+            seq, t, _ = _HEADER.unpack_from(buf, 0)
+            self._store(_SEQ, seq + 1)                         # odd: كتابة جارية
+
+            weight, ewma, plays = _STAT.unpack_from(buf, off)
+            ewma = (1 - self.alpha) * ewma + self.alpha * realized_return
+            _STAT.pack_into(buf, off, weight, ewma, plays + 1)
+
+            self._store(_T, t + 1, signed=True)
+            self._store(_SEQ, seq + 2)                         # even: مكتمل
+        finally:
+            self._lock.release(0)
+
+    def restore(self, stats: Dict[str, StrategyStats], t: int) -> bool:
+        """
+        Seed a fresh segment from a snapshot. A segment that has already
+        seen updates is live state from other workers and wins.
+        """
+        buf = self._buf
+
+        self._lock.acquire(0)
+        try:
+            seq = _HEADER.unpack_from(buf, 0)[0]
+            if seq != 0:
+                return False
+
+            self._store(_SEQ, seq + 1)
+            for name, st in stats.items():
+                if name in self._index:
+                    off = _HEADER.size + self._index[name] * _STAT.size
+                    _STAT.pack_into(buf, off, st.weight, st.ewma_return, st.plays)
+            self._store(_T, t, signed=True)
+            self._store(_SEQ, seq + 2)
+            return True
+        finally:
+            self._lock.release(0)
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+        self._lock.close()
@@ -0,0 +1,321 @@
+# core/simulation.py
+"""
+Q-NEXUS — Walk-Forward & Monte-Carlo Simulation
+- Drives the real DecisionEngine + PaperTrader over historical bars
+  (rolling window -> decide -> paper execution -> gated learning)
+- In-sample warm-up: bandit priors from each strategy's signal return
+  on the first bars (a cold bandit has all-zero weights and only ever HOLDs)
+- Monte-Carlo paths: bootstrapped returns / shuffled return blocks
+- Independent paths spread over a ProcessPoolExecutor,
+  aggregated into distribution metrics
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+import math
+import os
+
+import numpy as np
+
+from core.engine import DecisionEngine, MarketStateEngine
+from core.paper_trader import PaperTrader
+from core.risk_control import KillSwitch, RiskLimits, realized_volatility
+
+WINDOW = 60            # bars seen by each decide()
+FOLD_BARS = 500        # walk-forward reporting period
+BLOCK_BARS = 50        # block shuffle length
+WARMUP_BARS = 1000     # in-sample bars used to seed the bandit
+PRIOR_PLAYS = 50       # weight of the seeded prior (bandit plays per strategy)
+
+# حدود المحاكاة: مسار كامل لا يُوقف عند أول 3 خسائر متتالية
+SIM_LIMITS = RiskLimits(max_drawdown=-0.2, max_consecutive_losses=10, max_volatility=0.05)
+
+METHODS = ("bootstrap", "block")
+DISTRIBUTION_KEYS = ("net_profit", "max_drawdown", "sharpe_ratio", "trades", "win_rate")
+
+
+class InactiveSimulationError(ValueError):
+    pass
+
+
+class TradeRecorder:
+    """
+    In-memory PaperTrader.trade_log sink (keeps simulations out of TRADE_STORE)
+    """
+
+    def __init__(self):
+        self.pnl: List[float] = []
+
+    def __call__(self, *, pnl: float = 0.0, **_):
+        self.pnl.append(pnl)
+
+
+def _metrics(pnl: np.ndarray) -> Dict:
+    closed = pnl[pnl != 0.0]
+    equity = np.cumsum(pnl)
+    peak = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:]
+    std = float(pnl.std()) if len(pnl) > 1 else 0.0
+
+    return {
+        "net_profit": float(equity[-1]) if len(equity) else 0.0,
+        "max_drawdown": float((peak - equity).max()) if len(equity) else 0.0,
+        "sharpe_ratio": float(pnl.mean()) / std if std != 0 else 0.0,
+        "trades": int(len(closed)),
+        "win_rate": float((closed > 0).mean()) if len(closed) else 0.0,
+    }
+
+
+# =========================
+# WARM-UP
+# =========================
+def prime_engine(engine: DecisionEngine, prices, volumes, window: int = WINDOW, plays: int = PRIOR_PLAYS) -> Dict[str, float]:
+    """
+    Seeds the bandit with each strategy's in-sample signal return
+    (signal held as a position: Σ signal[t] × return[t+1]),
+    fed `plays` times. Returns the priors.
+    """
+    p = np.asarray(prices, dtype=float)
+    v = np.asarray(volumes, dtype=float)
+    s = MarketStateEngine.compute_batch(
+        np.lib.stride_tricks.sliding_window_view(p, window),
+        np.lib.stride_tricks.sliding_window_view(v, window)
+    )
+    forward = np.diff(p[window - 1:]) / p[window - 1:-1]
+    priors = {st.name: float(np.dot(st.signal_batch(s)[:-1], forward)) for st in engine.strategies}
+
+    for _ in range(plays):
+        for name, r in priors.items():
+            engine.weighter.update(name, r)
+    return priors
+
+
+# =========================
+# WALK-FORWARD
+# =========================
+def walk_forward(
+    prices,
+    volumes,
+    window: int = WINDOW,
+    fold: int = FOLD_BARS,
+    engine_factory: Callable[[], DecisionEngine] = DecisionEngine,
+    limits: Optional[RiskLimits] = SIM_LIMITS,
+    symbol: str = "SIM",
+    warmup: int = WARMUP_BARS
+) -> Dict:
+    """
+    Seeds a fresh engine on the first `warmup` bars (prime_engine),
+    then replays the remaining bars one by one (out of sample).
+    Stops early once the kill switch trips (it never re-arms).
+    limits=None keeps the PaperTrader default RiskLimits.
+    """
+    p = np.asarray(prices, dtype=float)
+    v = np.asarray(volumes, dtype=float)
+    if len(p) != len(v):
+        raise ValueError("prices and volumes must have the same length")
+    if window < 20:
+        raise ValueError("need window >= 20")
+    if warmup and warmup < window:
+        raise ValueError("warmup must be 0 or at least `window` bars")
+    if len(p) < max(window, warmup) + 1:
+        raise ValueError("need more bars than max(window, warmup)")
+
+    recorder = TradeRecorder()
+    engine = engine_factory()
+    priors = prime_engine(engine, p[:warmup], v[:warmup], window) if warmup else {}
+
+    # المحاكاة: التذبذب الفعلي للنافذة بدل وسم risk (HIGH شبه دائم → إيقاف من أول شمعة)
+    trader = PaperTrader(
+        engine,
+        symbol=symbol,
+        market="simulation",
+        trade_log=recorder,
+        volatility_of=lambda window, _: realized_volatility(window)
+    )
+    if limits is not None:
+        trader.kill_switch = KillSwitch(limits, clock=trader.clock)
+
+    folds = []
+    logged = 0
+    killed_at = None
+    first = max(window, warmup + 1)
+
+    for end in range(first, len(p) + 1):
+        trader.step(p[end - window:end], v[end - window:end])
+
+        if not trader.kill_switch.can_trade():
+            killed_at = end - 1
+
+        if killed_at is not None or (end - first + 1) % fold == 0 or end == len(p):
+            fold_pnl = np.asarray(recorder.pnl[logged:])
+            logged = len(recorder.pnl)
+            folds.append({
+                "end": end - 1,
+                "pnl": float(fold_pnl.sum()),
+                "trades": int(np.count_nonzero(fold_pnl)),
+                "weights": trader.engine.weighter.normalized_weights(),
+            })
+
+        if killed_at is not None:
+            break
+
+    result = _metrics(np.asarray(recorder.pnl))
+    result.update({
+        "bars": (killed_at if killed_at is not None else len(p) - 1) - first + 2,
+        "killed_at": killed_at,
+        "priors": priors,
+        "learning": trader.engine.history.stats()["counts"],
+        "weights": trader.engine.weighter.normalized_weights(),
+        "folds": folds,
+    })
+    return result
+
+
+# =========================
+# MONTE-CARLO PATHS
+# =========================
+def resample_path(prices, volumes, rng: np.random.Generator, method: str = "bootstrap", block: int = BLOCK_BARS):
+    """
+    New price path from the log returns of `prices`:
+    - bootstrap: returns drawn i.i.d. with replacement
+    - block: blocks of `block` returns in shuffled order
+    Volumes follow the resampled bars.
+    """
+    p = np.asarray(prices, dtype=float)
+    v = np.asarray(volumes, dtype=float)
+    r = np.diff(np.log(p))
+    n = len(r)
+
+    if method == "bootstrap":
+        idx = rng.integers(0, n, n)
+    elif method == "block":
+        starts = rng.permutation(np.arange(0, n, block))
+        idx = np.concatenate([np.arange(s, min(s + block, n)) for s in starts])
+    else:
+        raise ValueError(f"Unknown resampling method {method!r} (expected one of {METHODS})")
+
+    path = p[0] * np.exp(np.concatenate(([0.0], np.cumsum(r[idx]))))
+    return path, np.concatenate((v[:1], v[1:][idx]))
+
+
+_WORKER: Dict = {}
+
+def _init_worker(prices: np.ndarray, volumes: np.ndarray, method: str, block: int, options: Dict):
+    _WORKER.update(prices=prices, volumes=volumes, method=method, block=block, options=options)
+
+
+def _run_path(seed: np.random.SeedSequence) -> Dict:
+    w = _WORKER
+    rng = np.random.default_rng(seed)
+    prices, volumes = resample_path(w["prices"], w["volumes"], rng, w["method"], w["block"])
+    result = walk_forward(prices, volumes, **w["options"])
+    result.pop("folds")
+    return result
+
+
+def distribution(runs: List[Dict]) -> Dict:
+    """
+    Per-metric mean / std / percentiles over independent runs
+    """
+    out = {}
+    for key in DISTRIBUTION_KEYS:
+        x = np.array([r[key] for r in runs], dtype=float)
+        p5, p50, p95 = np.percentile(x, [5, 50, 95])
+        out[key] = {
+            "mean": float(x.mean()),
+            "std": float(x.std()),
+            "min": float(x.min()),
+            "p5": float(p5),
+            "p50": float(p50),
+            "p95": float(p95),
+            "max": float(x.max()),
+        }
+
+    net = np.array([r["net_profit"] for r in runs])
+    out["prob_loss"] = float((net < 0).mean())
+    out["killed_rate"] = float(np.mean([r["killed_at"] is not None for r in runs]))
+    out["idle_rate"] = float(np.mean([r["trades"] == 0 for r in runs]))
+
+    names = runs[0]["weights"].keys()
+    out["weights"] = {n: float(np.mean([r["weights"][n] for r in runs])) for n in names}
+    return out
+
+
+def check_activity(runs: List[Dict]):
+    """
+    Raises InactiveSimulationError when a path never trades or every
+    path is killed: the distribution would describe a simulator that
+    does nothing.
+    """
+    idle = [i for i, r in enumerate(runs) if r["trades"] == 0]
+    if idle:
+        raise InactiveSimulationError(f"{len(idle)}/{len(runs)} paths made no trades (first: path {idle[0]})")
+    if all(r["killed_at"] is not None for r in runs):
+        raise InactiveSimulationError(f"Kill switch tripped on all {len(runs)} paths")
+
+
+def monte_carlo(
+    prices,
+    volumes,
+    paths: int = 1000,
+    method: str = "bootstrap",
+    block: int = BLOCK_BARS,
+    seed: int = 0,
+    workers: Optional[int] = None,
+    strict: bool = True,
+    **options
+) -> Dict:
+    """
+    Runs walk_forward over `paths` resampled paths in a process pool.
+    Path i always uses the i-th child of SeedSequence(seed), so results
+    do not depend on the worker count. `options` go to walk_forward
+    (engine_factory must be picklable: a class or module-level function).
+    strict: check_activity() on the runs before aggregating.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown resampling method {method!r} (expected one of {METHODS})")
+    if paths < 1:
+        raise ValueError("paths must be >= 1")
+
+    p = np.asarray(prices, dtype=float)
+    v = np.asarray(volumes, dtype=float)
+    if (p <= 0).any():
+        raise ValueError("Monte-Carlo resampling needs strictly positive prices")
+
+    workers = workers or os.cpu_count() or 1
+    seeds = np.random.SeedSequence(seed).spawn(paths)
+    chunksize = max(1, math.ceil(paths / (workers * 4)))
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(p, v, method, block, options)
+    ) as pool:
+        runs = list(pool.map(_run_path, seeds, chunksize=chunksize))
+
+    if strict:
+        check_activity(runs)
+
+    return {
+        "paths": paths,
+        "method": method,
+        "seed": seed,
+        "runs": runs,
+        "distribution": distribution(runs),
+    }
+
+
+# =========================
+# USAGE EXAMPLE
+# =========================
+if __name__ == "__main__":
+    rng = np.random.default_rng(7)
+    # اتجاهات متعاقبة (صعود / تذبذب / هبوط) كل 200 شمعة
+    drift = np.repeat(rng.choice([-0.0015, 0.0, 0.0015], 25), 200)
+    prices = 100 * np.exp(np.cumsum(drift + rng.normal(0, 0.004, 5000)))
+    volumes = rng.integers(100, 1000, 5000).astype(float)
+
+    base = walk_forward(prices, volumes)
+    print({k: base[k] for k in DISTRIBUTION_KEYS + ("bars", "killed_at", "priors")})
+
+    mc = monte_carlo(prices, volumes, paths=32, method="block", block=200)
+    print(mc["distribution"])
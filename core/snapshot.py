@@ -0,0 +1,303 @@
+# core/snapshot.py
+"""
+Q-NEXUS — Engine State Snapshots (warm restarts)
+- DecisionEngine (bandit stats + learning history), KillSwitch, PaperTrader
+- Compact tagged binary sections, CRC32-checked
+- Atomic writes (temp file + fsync + rename)
+Restoring is a single file read; no trade replay.
+"""
+
+from typing import Dict, Optional
+import json
+import math
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+
+from core.backtest import encode_decisions
+from core.engine import DecisionEngine, StrategyStats
+from core.paper_trader import PaperTrader
+
+MAGIC = b"QNXS"
+VERSION = 1
+
+TAG_BANDIT = 1
+TAG_HISTORY = 2
+TAG_KILL_SWITCH = 3
+TAG_TRADER = 4
+
+# magic | version | body length
+_HEADER = struct.Struct("<4sHI")
+_CRC = struct.Struct("<I")
+# tag | payload length
+_SECTION = struct.Struct("<BI")
+
+# alpha | t | strategies
+_BANDIT = struct.Struct("<dqH")
+# weight | ewma_return | plays
+_STAT = struct.Struct("<ddq")
+# equity | peak_equity | consecutive_losses | active
+_KILL = struct.Struct("<ddI?")
+# tripped_at (NaN: still armed); optional, appended after _KILL
+_TRIPPED = struct.Struct("<d")
+# has position | entry_price | buffered decisions
+_TRADER = struct.Struct("<?dI")
+# quantity; optional, appended after the decision codes (older snapshots: 1 unit)
+_QUANTITY = struct.Struct("<d")
+# optional, after _QUANTITY: the price paired with each buffered decision
+# (<f8 × buffered decisions); the running gate state is replayed from them
+_NAME = struct.Struct("<H")
+
+_DECISIONS = {1: "BUY", 0: "HOLD", -1: "SELL"}
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _pack_name(name: str) -> bytes:
+    raw = name.encode("utf-8")
+    return _NAME.pack(len(raw)) + raw
+
+
+def _unpack_name(buf: memoryview, off: int):
+    (n,) = _NAME.unpack_from(buf, off)
+    off += _NAME.size
+    return bytes(buf[off:off + n]).decode("utf-8"), off + n
+
+
+# =========================
+# ENCODE
+# =========================
+def _bandit_section(engine: DecisionEngine) -> bytes:
+    weighter = engine.weighter
+    stats, t = weighter.snapshot()
+    out = [_BANDIT.pack(weighter.alpha, t, len(stats))]
+    for name, st in stats.items():
+        out.append(_pack_name(name))
+        out.append(_STAT.pack(st.weight, st.ewma_return, st.plays))
+    return b"".join(out)
+
+
+def _history_section(engine: DecisionEngine) -> bytes:
+    state = engine.history.export_state()
+    return zlib.compress(json.dumps(state, separators=(",", ":")).encode(), 1)
+
+
+def _kill_switch_section(trader: PaperTrader) -> bytes:
+    ks = trader.kill_switch
+    tripped_at = math.nan if ks.tripped_at is None else ks.tripped_at
+    return _KILL.pack(ks.equity, ks.peak_equity, ks.consecutive_losses, ks.active) + _TRIPPED.pack(tripped_at)
+
+
+def _trader_section(trader: PaperTrader) -> bytes:
+    codes = encode_decisions(trader.decisions_buffer)
+    has_position = trader.position == "LONG"
+    return b"".join((
+        _pack_name(trader.symbol),
+        _TRADER.pack(has_position, trader.entry_price if has_position else 0.0, len(codes)),
+        codes.tobytes(),
+        _QUANTITY.pack(trader.quantity),
+        np.asarray(trader.gate_prices, dtype="<f8").tobytes(),
+    ))
+
+
+def dumps(engine: DecisionEngine, trader: Optional[PaperTrader] = None) -> bytes:
+    sections = [
+        (TAG_BANDIT, _bandit_section(engine)),
+        (TAG_HISTORY, _history_section(engine)),
+    ]
+    if trader is not None:
+        sections.append((TAG_KILL_SWITCH, _kill_switch_section(trader)))
+        sections.append((TAG_TRADER, _trader_section(trader)))
+
+    body = b"".join(_SECTION.pack(tag, len(payload)) + payload for tag, payload in sections)
+    return _HEADER.pack(MAGIC, VERSION, len(body)) + body + _CRC.pack(zlib.crc32(body))
+
+
+# =========================
+# DECODE
+# =========================
+def _sections(blob: bytes) -> Dict[int, memoryview]:
+    buf = memoryview(blob)
+    if len(buf) < _HEADER.size + _CRC.size:
+        raise SnapshotError("Snapshot is truncated")
+
+    magic, version, length = _HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise SnapshotError("Not a Q-NEXUS snapshot")
+    if version != VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version}")
+    if len(buf) != _HEADER.size + length + _CRC.size:
+        raise SnapshotError("Snapshot is truncated")
+
+    body = buf[_HEADER.size:_HEADER.size + length]
+    if zlib.crc32(body) != _CRC.unpack_from(buf, _HEADER.size + length)[0]:
+        raise SnapshotError("Snapshot checksum mismatch")
+
+    sections = {}
+    off = 0
+    while off < length:
+        tag, n = _SECTION.unpack_from(body, off)
+        off += _SECTION.size
+        sections[tag] = body[off:off + n]
+        off += n
+    return sections
+
+
+def _decode_bandit(buf: memoryview):
+    _, t, count = _BANDIT.unpack_from(buf, 0)
+    off = _BANDIT.size
+    stats = {}
+    for _ in range(count):
+        name, off = _unpack_name(buf, off)
+        stats[name] = StrategyStats(*_STAT.unpack_from(buf, off))
+        off += _STAT.size
+    return stats, t
+
+
+def _decode_history(buf: memoryview) -> Dict:
+    state = json.loads(zlib.decompress(buf))
+    records, improvement = state["records"], state["improvement"]
+    if any(len(r) != 6 for r in records) or len(improvement) != 5:
+        raise SnapshotError("Corrupt snapshot: malformed history section")
+    int(state["total"]), float(state["pnl_sum"]), dict(state["counts"])
+    return state
+
+
+def _decode_trader(trader: PaperTrader, kill: memoryview, buf: memoryview) -> Dict:
+    symbol, off = _unpack_name(buf, 0)
+    if symbol != trader.symbol:
+        raise SnapshotError(f"Snapshot belongs to {symbol!r}, not {trader.symbol!r}")
+
+    has_position, entry_price, n = _TRADER.unpack_from(buf, off)
+    off += _TRADER.size
+    if len(buf) < off + n:
+        raise SnapshotError("Corrupt snapshot: truncated decision buffer")
+    codes = np.frombuffer(buf, dtype=np.int8, count=n, offset=off)
+    off += n
+    if len(buf) >= off + _QUANTITY.size:
+        (quantity,) = _QUANTITY.unpack_from(buf, off)
+        off += _QUANTITY.size
+    else:
+        quantity = 1.0 if has_position else 0.0
+
+    decisions = [_DECISIONS[c] for c in codes.tolist()]
+    gate_prices = []
+    if n and len(buf) >= off + n * 8:
+        gate_prices = np.frombuffer(buf, dtype="<f8", count=n, offset=off).tolist()
+    # لقطة أقدم بلا الأسعار → البوابة تعود إلى approve() الكامل حتى تفريغ النافذة
+    gate = trader.engine.gate
+    gate_state = gate.backtester.advance(gate.start(), gate_prices, decisions)
+
+    state = {
+        "position": "LONG" if has_position else None,
+        "entry_price": entry_price if has_position else None,
+        "quantity": quantity if has_position else 0.0,
+        "decisions": decisions,
+        "gate_state": gate_state,
+        "gate_prices": gate_prices,
+        "kill": _KILL.unpack_from(kill, 0),
+    }
+    if len(kill) >= _KILL.size + _TRIPPED.size:
+        (tripped_at,) = _TRIPPED.unpack_from(kill, _KILL.size)
+        state["tripped_at"] = None if math.isnan(tripped_at) else tripped_at
+    return state
+
+
+def _apply_trader(trader: PaperTrader, state: Dict):
+    trader.position = state["position"]
+    trader.entry_price = state["entry_price"]
+    trader.quantity = state["quantity"]
+    trader.decisions_buffer = state["decisions"]
+    trader.gate_state = state["gate_state"]
+    trader.gate_prices = state["gate_prices"]
+
+    ks = trader.kill_switch
+    ks.equity, ks.peak_equity, ks.consecutive_losses, ks.active = state["kill"]
+    if "tripped_at" in state:
+        ks.tripped_at = state["tripped_at"]
+
+
+def loads(blob: bytes, engine: DecisionEngine, trader: Optional[PaperTrader] = None) -> Dict:
+    """
+    Restores state in place. Returns which parts were applied.
+    Every section is decoded first: a corrupt snapshot changes nothing.
+    """
+    sections = _sections(blob)
+    try:
+        bandit = history = trader_state = None
+        if trader is not None and TAG_TRADER in sections:
+            trader_state = _decode_trader(trader, sections[TAG_KILL_SWITCH], sections[TAG_TRADER])
+        if TAG_BANDIT in sections:
+            bandit = _decode_bandit(sections[TAG_BANDIT])
+        if TAG_HISTORY in sections:
+            history = _decode_history(sections[TAG_HISTORY])
+    except (struct.error, KeyError, TypeError, ValueError, zlib.error) as e:
+        if isinstance(e, SnapshotError):
+            raise
+        raise SnapshotError(f"Corrupt snapshot: {e}") from e
+
+    applied = {"bandit": False, "history": False, "trader": False}
+    if trader_state is not None:
+        _apply_trader(trader, trader_state)
+        applied["trader"] = True
+    if bandit is not None:
+        applied["bandit"] = engine.weighter.restore(*bandit)
+    if history is not None:
+        engine.history.restore_state(history)
+        applied["history"] = True
+    return applied
+
+
+# =========================
+# FILES
+# =========================
+def snapshot_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.qnxs")
+
+
+def save_snapshot(path: str, engine: DecisionEngine, trader: Optional[PaperTrader] = None) -> int:
+    """
+    Atomic write: a crash leaves either the old or the new snapshot
+    """
+    blob = dumps(engine, trader)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    # اسم مؤقت فريد: كاتبان على نفس المسار لا يتشاركان الملف المؤقت
+    fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return len(blob)
+
+
+def load_snapshot(path: str, engine: DecisionEngine, trader: Optional[PaperTrader] = None) -> Optional[Dict]:
+    """
+    None when no snapshot exists (cold start)
+    """
+    try:
+        with open(path, "rb") as f:
+            blob = f.read()
+    except FileNotFoundError:
+        return None
+    return loads(blob, engine, trader)
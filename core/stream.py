@@ -0,0 +1,121 @@
+# core/stream.py
+"""
+Q-NEXUS — Streaming Decision Sessions
+- One session per (api_key, symbol): server-side rolling window
+  (RollingMarketState) → clients push single bars
+- Decisions are pushed back only when they change
+- Bounded registry: idle sessions expire, LRU eviction under a cap
+Event-loop only (no locking).
+"""
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Optional, Sequence, Tuple
+import time
+
+if TYPE_CHECKING:
+    from core.engine import DecisionEngine
+
+STREAM_WINDOW = 50
+MAX_STREAM_WINDOW = 1000
+MAX_STREAM_SESSIONS = 10_000
+STREAM_IDLE_SECONDS = 900
+
+
+class StreamSession:
+    __slots__ = ("symbol", "rolling", "last_decision", "bars", "touched")
+
+    def __init__(self, symbol: str, window: int = STREAM_WINDOW):
+        from core.engine import RollingMarketState      # NumPy: أول جلسة فقط
+
+        self.symbol = symbol
+        self.rolling = RollingMarketState(window)
+        self.last_decision: Optional[str] = None
+        self.bars = 0
+        self.touched = time.monotonic()
+
+    @property
+    def window(self) -> int:
+        return self.rolling.window
+
+    def push(
+        self,
+        engine: "DecisionEngine",
+        prices: Sequence[float],
+        volumes: Sequence[float]
+    ) -> Optional[Dict]:
+        """
+        Adds the bars, then decides once on the resulting window.
+        Returns the decision only if it differs from the last one pushed.
+        """
+        rolling = self.rolling
+        for price, volume in zip(prices, volumes):
+            rolling.push(price, volume)
+        self.bars += len(prices)
+
+        if not rolling.ready:
+            return None
+
+        out = engine.decide_state(rolling.state())
+        if out["decision"] == self.last_decision:
+            return None
+
+        self.last_decision = out["decision"]
+        return out
+
+
+class SessionRegistry:
+    """
+    (api_key, symbol) → StreamSession, least recently used first.
+    A reconnecting client resumes its window.
+    """
+
+    def __init__(self, max_sessions: int = MAX_STREAM_SESSIONS, idle_seconds: float = STREAM_IDLE_SECONDS):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[Tuple[str, str], StreamSession]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def open(self, api_key: str, symbol: str, window: int = STREAM_WINDOW) -> StreamSession:
+        key = (api_key, symbol)
+        session = self._sessions.get(key)
+        if session is not None and session.window == window:
+            self.touch(api_key, session)
+            return session
+
+        self.evict_idle()
+        self._sessions.pop(key, None)
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+        session = StreamSession(symbol, window)
+        self._sessions[key] = session
+        return session
+
+    def touch(self, api_key: str, session: StreamSession):
+        session.touched = time.monotonic()
+        key = (api_key, session.symbol)
+        if key in self._sessions:
+            self._sessions.move_to_end(key)
+
+    def close(self, api_key: str, symbol: str):
+        self._sessions.pop((api_key, symbol), None)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Oldest-first scan; stops at the first session still in use
+        """
+        cutoff = (time.monotonic() if now is None else now) - self.idle_seconds
+        evicted = 0
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if session.touched > cutoff:
+                break
+            del self._sessions[key]
+            evicted += 1
+
+        self.evictions += evicted
+        return evicted
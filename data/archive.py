@@ -0,0 +1,384 @@
+# data/archive.py
+"""
+Q-NEXUS — Local Kline Archive (offline market data)
+- One file per (symbol, interval), columnar: open_time | open | high | low | close | volume
+- Memory-mapped; range queries return zero-copy NumPy views
+- CSV importer (Binance kline dumps)
+- ArchiveFeed: network-free replay, drop-in for fetch_crypto
+Single writer per file; readers call refresh() to see new bars.
+"""
+
+from typing import Dict, Optional, Tuple
+import argparse
+import os
+import struct
+
+import numpy as np
+
+from core.clock import Clock
+
+MAGIC = b"QKLA"
+VERSION = 1
+HEADER_BYTES = 64
+INITIAL_CAPACITY = 4096
+
+# magic | version | columns | capacity | count
+_HEADER = struct.Struct("<4sHHqq")
+_COUNT_OFFSET = 16
+
+COLUMNS = ("open_time", "open", "high", "low", "close", "volume")
+_DTYPES = {name: np.dtype("<i8" if name == "open_time" else "<f8") for name in COLUMNS}
+_ITEM = 8
+
+SUFFIX = ".qka"
+
+
+def archive_path(directory: str, symbol: str, interval: str) -> str:
+    return os.path.join(directory, f"{symbol}-{interval}{SUFFIX}")
+
+
+def _file_size(capacity: int) -> int:
+    return HEADER_BYTES + len(COLUMNS) * capacity * _ITEM
+
+
+class KlineArchive:
+    """
+    Memory-mapped columnar kline file.
+    Bars are kept sorted by open_time; appending a bar with the last
+    open_time replaces it (still-forming bar), older bars are dropped.
+    Capacity doubles on demand (rewritten and atomically swapped).
+    """
+
+    def __init__(self, path: str, writable: bool = False, capacity: int = INITIAL_CAPACITY):
+        self.path = path
+        self.writable = writable
+
+        if not os.path.exists(path):
+            if not writable:
+                raise FileNotFoundError(path)
+            self._create(path, capacity, {})
+        self._map()
+
+    # =========================
+    # FILE LAYOUT
+    # =========================
+    @staticmethod
+    def _create(path: str, capacity: int, data: Dict[str, np.ndarray]):
+        count = len(data["open_time"]) if data else 0
+        tmp = f"{path}.tmp"
+
+        mm = np.memmap(tmp, dtype=np.uint8, mode="w+", shape=(_file_size(capacity),))
+        _HEADER.pack_into(mm, 0, MAGIC, VERSION, len(COLUMNS), capacity, count)
+        for i, name in enumerate(COLUMNS):
+            if count:
+                off = HEADER_BYTES + i * capacity * _ITEM
+                mm[off:off + count * _ITEM].view(_DTYPES[name])[:] = data[name]
+        mm.flush()
+        del mm
+
+        os.replace(tmp, path)
+
+    def _map(self):
+        mm = np.memmap(self.path, dtype=np.uint8, mode="r+" if self.writable else "r")
+        magic, version, ncols, capacity, _ = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a kline archive")
+        if version != VERSION or ncols != len(COLUMNS):
+            raise ValueError(f"Unsupported kline archive layout in {self.path}")
+
+        self._mm = mm
+        self.capacity = capacity
+        self._count = mm[_COUNT_OFFSET:_COUNT_OFFSET + 8].view("<i8")
+        self._columns = {
+            name: mm[
+                HEADER_BYTES + i * capacity * _ITEM:
+                HEADER_BYTES + (i + 1) * capacity * _ITEM
+            ].view(_DTYPES[name])
+            for i, name in enumerate(COLUMNS)
+        }
+
+    def refresh(self):
+        """
+        Re-map after another process appended (or grew the file)
+        """
+        self._map()
+
+    def __len__(self) -> int:
+        return int(self._count[0])
+
+    # =========================
+    # READS (zero-copy views)
+    # =========================
+    def column(self, name: str) -> np.ndarray:
+        return self._columns[name][:len(self)]
+
+    @property
+    def open_time(self) -> np.ndarray:
+        return self.column("open_time")
+
+    @property
+    def last_open(self) -> Optional[int]:
+        n = len(self)
+        return int(self._columns["open_time"][n - 1]) if n else None
+
+    def span(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Row bounds for start <= open_time < end (milliseconds)
+        """
+        t = self.open_time
+        lo = 0 if start is None else int(np.searchsorted(t, start, "left"))
+        hi = len(t) if end is None else int(np.searchsorted(t, end, "left"))
+        return lo, max(lo, hi)
+
+    def range(
+        self,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        columns: Tuple[str, ...] = ("close", "volume")
+    ) -> Tuple[np.ndarray, ...]:
+        """
+        Views (no copy) of `columns` for start <= open_time < end.
+        Default (closes, volumes) feeds MarketStateEngine.compute /
+        BacktestEngine.run directly.
+        """
+        lo, hi = self.span(start, end)
+        return tuple(self._columns[name][lo:hi] for name in columns)
+
+    def rows(self, lo: int, hi: int, columns: Tuple[str, ...] = ("close", "volume")) -> Tuple[np.ndarray, ...]:
+        lo, hi = max(lo, 0), min(hi, len(self))
+        return tuple(self._columns[name][lo:hi] for name in columns)
+
+    # =========================
+    # WRITES
+    # =========================
+    def append(self, open_time, open_, high, low, close, volume) -> int:
+        """
+        Appends bars (arrays or scalars). Returns the number of new rows.
+        """
+        if not self.writable:
+            raise PermissionError(f"{self.path} was opened read-only")
+
+        t = np.atleast_1d(np.asarray(open_time, dtype=np.int64))
+        values = {
+            "open_time": t,
+            "open": np.atleast_1d(np.asarray(open_, dtype=float)),
+            "high": np.atleast_1d(np.asarray(high, dtype=float)),
+            "low": np.atleast_1d(np.asarray(low, dtype=float)),
+            "close": np.atleast_1d(np.asarray(close, dtype=float)),
+            "volume": np.atleast_1d(np.asarray(volume, dtype=float)),
+        }
+        if any(len(v) != len(t) for v in values.values()):
+            raise ValueError("all kline columns must have the same length")
+        if not len(t):
+            return 0
+
+        # ترتيب + إزالة التكرار (آخر نسخة من الشمعة هي الصحيحة)
+        order = np.argsort(t, kind="stable")
+        t = t[order]
+        keep = np.append(t[1:] != t[:-1], True)
+        values = {k: v[order][keep] for k, v in values.items()}
+        t = values["open_time"]
+
+        n = len(self)
+        last = self.last_open
+        if last is not None:
+            i = int(np.searchsorted(t, last))
+            if i < len(t) and t[i] == last:
+                # الشمعة الأخيرة ما زالت تتشكل → تُستبدل
+                for name in COLUMNS:
+                    self._columns[name][n - 1] = values[name][i]
+            newer = t > last
+            values = {k: v[newer] for k, v in values.items()}
+
+        added = len(values["open_time"])
+        if not added:
+            return 0
+
+        if n + added > self.capacity:
+            self._grow(n + added)
+
+        for name in COLUMNS:
+            self._columns[name][n:n + added] = values[name]
+        self._count[0] = n + added      # آخر خطوة: القراء يرون صفوفًا مكتملة فقط
+        return added
+
+    def _grow(self, needed: int):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+
+        data = {name: self.column(name) for name in COLUMNS}
+        self._create(self.path, capacity, data)
+        self._map()
+
+    def flush(self):
+        if self.writable:
+            self._mm.flush()
+
+
+# =========================
+# CSV IMPORT
+# =========================
+def _has_header(path: str) -> bool:
+    with open(path) as f:
+        first = f.readline().split(",", 1)[0].strip()
+    try:
+        float(first)
+        return False
+    except ValueError:
+        return True
+
+
+def import_csv(path: str, archive: KlineArchive) -> int:
+    """
+    Binance-style kline CSV: open_time, open, high, low, close, volume, ...
+    (header row optional; microsecond open_times are converted to ms)
+    """
+    data = np.loadtxt(
+        path,
+        delimiter=",",
+        usecols=range(6),
+        skiprows=1 if _has_header(path) else 0,
+        ndmin=2
+    )
+    if not len(data):
+        return 0
+
+    open_time = data[:, 0].astype(np.int64)
+    open_time = np.where(open_time >= 10**14, open_time // 1000, open_time)
+
+    added = archive.append(open_time, data[:, 1], data[:, 2], data[:, 3], data[:, 4], data[:, 5])
+    archive.flush()
+    return added
+
+
+# =========================
+# REPLAY FEED
+# =========================
+class ReplayExhausted(Exception):
+    pass
+
+
+class ArchiveFeed:
+    """
+    Offline stand-in for MarketDataClient / fetch_crypto:
+    each fetch advances one bar and returns the last `limit` closes and
+    volumes (zero-copy views). Raises ReplayExhausted at the end.
+    With a clock (core.clock.ReplayClock) each fetch instead returns the
+    bars opened before clock.time(), like the live endpoint at that time.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        step: int = 1,
+        clock: Optional[Clock] = None
+    ):
+        self.directory = directory
+        self.start = start
+        self.end = end
+        self.step = step
+        self.clock = clock      # مع ساعة: الشموع التي فُتحت قبل clock.time()
+
+        self._archives: Dict[Tuple[str, str], KlineArchive] = {}
+        self._cursors: Dict[Tuple[str, str], Tuple[int, int]] = {}
+
+    def archive(self, symbol: str, interval: str) -> KlineArchive:
+        key = (symbol, interval)
+        archive = self._archives.get(key)
+        if archive is None:
+            archive = KlineArchive(archive_path(self.directory, symbol, interval))
+            self._archives[key] = archive
+        return archive
+
+    def remaining(self, symbol: str, interval: str = "1m") -> int:
+        cursor, hi = self._cursors.get((symbol, interval), (None, None))
+        if cursor is None:
+            lo, hi = self.archive(symbol, interval).span(self.start, self.end)
+            return hi - lo
+        return max(0, hi - cursor)
+
+    def fetch_klines(
+        self,
+        symbol: str = "BTCUSDT",
+        interval: str = "1m",
+        limit: int = 50
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        key = (symbol, interval)
+        archive = self.archive(symbol, interval)
+
+        if self.clock is not None:
+            return self._fetch_at(archive, key, limit)
+
+        if key not in self._cursors:
+            lo, hi = archive.span(self.start, self.end)
+            cursor = min(lo + limit, hi) if hi > lo else hi + 1
+        else:
+            cursor, hi = self._cursors[key]
+            cursor += self.step
+
+        if cursor > hi:
+            raise ReplayExhausted(f"{symbol} {interval}: end of archive")
+
+        self._cursors[key] = (cursor, hi)
+        return archive.rows(cursor - limit, cursor)
+
+    def _fetch_at(self, archive: KlineArchive, key: Tuple[str, str], limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        now_ms = int(self.clock.time() * 1000)
+        _, end = archive.span(None, self.end)
+        cursor = min(int(np.searchsorted(archive.open_time, now_ms, "left")), end)
+
+        previous = self._cursors.get(key)
+        if cursor >= end and previous is not None and previous[0] >= end:
+            raise ReplayExhausted(f"{key[0]} {key[1]}: end of archive")
+
+        self._cursors[key] = (cursor, end)
+        return archive.rows(cursor - limit, cursor)
+
+    def start_time(self, symbols, interval: str = "1m", limit: int = 50) -> float:
+        """
+        Earliest replay time (epoch seconds) at which every symbol has
+        `limit` closed bars
+        """
+        t = []
+        for symbol in symbols:
+            archive = self.archive(symbol, interval)
+            open_time = archive.open_time
+            lo, _ = archive.span(self.start, None)
+            if not len(open_time):
+                raise ReplayExhausted(f"{symbol} {interval}: empty archive")
+            t.append(open_time[min(lo + limit, len(open_time) - 1)])
+        return max(t) / 1000.0
+
+    async def fetch_klines_async(
+        self,
+        symbol: str = "BTCUSDT",
+        interval: str = "1m",
+        limit: int = 50
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return self.fetch_klines(symbol, interval, limit)
+
+
+# =========================
+# CLI
+# =========================
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import kline CSV dumps into the local archive")
+    parser.add_argument("csv", nargs="+", help="kline CSV files (imported in the given order)")
+    parser.add_argument("--dir", required=True, help="archive directory")
+    parser.add_argument("--symbol", required=True)
+    parser.add_argument("--interval", default="1m")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.dir, exist_ok=True)
+    archive = KlineArchive(archive_path(args.dir, args.symbol, args.interval), writable=True)
+    for path in args.csv:
+        added = import_csv(path, archive)
+        print(f"{path}: +{added} bars (total {len(archive)})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,8 @@
-import requests
+import asyncio
+import threading
 import time
-from typing import List, Tuple
+from collections import deque
+from typing import Dict, List, Optional, Tuple
 
 # =========================
 # CONFIG
@@ -15,6 +17,229 @@ HEADERS = {
 
 BINANCE_KLINES = "https://api.binance.com/api/v3/klines"
 
+# =========================
+# TRANSPORT
+# =========================
+class Transport:
+    """
+    HTTP transport used by MarketDataClient.
+    Swap in a stub (or point the URLs at a local server) for testing.
+    """
+
+    def get_json(self, url: str, params: Optional[dict] = None, timeout: float = 10):
+        raise NotImplementedError
+
+    def post_json(
+        self,
+        url: str,
+        payload: dict,
+        headers: Optional[dict] = None,
+        timeout: float = 10
+    ):
+        raise NotImplementedError
+
+
+class SessionTransport(Transport):
+    """
+    requests.Session with a keep-alive connection pool
+    (one TCP+TLS handshake per pooled connection, not per tick)
+    """
+
+    def __init__(self, pool_size: int = 32):
+        # requests عند أول اتصال فقط (replay/stub لا يحتاجه)
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_json(self, url: str, params: Optional[dict] = None, timeout: float = 10):
+        r = self.session.get(url, params=params, timeout=timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def post_json(
+        self,
+        url: str,
+        payload: dict,
+        headers: Optional[dict] = None,
+        timeout: float = 10
+    ):
+        r = self.session.post(url, json=payload, headers=headers, timeout=timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def close(self):
+        self.session.close()
+
+# =========================
+# KLINE CACHE
+# =========================
+class KlineCache:
+    """
+    Last `size` klines of one (symbol, interval).
+    Rows are Binance klines: [open_time, open, high, low, close, volume, ...]
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.open_times: deque = deque(maxlen=size)
+        self.closes: deque = deque(maxlen=size)
+        self.volumes: deque = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self.open_times)
+
+    @property
+    def last_open(self) -> Optional[int]:
+        return self.open_times[-1] if self.open_times else None
+
+    def merge(self, rows: List[list]):
+        """
+        Appends new bars; a row with the last cached open_time replaces
+        that (still forming) bar
+        """
+        for row in rows:
+            open_time = int(row[0])
+            last = self.last_open
+
+            if last is not None and open_time < last:
+                continue
+
+            if open_time == last:
+                self.closes[-1] = float(row[4])
+                self.volumes[-1] = float(row[5])
+                continue
+
+            self.open_times.append(open_time)
+            self.closes.append(float(row[4]))
+            self.volumes.append(float(row[5]))
+
+    def window(self, limit: int) -> Tuple[List[float], List[float]]:
+        n = min(limit, len(self))
+        start = len(self) - n
+        return (
+            [self.closes[i] for i in range(start, len(self))],
+            [self.volumes[i] for i in range(start, len(self))],
+        )
+
+# =========================
+# CLIENT
+# =========================
+class MarketDataClient:
+    """
+    Pooled market-data / Q-NEXUS client
+    - Keep-alive connections (SessionTransport)
+    - Per-(symbol, interval) kline cache: only bars newer than the
+      last cached one are downloaded
+    - Async API (runs the pooled transport off the event loop)
+    """
+
+    def __init__(
+        self,
+        transport: Optional[Transport] = None,
+        klines_url: str = BINANCE_KLINES,
+        decision_url: str = Q_NEXUS_URL,
+        headers: Optional[dict] = None,
+        pool_size: int = 32
+    ):
+        self.transport = transport or SessionTransport(pool_size=pool_size)
+        self.klines_url = klines_url
+        self.decision_url = decision_url
+        self.headers = headers or HEADERS
+
+        self._klines: Dict[Tuple[str, str], KlineCache] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _lock(self, key: Tuple[str, str]) -> threading.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            with self._guard:
+                lock = self._locks.setdefault(key, threading.Lock())
+        return lock
+
+    def fetch_klines(
+        self,
+        symbol: str = "BTCUSDT",
+        interval: str = "1m",
+        limit: int = 50
+    ) -> Tuple[List[float], List[float]]:
+        key = (symbol, interval)
+
+        with self._lock(key):
+            cache = self._klines.get(key)
+            params = {
+                "symbol": symbol,
+                "interval": interval,
+                "limit": limit
+            }
+
+            if cache is not None and cache.size >= limit and len(cache) >= limit:
+                # فقط الشموع الجديدة (والشمعة الحالية)
+                rows = self.transport.get_json(
+                    self.klines_url,
+                    params={**params, "startTime": cache.last_open}
+                )
+                if len(rows) < limit:
+                    cache.merge(rows)
+                    return cache.window(limit)
+
+                # فجوة أكبر من النافذة → إعادة تحميل كاملة
+
+            rows = self.transport.get_json(self.klines_url, params=params)
+            cache = KlineCache(limit)
+            cache.merge(rows)
+            self._klines[key] = cache
+
+            return cache.window(limit)
+
+    def request_decision(
+        self,
+        prices: List[float],
+        volumes: List[float],
+        market_type: str
+    ) -> dict:
+        payload = {
+            "prices": prices,
+            "volumes": volumes,
+            "context": {
+                "market": market_type
+            }
+        }
+        return self.transport.post_json(
+            self.decision_url,
+            payload,
+            headers=self.headers
+        )
+
+    async def fetch_klines_async(
+        self,
+        symbol: str = "BTCUSDT",
+        interval: str = "1m",
+        limit: int = 50
+    ) -> Tuple[List[float], List[float]]:
+        return await asyncio.to_thread(self.fetch_klines, symbol, interval, limit)
+
+    async def request_decision_async(
+        self,
+        prices: List[float],
+        volumes: List[float],
+        market_type: str
+    ) -> dict:
+        return await asyncio.to_thread(self.request_decision, prices, volumes, market_type)
+
+
+_CLIENT: Optional[MarketDataClient] = None
+
+def default_client() -> MarketDataClient:
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = MarketDataClient()
+    return _CLIENT
+
 # =========================
 # MARKET FETCHERS
 # =========================
@@ -23,21 +248,7 @@ def fetch_crypto(
     interval: str = "1m",
     limit: int = 50
 ) -> Tuple[List[float], List[float]]:
-
-    params = {
-        "symbol": symbol,
-        "interval": interval,
-        "limit": limit
-    }
-
-    r = requests.get(BINANCE_KLINES, params=params, timeout=10)
-    r.raise_for_status()
-    data = r.json()
-
-    prices = [float(c[4]) for c in data]   # close
-    volumes = [float(c[5]) for c in data]  # volume
-
-    return prices, volumes
+    return default_client().fetch_klines(symbol, interval, limit)
 
 
 # =========================
@@ -48,23 +259,7 @@ def request_decision(
     volumes: List[float],
     market_type: str
 ) -> dict:
-
-    payload = {
-        "prices": prices,
-        "volumes": volumes,
-        "context": {
-            "market": market_type
-        }
-    }
-
-    r = requests.post(
-        Q_NEXUS_URL,
-        json=payload,
-        headers=HEADERS,
-        timeout=10
-    )
-    r.raise_for_status()
-    return r.json()
+    return default_client().request_decision(prices, volumes, market_type)
 
 
 # =========================
@@ -1,12 +1,274 @@
 # db/history.py
+from array import array
+from collections import OrderedDict
 from typing import List, Dict, Optional
+import atexit
+import threading
 import time
 import uuid
 
+import numpy as np
+
+from db.journal import TradeJournal, check_string, read_segments
+
+# =========================
+# COLUMNAR STORAGE
+# =========================
+META_RETENTION = 1_000   # آخر N سجلات فقط تحتفظ بـ meta كاملة
+
+class TradeStore:
+    """
+    Columnar, indexed trade history
+    - One typed array per field (no dict per trade)
+    - Interned market / symbol / strategy / decision codes
+    - Secondary indexes: market → rows, strategy → rows
+    - Running aggregates: PnL / win rate in O(1)
+    - meta kept only for the last `meta_retention` rows
+    """
+
+    def __init__(self, meta_retention: int = META_RETENTION):
+        self.meta_retention = meta_retention
+        self.journal = None     # TradeJournal (اختياري)
+        self._lock = threading.Lock()
+        self._init_columns()
+
+    def _init_columns(self):
+        self.ids = bytearray()              # 16 bytes (uuid) per row
+        self.market = array("I")
+        self.symbol = array("I")
+        self.strategy = array("I")
+        self.decision = array("I")
+        self.price = array("d")
+        self.volume = array("d")
+        self.confidence = array("d")
+        self.pnl = array("d")
+        self.timestamp = array("q")
+
+        self.strings: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+        self.by_market: Dict[int, array] = {}
+        self.by_strategy: Dict[int, array] = {}
+
+        self.meta: "OrderedDict[int, Dict]" = OrderedDict()
+
+        self.total_pnl = 0.0
+        self.wins = 0
+
+    def clear(self):
+        with self._lock:
+            self._init_columns()
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def intern(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            self.strings.append(value)
+            self.codes[value] = code
+        return code
+
+    def append(
+        self,
+        *,
+        trade_id: bytes,
+        market: str,
+        symbol: str,
+        strategy: str,
+        decision: str,
+        price: float,
+        volume: float,
+        confidence: float,
+        pnl: float,
+        timestamp: int,
+        meta: Optional[Dict] = None
+    ) -> int:
+        with self._lock:
+            journal = self.journal
+            if journal is not None:
+                # نص جديد لا يتسع لسجل اليومية → رفض قبل أي تعديل للأعمدة
+                for value in (market, symbol, strategy, decision):
+                    if value not in self.codes:
+                        check_string(value)
+
+            row = len(self.price)
+            m = self.intern(market)
+            s = self.intern(strategy)
+
+            self.ids += trade_id
+            self.market.append(m)
+            self.symbol.append(self.intern(symbol))
+            self.strategy.append(s)
+            self.decision.append(self.intern(decision))
+            self.price.append(price)
+            self.volume.append(volume)
+            self.confidence.append(confidence)
+            self.pnl.append(pnl)
+            self.timestamp.append(timestamp)
+
+            self.by_market.setdefault(m, array("L")).append(row)
+            self.by_strategy.setdefault(s, array("L")).append(row)
+
+            self.total_pnl += pnl
+            if pnl > 0:
+                self.wins += 1
+
+            if journal is not None:
+                self._journal_row(row)
+
+            if meta and self.meta_retention > 0:
+                self.meta[row] = meta
+                if len(self.meta) > self.meta_retention:
+                    self.meta.popitem(last=False)
+
+        # write + fsync بعد تحرير القفل (لا يوقف بقية الكتّاب)
+        if journal is not None and journal.flush_due():
+            journal.flush()
+        return row
+
+    def _journal_row(self, row: int):
+        journal = self.journal
+        while journal.strings_written < len(self.strings):
+            code = journal.strings_written
+            journal.append_string(code, self.strings[code])
+            journal.strings_written += 1
+
+        journal.append_trade(
+            trade_id=bytes(self.ids[row * 16:row * 16 + 16]),
+            market=self.market[row],
+            symbol=self.symbol[row],
+            strategy=self.strategy[row],
+            decision=self.decision[row],
+            timestamp=self.timestamp[row],
+            price=self.price[row],
+            volume=self.volume[row],
+            confidence=self.confidence[row],
+            pnl=self.pnl[row]
+        )
+
+    def attach_journal(self, journal: TradeJournal) -> int:
+        """
+        Replays journal segments into this (empty) store, then journals
+        every new row. Returns the number of replayed trades.
+        """
+        with self._lock:
+            if len(self):
+                raise RuntimeError("Journal replay requires an empty store")
+
+            for strings, trades in read_segments(journal.directory):
+                for code, value in strings:
+                    if code != len(self.strings):
+                        raise ValueError("Corrupt journal string table")
+                    self.intern(value)
+                self._bulk_load(trades)
+
+            journal.strings_written = len(self.strings)
+            self.journal = journal
+            return len(self)
+
+    def _bulk_load(self, trades):
+        if not len(trades):
+            return
+
+        base = len(self)
+        self.ids += trades["id"].tobytes()
+        for name in ("market", "symbol", "strategy", "decision"):
+            getattr(self, name).frombytes(trades[name].astype("<u4").tobytes())
+        for name in ("price", "volume", "confidence", "pnl"):
+            getattr(self, name).frombytes(trades[name].astype("<f8").tobytes())
+        self.timestamp.frombytes(trades["timestamp"].astype("<i8").tobytes())
+
+        row_dtype = np.dtype(f"<u{array('L').itemsize}")
+        rows = np.arange(base, base + len(trades), dtype=row_dtype)
+        for name, index in (("market", self.by_market), ("strategy", self.by_strategy)):
+            col = trades[name]
+            for code in np.unique(col).tolist():
+                index.setdefault(code, array("L")).frombytes(rows[col == code].tobytes())
+
+        pnl = trades["pnl"]
+        self.total_pnl += float(pnl.sum())
+        self.wins += int(np.count_nonzero(pnl > 0))
+
+    def record(self, row: int) -> Dict:
+        return {
+            "id": str(uuid.UUID(bytes=bytes(self.ids[row * 16:row * 16 + 16]))),
+            "market": self.strings[self.market[row]],
+            "symbol": self.strings[self.symbol[row]],
+            "strategy": self.strings[self.strategy[row]],
+            "decision": self.strings[self.decision[row]],
+            "price": self.price[row],
+            "volume": self.volume[row],
+            "confidence": self.confidence[row],
+            "pnl": self.pnl[row],
+            "meta": self.meta.get(row, {}),
+            "timestamp": self.timestamp[row]
+        }
+
+    def rows(
+        self,
+        market: Optional[str] = None,
+        strategy: Optional[str] = None
+    ):
+        """
+        Row ids matching the filters (index lookups, no full scan)
+        """
+        if not market and not strategy:
+            return range(len(self))
+
+        if market and strategy:
+            m = self.codes.get(market)
+            s = self.codes.get(strategy)
+            if m is None or s is None:
+                return []
+            by_m = self.by_market.get(m, ())
+            by_s = self.by_strategy.get(s, ())
+            if len(by_m) <= len(by_s):
+                return [r for r in by_m if self.strategy[r] == s]
+            return [r for r in by_s if self.market[r] == m]
+
+        if market:
+            code = self.codes.get(market)
+            return self.by_market.get(code, ()) if code is not None else []
+
+        code = self.codes.get(strategy)
+        return self.by_strategy.get(code, ()) if code is not None else []
+
+    # Sequence view (TRADE_HISTORY compatibility)
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.record(r) for r in range(len(self))[i]]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("trade index out of range")
+        return self.record(i)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.record(row)
+
+
+TRADE_STORE = TradeStore()
+TRADE_HISTORY = TRADE_STORE   # الاسم القديم (قراءة فقط)
+
 # =========================
-# IN-MEMORY STORAGE (Phase 3)
+# DURABILITY
 # =========================
-TRADE_HISTORY: List[Dict] = []
+def open_journal(directory: str, **options) -> int:
+    """
+    Replays `directory` into TRADE_STORE and journals new trades there.
+    Returns the number of replayed trades.
+    """
+    journal = TradeJournal(directory, **options)
+    replayed = TRADE_STORE.attach_journal(journal)
+    atexit.register(journal.close)
+    return replayed
+
+def flush_journal():
+    if TRADE_STORE.journal is not None:
+        TRADE_STORE.journal.flush()
 
 # =========================
 # LOGGING
@@ -21,13 +283,32 @@ def log_trade(
     confidence: float,
     volume: float,
     pnl: float = 0.0,
-    meta: Optional[Dict] = None
+    meta: Optional[Dict] = None,
+    timestamp: Optional[float] = None
 ) -> Dict:
     """
     Immutable trade record
+    (timestamp: epoch seconds, defaults to now; replays pass their clock)
     """
-    record = {
-        "id": str(uuid.uuid4()),
+    trade_id = uuid.uuid4()
+    timestamp = int(time.time() if timestamp is None else timestamp)
+
+    TRADE_STORE.append(
+        trade_id=trade_id.bytes,
+        market=market,
+        symbol=symbol,
+        strategy=strategy,
+        decision=decision,
+        price=price,
+        volume=volume,
+        confidence=confidence,
+        pnl=pnl,
+        timestamp=timestamp,
+        meta=meta
+    )
+
+    return {
+        "id": str(trade_id),
         "market": market,
         "symbol": symbol,
         "strategy": strategy,
@@ -37,12 +318,9 @@ def log_trade(
         "confidence": confidence,
         "pnl": pnl,
         "meta": meta or {},
-        "timestamp": int(time.time())
+        "timestamp": timestamp
     }
 
-    TRADE_HISTORY.append(record)
-    return record
-
 # =========================
 # QUERY
 # =========================
@@ -50,22 +328,14 @@ def get_history(
     market: Optional[str] = None,
     strategy: Optional[str] = None
 ) -> List[Dict]:
-    data = TRADE_HISTORY
-
-    if market:
-        data = [t for t in data if t["market"] == market]
-
-    if strategy:
-        data = [t for t in data if t["strategy"] == strategy]
-
-    return data
+    return [TRADE_STORE.record(r) for r in TRADE_STORE.rows(market, strategy)]
 
 # =========================
 # METRICS
 # =========================
 def calculate_pnl() -> float:
-    return sum(t["pnl"] for t in TRADE_HISTORY)
+    return TRADE_STORE.total_pnl
 
 def win_rate() -> float:
-    wins = [t for t in TRADE_HISTORY if t["pnl"] > 0]
-    return len(wins) / len(TRADE_HISTORY) if TRADE_HISTORY else 0.0
+    n = len(TRADE_STORE)
+    return TRADE_STORE.wins / n if n else 0.0
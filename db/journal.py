@@ -0,0 +1,203 @@
+# db/journal.py
+"""
+Q-NEXUS — Durable Trade Journal
+- Append-only binary segments (fixed 80-byte records)
+- Batched writes + fsync
+- Memory-mapped, vectorized replay
+Local filesystem only.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+RECORD_SIZE = 80
+TAG_TRADE = 1
+TAG_STRING = 2
+MAX_STRING_BYTES = 72
+
+# tag | market symbol strategy decision | timestamp | price volume confidence pnl | id
+_TRADE = struct.Struct("<B3xIIII4xqdddd16s")
+# tag | length | code | utf-8 bytes
+_STRING = struct.Struct("<BxHI72s")
+
+TRADE_DTYPE = np.dtype({
+    "names": [
+        "tag", "market", "symbol", "strategy", "decision",
+        "timestamp", "price", "volume", "confidence", "pnl", "id"
+    ],
+    "formats": ["u1", "<u4", "<u4", "<u4", "<u4", "<i8", "<f8", "<f8", "<f8", "<f8", "S16"],
+    "offsets": [0, 4, 8, 12, 16, 24, 32, 40, 48, 56, 64],
+    "itemsize": RECORD_SIZE,
+})
+
+SEGMENT_PREFIX = "trades-"
+SEGMENT_SUFFIX = ".seg"
+
+
+def check_string(value: str) -> bytes:
+    """
+    UTF-8 bytes of a journal string; ValueError when it does not fit a record
+    """
+    raw = value.encode("utf-8")
+    if len(raw) > MAX_STRING_BYTES:
+        raise ValueError(f"Journal strings are limited to {MAX_STRING_BYTES} bytes")
+    return raw
+
+
+class TradeJournal:
+    """
+    Append-only trade log.
+    Records are buffered; flush() writes + fsyncs them once `flush_bytes`
+    are pending or `flush_interval` seconds have passed (flush_due()).
+    Appends only touch the buffer, so callers can append under their own
+    lock and flush after releasing it.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 64 * 1024 * 1024,
+        flush_bytes: int = 256 * 1024,
+        flush_interval: float = 1.0
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes - segment_bytes % RECORD_SIZE
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.strings_written = 0
+        self._buf = bytearray()
+        self._lock = threading.Lock()       # _buf
+        self._io_lock = threading.Lock()    # الملف: كتابة بالترتيب
+        self._last_flush = time.monotonic()
+        self._file = None
+        self._size = 0
+
+        existing = segment_paths(directory)
+        self._index = _segment_index(existing[-1]) + 1 if existing else 0
+        self._open_segment()
+
+    def _open_segment(self):
+        if self._file is not None:
+            self._file.close()
+        path = os.path.join(
+            self.directory,
+            f"{SEGMENT_PREFIX}{self._index:06d}{SEGMENT_SUFFIX}"
+        )
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+        self._index += 1
+
+    def append_string(self, code: int, value: str):
+        raw = check_string(value)
+        with self._lock:
+            self._buf += _STRING.pack(TAG_STRING, len(raw), code, raw)
+
+    def append_trade(
+        self,
+        *,
+        trade_id: bytes,
+        market: int,
+        symbol: int,
+        strategy: int,
+        decision: int,
+        timestamp: int,
+        price: float,
+        volume: float,
+        confidence: float,
+        pnl: float
+    ):
+        record = _TRADE.pack(
+            TAG_TRADE, market, symbol, strategy, decision,
+            timestamp, price, volume, confidence, pnl, trade_id
+        )
+        with self._lock:
+            self._buf += record
+
+    def flush_due(self) -> bool:
+        return (
+            len(self._buf) >= self.flush_bytes
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def flush(self):
+        with self._io_lock:
+            with self._lock:
+                data, self._buf = self._buf, bytearray()
+
+            if data and self._file is not None:
+                if self._size + len(data) > self.segment_bytes and self._size:
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                    self._open_segment()
+
+                self._file.write(data)
+                self._size += len(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            with self._io_lock:
+                self._file.close()
+                self._file = None
+
+
+# =========================
+# REPLAY
+# =========================
+def _segment_index(path: str) -> int:
+    name = os.path.basename(path)
+    return int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+
+def segment_paths(directory: str) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+    names = [
+        n for n in os.listdir(directory)
+        if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX)
+    ]
+    return [os.path.join(directory, n) for n in sorted(names)]
+
+
+def read_segments(directory: str) -> Iterator[Tuple[List[Tuple[int, str]], np.ndarray]]:
+    """
+    Yields (string definitions, trade records) per segment.
+    Trade records are a TRADE_DTYPE array copied out of the mapping;
+    a torn trailing record (crash mid-write) is ignored.
+    """
+    for path in segment_paths(directory):
+        size = os.path.getsize(path)
+        count = size // RECORD_SIZE
+        if count == 0:
+            continue
+
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                records = np.frombuffer(mm, dtype=TRADE_DTYPE, count=count)
+                tags = records["tag"]
+
+                strings = []
+                for i in np.flatnonzero(tags == TAG_STRING):
+                    _, length, code, raw = _STRING.unpack_from(mm, int(i) * RECORD_SIZE)
+                    strings.append((code, raw[:length].decode("utf-8")))
+
+                trades = records[tags == TAG_TRADE]   # copy; safe after close
+                del records, tags
+            finally:
+                mm.close()
+
+        yield strings, trades
@@ -1,18 +1,23 @@
 """
 Q-NEXUS — In-Memory Data Layer (MVP)
 Upgradeable to PostgreSQL / Redis without breaking API
+Users / API keys live in this process only: with several uvicorn workers a
+key registered on one worker is unknown to the others (only the bandit
+weights are shared, see QNEXUS_SHARED_BANDIT).
 """
 
+import os
 import uuid
 import time
 from typing import Dict
 
+from db.metering import SharedUsageMeter, UsageMeter
+
 # =========================
 # STORAGE (MVP)
 # =========================
 USERS: Dict[str, dict] = {}
 API_KEYS: Dict[str, str] = {}
-USAGE: Dict[str, int] = {}
 
 PLANS = {
     "starter": {
@@ -29,6 +34,15 @@ PLANS = {
     },
 }
 
+# =========================
+# METERING
+# =========================
+# QNEXUS_METER_SHM=<name> → عدادات مشتركة بين عمال uvicorn
+_METER_SHM = os.getenv("QNEXUS_METER_SHM")
+METER: UsageMeter = (
+    SharedUsageMeter(PLANS, name=_METER_SHM) if _METER_SHM else UsageMeter(PLANS)
+)
+
 # =========================
 # USER MANAGEMENT
 # =========================
@@ -49,24 +63,24 @@ def create_user(email: str, plan: str) -> str:
     }
 
     API_KEYS[api_key] = user_id
-    USAGE[api_key] = 0
+    METER.register(api_key, USERS[user_id])
 
     return api_key
 
 def get_user_by_key(api_key: str) -> dict:
-    user_id = API_KEYS.get(api_key)
-    if not user_id:
-        return None
-    return USERS.get(user_id)
+    return METER.user(api_key)
+
+def consume_usage(api_key: str, units: int = 1):
+    """
+    Single-lookup auth fast path: (user | None, within limit)
+    """
+    return METER.consume(api_key, units)
 
-def increment_usage(api_key: str):
-    if api_key not in USAGE:
-        USAGE[api_key] = 0
-    USAGE[api_key] += 1
+def increment_usage(api_key: str, units: int = 1):
+    METER.consume(api_key, units)
 
 def usage_exceeded(api_key: str) -> bool:
-    user = get_user_by_key(api_key)
-    if not user:
-        return True
-    plan = user["plan"]
-    return USAGE[api_key] > PLANS[plan]["limit"]
+    return METER.user(api_key) is None or METER.remaining(api_key) < 1
+
+def get_usage(api_key: str) -> int:
+    return METER.usage(api_key)
@@ -0,0 +1,192 @@
+# db/metering.py
+"""
+Q-NEXUS — API Usage Metering
+- One dict lookup per request (api_key → account)
+- Sharded locks instead of one global lock
+- Per-plan token bucket: capacity = PLANS[plan]["limit"],
+  refilled evenly over the plan window
+- Optional cross-worker counters in shared memory
+"""
+
+import hashlib
+import struct
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from db.shared import ShardLocks, attach_segment
+
+QUOTA_WINDOW_SECONDS = 30 * 24 * 3600   # نافذة الحصة (شهر)
+
+
+class _Account:
+    __slots__ = ("user", "shard", "capacity", "rate", "tokens", "stamp", "total", "slot")
+
+    def __init__(self, user: dict, shard: int, capacity: float, rate: float, now: float):
+        self.user = user
+        self.shard = shard
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.stamp = now
+        self.total = 0
+        self.slot = -1
+
+
+class UsageMeter:
+    """
+    In-process usage meter (thread-safe)
+    """
+
+    def __init__(self, plans: Dict[str, dict], shards: int = 16, clock=time.monotonic):
+        self.plans = plans
+        self.shards = shards
+        self.clock = clock
+        self._accounts: Dict[str, _Account] = {}
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def register(self, api_key: str, user: dict):
+        plan = self.plans[user["plan"]]
+        capacity = float(plan["limit"])
+        window = plan.get("window", QUOTA_WINDOW_SECONDS)
+        self._accounts[api_key] = _Account(
+            user=user,
+            shard=hash(api_key) % self.shards,
+            capacity=capacity,
+            rate=capacity / window,
+            now=self.clock()
+        )
+
+    def user(self, api_key: str) -> Optional[dict]:
+        acct = self._accounts.get(api_key)
+        return acct.user if acct is not None else None
+
+    def consume(self, api_key: str, units: int = 1) -> Tuple[Optional[dict], bool]:
+        """
+        Counts `units` requests. Returns (user, allowed); user is None
+        for unknown keys.
+        """
+        acct = self._accounts.get(api_key)
+        if acct is None:
+            return None, False
+
+        lock = self._locks[acct.shard]
+        with lock:
+            return acct.user, self._take(acct, units)
+
+    def _take(self, acct: _Account, units: int) -> bool:
+        now = self.clock()
+        tokens = min(acct.capacity, acct.tokens + (now - acct.stamp) * acct.rate)
+        acct.stamp = now
+        acct.total += units
+
+        if tokens >= units:
+            acct.tokens = tokens - units
+            return True
+        acct.tokens = tokens
+        return False
+
+    def usage(self, api_key: str) -> int:
+        acct = self._accounts.get(api_key)
+        return acct.total if acct is not None else 0
+
+    def remaining(self, api_key: str) -> float:
+        acct = self._accounts.get(api_key)
+        if acct is None:
+            return 0.0
+        now = self.clock()
+        return min(acct.capacity, acct.tokens + (now - acct.stamp) * acct.rate)
+
+
+# =========================
+# SHARED (multi-worker)
+# =========================
+# fingerprint | tokens | stamp | total
+_SLOT = struct.Struct("<QddQ")
+
+
+class SharedUsageMeter(UsageMeter):
+    """
+    Usage meter whose buckets live in a named shared-memory table, so
+    every worker process enforces the same limits.
+    Slots are found by open addressing on a stable key fingerprint;
+    each process caches its slot index after the first lookup.
+    """
+
+    def __init__(
+        self,
+        plans: Dict[str, dict],
+        name: str,
+        slots: int = 65_536,
+        shards: int = 16,
+        clock=time.monotonic
+    ):
+        super().__init__(plans, shards=shards, clock=clock)
+        self.slots = slots
+        self.name = name
+        self._shm, _ = attach_segment(name, slots * _SLOT.size)
+        self._buf = self._shm.buf
+        self._shared_locks = ShardLocks(name, shards + 1)   # + claim lock
+
+    @staticmethod
+    def _fingerprint(api_key: str) -> int:
+        digest = hashlib.blake2b(api_key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") | 1
+
+    def _claim(self, api_key: str, acct: _Account) -> int:
+        fp = self._fingerprint(api_key)
+        claim = self.shards
+        self._shared_locks.acquire(claim)
+        try:
+            start = fp % self.slots
+            for i in range(self.slots):
+                slot = (start + i) % self.slots
+                offset = slot * _SLOT.size
+                owner = _SLOT.unpack_from(self._buf, offset)[0]
+                if owner == fp:
+                    return slot
+                if owner == 0:
+                    _SLOT.pack_into(self._buf, offset, fp, acct.capacity, self.clock(), 0)
+                    return slot
+        finally:
+            self._shared_locks.release(claim)
+        raise RuntimeError("Shared usage table is full")
+
+    def consume(self, api_key: str, units: int = 1) -> Tuple[Optional[dict], bool]:
+        acct = self._accounts.get(api_key)
+        if acct is None:
+            return None, False
+
+        if acct.slot < 0:
+            acct.slot = self._claim(api_key, acct)
+            acct.shard = acct.slot % self.shards    # ثابت عبر العمليات
+
+        offset = acct.slot * _SLOT.size
+        locks = self._shared_locks
+        locks.acquire(acct.shard)
+        try:
+            fp, acct.tokens, acct.stamp, acct.total = _SLOT.unpack_from(self._buf, offset)
+            allowed = self._take(acct, units)
+            _SLOT.pack_into(self._buf, offset, fp, acct.tokens, acct.stamp, acct.total)
+        finally:
+            locks.release(acct.shard)
+
+        return acct.user, allowed
+
+    def usage(self, api_key: str) -> int:
+        acct = self._accounts.get(api_key)
+        if acct is None or acct.slot < 0:
+            return 0
+        return _SLOT.unpack_from(self._buf, acct.slot * _SLOT.size)[3]
+
+    def remaining(self, api_key: str) -> float:
+        acct = self._accounts.get(api_key)
+        if acct is None or acct.slot < 0:
+            return super().remaining(api_key)
+        _, tokens, stamp, _ = _SLOT.unpack_from(self._buf, acct.slot * _SLOT.size)
+        return min(acct.capacity, tokens + (self.clock() - stamp) * acct.rate)
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+        self._shared_locks.close()
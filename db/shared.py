@@ -0,0 +1,72 @@
+# db/shared.py
+"""
+Q-NEXUS — Shared-memory primitives (multi-worker state)
+- Named shared-memory segments (zero-filled on creation)
+- Sharded cross-process locks (fcntl byte-range + thread lock)
+POSIX only.
+"""
+
+import fcntl
+import os
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Tuple
+
+
+def attach_segment(name: str, size: int) -> Tuple[shared_memory.SharedMemory, bool]:
+    """
+    Creates or attaches the named segment. Returns (segment, created).
+    The segment outlives individual workers (not unlinked on exit).
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        created = True
+    except FileExistsError:
+        shm = _attach_existing(name)
+        created = False
+
+    if shm.size < size:
+        shm.close()
+        raise ValueError(f"Shared segment {name!r} is smaller than {size} bytes")
+
+    # لا نريد أن يحذف resource_tracker المقطع عند خروج أي عامل
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm, created
+
+
+def _attach_existing(name: str, timeout: float = 5.0) -> shared_memory.SharedMemory:
+    # المُنشئ يفتح المقطع ثم يحدد حجمه (ftruncate): بينهما يكون فارغًا
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return shared_memory.SharedMemory(name=name)
+        except ValueError:          # cannot mmap an empty file
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.001)
+
+
+class ShardLocks:
+    """
+    N independent locks, exclusive across threads and processes.
+    Shard i is byte i of a lock file next to the segment.
+    """
+
+    def __init__(self, name: str, shards: int):
+        self.shards = shards
+        path = os.path.join(tempfile.gettempdir(), f"qnexus-{name}.lock")
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._threads = [threading.Lock() for _ in range(shards)]
+
+    def acquire(self, shard: int):
+        self._threads[shard].acquire()
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, shard)
+
+    def release(self, shard: int):
+        fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, shard)
+        self._threads[shard].release()
+
+    def close(self):
+        os.close(self._fd)
@@ -1,22 +1,48 @@
-from fastapi import FastAPI, Header, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, Field, ValidationError, model_validator
+from typing import List, Literal, Optional
+import logging
+import os
 import time
 
-from core.engine import DecisionEngine
+from core.cache import DECISION_CACHE_SIZE, DECISION_CACHE_TTL, DecisionCache, decision_key, pack_series
+from core.factory import EngineFactory
+from core.metrics import METRICS
+from core.stream import MAX_STREAM_SESSIONS, MAX_STREAM_WINDOW, STREAM_WINDOW, SessionRegistry
 from models.schemas import (
     MarketPayload,
     DecisionResponse,
+    BatchMarketPayload,
+    BatchDecisionResponse,
+    StreamDecisionResponse,
     DashboardResponse,
     RegisterPayload,
     RegisterResponse
 )
+from models.wire import (
+    MSGPACK,
+    RAW_F64,
+    WireFormatError,
+    as_series,
+    decode_bars,
+    encode_response,
+    is_binary,
+    series_length,
+    split_series
+)
 from db.memory import (
+    consume_usage,
     get_user_by_key,
-    increment_usage,
-    usage_exceeded,
+    get_usage,
     create_user
 )
 
+logger = logging.getLogger("Q-NEXUS")
+
 # =========================
 # APP
 # =========================
@@ -26,22 +52,80 @@ app = FastAPI(
     description="Decision Intelligence Platform for Global Markets"
 )
 
-ENGINE = DecisionEngine()
+# QNEXUS_SHARED_BANDIT=<name> → أوزان مشتركة بين كل العمال
+# ⚠️ المشترك هو أوزان الـ bandit فقط: المستخدمون ومفاتيح API (db.memory)
+# داخل كل عملية → مفتاح سُجّل في عامل يُرفض (401) في العمال الآخرين
+SHARED_BANDIT = os.getenv("QNEXUS_SHARED_BANDIT")
+
+# QNEXUS_SNAPSHOT=<path> → استعادة حالة المحرك عند بنائه وحفظها عند الإيقاف
+SNAPSHOT_PATH = os.getenv("QNEXUS_SNAPSHOT")
+HISTORY_SPILL = os.getenv("QNEXUS_HISTORY_SPILL")     # evicted learning records (JSON lines)
+
+def build_engine():
+    from core.engine import DecisionEngine
+
+    engine = DecisionEngine(history_spill=HISTORY_SPILL)
+    if SHARED_BANDIT:
+        from core.shared_state import SharedBanditWeighter
+        engine.weighter = SharedBanditWeighter(engine.strategies, name=SHARED_BANDIT)
+    if SNAPSHOT_PATH:
+        from core.snapshot import SnapshotError, load_snapshot
+        try:
+            load_snapshot(SNAPSHOT_PATH, engine)
+        except SnapshotError:
+            logger.exception("⚠️ Unreadable snapshot, cold start | path=%s", SNAPSHOT_PATH)
+    return engine
+
+# ⚡ المحرك (NumPy + plugins) يُبنى عند أول طلب، لا عند الاستيراد
+ENGINES = EngineFactory(build_engine)
+
+# QNEXUS_PREWARM=1 → البناء في الخلفية فور الإقلاع (/health جاهز فورًا)
+if os.getenv("QNEXUS_PREWARM", "0") != "0":
+    @app.on_event("startup")
+    def prewarm_engine():
+        ENGINES.prewarm()
+
+if SNAPSHOT_PATH or HISTORY_SPILL:
+    @app.on_event("shutdown")
+    def save_engine_state():
+        engine = ENGINES.peek()
+        if engine is None:          # لم يُبنَ → لا حالة جديدة
+            return
+        engine.history.flush()
+        if SNAPSHOT_PATH:
+            from core.snapshot import save_snapshot
+            save_snapshot(SNAPSHOT_PATH, engine)
+
+def __getattr__(name):
+    # main.ENGINE (كما كان قبل البناء الكسول)
+    if name == "ENGINE":
+        return ENGINES.get()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def get_engine():
+    """
+    From async endpoints: never block the event loop on the first build
+    """
+    return ENGINES.peek() or await run_in_threadpool(ENGINES.get)
+
+# QNEXUS_DECISION_CACHE=0 → بلا cache
+DECISION_CACHE = DecisionCache(
+    capacity=int(os.getenv("QNEXUS_DECISION_CACHE", DECISION_CACHE_SIZE)),
+    ttl=DECISION_CACHE_TTL
+)
 
 # =========================
 # AUTH
 # =========================
-def authorize(api_key: str):
+def authorize(api_key: str, units: int = 1):
     if not api_key:
         raise HTTPException(status_code=401, detail="Missing API Key")
 
-    user = get_user_by_key(api_key)
+    user, allowed = consume_usage(api_key, units)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid API Key")
 
-    increment_usage(api_key)
-
-    if usage_exceeded(api_key):
+    if not allowed:
         raise HTTPException(status_code=429, detail="Usage limit reached")
 
     return user
@@ -74,29 +158,192 @@ def register(payload: RegisterPayload):
 # =========================
 # DECIDE
 # =========================
-@app.post("/api/decide", response_model=DecisionResponse)
-def decide(payload: MarketPayload, authorization: str = Header(None)):
+_DECIDE_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"$ref": "#/components/schemas/MarketPayload"}},
+            RAW_F64: {"schema": {"type": "string", "format": "binary"}},
+            MSGPACK: {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+async def read_series(request: Request, engine):
+    """
+    JSON (validated by MarketPayload) or a binary float64 body.
+    Returns (prices, volumes, cache key): binary series stay raw buffers
+    until decode_input() (a cache hit never decodes them).
+    """
+    content_type = request.headers.get("content-type")
+
+    if is_binary(content_type):
+        try:
+            prices, volumes = split_series(await request.body(), content_type)
+        except WireFormatError as e:
+            raise HTTPException(status_code=415, detail=str(e))
+        n = series_length(prices)
+        if n < 10 or series_length(volumes) != n:
+            raise HTTPException(status_code=422, detail="Invalid market data")
+        return prices, volumes, decision_key(prices, volumes, engine.weighter.version)
+
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=422, detail="JSON body must be an object")
+
+    try:
+        payload = MarketPayload(**body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_input=False))
+
+    key = decision_key(
+        pack_series(payload.prices),
+        pack_series(payload.volumes),
+        engine.weighter.version
+    )
+    return payload.prices, payload.volumes, key
+
+def decode_input(series):
+    if not isinstance(series, memoryview):
+        return series
+    try:
+        return as_series(series)
+    except WireFormatError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def decide_response(payload: dict, accept: Optional[str]) -> Response:
+    body = encode_response(payload, accept)
+    if body is not None:
+        return Response(content=body, media_type=MSGPACK)
+    return JSONResponse(content=payload)
+
+@app.post("/api/decide", response_model=DecisionResponse, openapi_extra=_DECIDE_BODY)
+async def decide(request: Request, authorization: str = Header(None)):
     authorize(authorization)
-    return ENGINE.decide(payload.prices, payload.volumes)
+    engine = await get_engine()
+    prices, volumes, key = await read_series(request, engine)
+
+    # ⚡ نفس النافذة + نفس الأوزان → نفس القرار
+    payload = DECISION_CACHE.get(key)
+    if payload is None:
+        out = await run_in_threadpool(engine.decide, decode_input(prices), decode_input(volumes))
+        payload = jsonable_encoder(DecisionResponse(**out))
+        DECISION_CACHE.put(key, payload)
+
+    return decide_response(payload, request.headers.get("accept"))
+
+@app.post("/api/decide/batch", response_model=BatchDecisionResponse)
+def decide_batch(payload: BatchMarketPayload, authorization: str = Header(None)):
+    # كل رمز يُحتسب كطلب
+    authorize(authorization, units=len(payload.items))
+    decisions = ENGINES.get().decide_batch(
+        [item.prices for item in payload.items],
+        [item.volumes for item in payload.items]
+    )
+    return {"decisions": decisions}
+
+# =========================
+# STREAM (WebSocket)
+# =========================
+STREAMS = SessionRegistry(
+    max_sessions=int(os.getenv("QNEXUS_STREAM_SESSIONS", MAX_STREAM_SESSIONS))
+)
+
+@app.websocket("/api/stream")
+async def stream(
+    websocket: WebSocket,
+    symbol: str,
+    window: int = Query(STREAM_WINDOW, ge=10, le=MAX_STREAM_WINDOW),
+    api_key: Optional[str] = None
+):
+    """
+    One session per (api_key, symbol). Send bars (binary f64 pairs or
+    JSON [price, volume]); a decision is pushed whenever it changes.
+    Each bar is metered as one request.
+    """
+    # المتصفحات لا ترسل headers مع WebSocket → api_key في الرابط
+    key = websocket.headers.get("authorization") or api_key
+    if not key or get_user_by_key(key) is None:
+        await websocket.close(code=1008, reason="Invalid API Key")
+        return
+
+    await websocket.accept()
+    engine = await get_engine()
+    session = STREAMS.open(key, symbol, window)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            try:
+                prices, volumes = decode_bars(
+                    message["bytes"] if message.get("bytes") is not None else message.get("text", "")
+                )
+            except WireFormatError as e:
+                await websocket.send_json({"error": str(e)})
+                continue
+
+            _, allowed = consume_usage(key, len(prices))
+            if not allowed:
+                await websocket.send_json({"error": "Usage limit reached"})
+                await websocket.close(code=1008, reason="Usage limit reached")
+                break
+
+            out = session.push(engine, prices, volumes)
+            STREAMS.touch(key, session)
+            if out is not None:
+                await websocket.send_json(jsonable_encoder(
+                    StreamDecisionResponse(**out, symbol=symbol, bar=session.bars)
+                ))
+    except WebSocketDisconnect:
+        pass
 
 # =========================
 # LEARN
 # =========================
+Decision = Literal["BUY", "SELL", "HOLD"]
+
 class LearnPayload(BaseModel):
     strategy: str
     realized_return: float
+    # نافذة LearningGate: القرارات القديمة مقابل الجديدة على نفس الأسعار
+    prices: List[float] = Field(..., min_length=2)
+    old_decisions: List[Decision]
+    new_decisions: List[Decision]
+
+    @model_validator(mode="after")
+    def same_window(self):
+        if len(self.old_decisions) > len(self.prices) or len(self.new_decisions) != len(self.prices):
+            raise ValueError("new_decisions must cover prices; old_decisions must not exceed them")
+        return self
 
 @app.post("/api/learn")
 def learn(payload: LearnPayload, authorization: str = Header(None)):
+    """
+    Gated update: the weights only move when LearningGate approves
+    new_decisions over old_decisions
+    """
     authorize(authorization)
+    engine = ENGINES.get()
+    if payload.strategy not in engine.weighter.stats:
+        raise HTTPException(status_code=422, detail=f"Unknown strategy: {payload.strategy}")
 
-    ENGINE.learn(
+    out = engine.learn(
+        prices=payload.prices,
+        old_decisions=payload.old_decisions,
+        new_decisions=payload.new_decisions,
         executed_strategy=payload.strategy,
         realized_return=payload.realized_return
     )
 
     return {
-        "status": "learning_update_applied",
+        "status": out["status"],
+        "verdict": jsonable_encoder(out["verdict"]),
         "strategy": payload.strategy,
         "return": payload.realized_return,
         "timestamp": int(time.time())
@@ -110,17 +357,28 @@ def dashboard(authorization: str = Header(None)):
     user = authorize(authorization)
     return {
         "user": user,
-        "usage": "tracked",
+        "usage": get_usage(authorization),
         "plan": user["plan"],
         "capabilities": {
             "markets": ["crypto", "gold", "energy", "stocks"],
             "ai_mode": user["plan"]
-        }
+        },
+        "learning": ENGINES.get().history.stats()
     }
 
+# =========================
+# METRICS (Prometheus)
+# =========================
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(
+        METRICS.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 # =========================
 # HEALTH
 # =========================
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok", "engine_ready": ENGINES.ready}
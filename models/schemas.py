@@ -3,13 +3,24 @@ Q-NEXUS — API Schemas
 Clear, strict, production-grade
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from typing import List, Dict
 
+# أقصى عدد رموز في طلب /api/decide/batch
+MAX_BATCH_ITEMS = 256
+
 class MarketPayload(BaseModel):
+    model_config = ConfigDict(allow_inf_nan=False)
+
     prices: List[float] = Field(..., min_items=10)
     volumes: List[float] = Field(..., min_items=10)
 
+    @model_validator(mode="after")
+    def same_length(self):
+        if len(self.prices) != len(self.volumes):
+            raise ValueError("prices and volumes must have the same length")
+        return self
+
 class DecisionResponse(BaseModel):
     decision: str = Field(..., example="BUY")
     confidence: float = Field(..., ge=0.0, le=1.0)
@@ -17,11 +28,22 @@ class DecisionResponse(BaseModel):
     explain: Dict[str, float]
     timestamp: int
 
+class StreamDecisionResponse(DecisionResponse):
+    symbol: str
+    bar: int
+
+class BatchMarketPayload(BaseModel):
+    items: List[MarketPayload] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
+
+class BatchDecisionResponse(BaseModel):
+    decisions: List[DecisionResponse]
+
 class DashboardResponse(BaseModel):
     user: dict
     usage: int
     plan: str
     capabilities: dict
+    learning: dict = {}
 
 
 class RegisterPayload(BaseModel):
@@ -0,0 +1,158 @@
+"""
+Q-NEXUS — Binary Wire Formats
+Zero-copy alternatives to JSON for /api/decide
+- application/octet-stream: prices ‖ volumes, little-endian float64
+- application/msgpack: {"prices": <bin f64le>, "volumes": <bin f64le>}
+  (requires the optional `msgpack` package)
+- /api/stream bars: binary (price, volume) f64le pairs, or JSON
+NumPy is imported on first decode, not at import (API cold start).
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
+import json
+import math
+import struct
+
+if TYPE_CHECKING:
+    import numpy as np
+
+RAW_F64 = "application/octet-stream"
+MSGPACK = "application/msgpack"
+JSON = "application/json"
+
+_F64 = "<f8"
+_F64_SIZE = 8
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        return None
+    return msgpack
+
+
+def media_type(header: Optional[str]) -> str:
+    return (header or JSON).split(";", 1)[0].strip().lower()
+
+
+def is_binary(content_type: Optional[str]) -> bool:
+    return media_type(content_type) in (RAW_F64, MSGPACK)
+
+
+def _series(buf) -> np.ndarray:
+    import numpy as np
+
+    if len(buf) % _F64_SIZE:
+        raise WireFormatError("Series buffer is not a whole number of float64 values")
+    return np.frombuffer(buf, dtype=_F64)
+
+
+def series_length(buf: memoryview) -> int:
+    """
+    Number of float64 values in a split_series() buffer
+    """
+    return buf.nbytes // _F64_SIZE
+
+
+def split_series(body: bytes, content_type: str) -> Tuple[memoryview, memoryview]:
+    """
+    Request body → raw (prices, volumes) buffers, without NumPy.
+    Byte memoryviews of little-endian float64 on every host (the
+    core.cache.pack_series layout; DecisionCache keys are hashed from these)
+    """
+    kind = media_type(content_type)
+
+    if kind == RAW_F64:
+        if len(body) % (2 * _F64_SIZE):
+            raise WireFormatError("Body must hold prices and volumes of equal length")
+        buf = memoryview(body).cast("B")
+        n = len(buf) // 2
+        return buf[:n], buf[n:]
+
+    if kind == MSGPACK:
+        msgpack = _msgpack()
+        if msgpack is None:
+            raise WireFormatError("msgpack is not installed")
+        try:
+            obj = msgpack.unpackb(body, raw=False)
+            prices, volumes = memoryview(obj["prices"]), memoryview(obj["volumes"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise WireFormatError(f"Invalid msgpack payload: {e}") from e
+        for buf in (prices, volumes):
+            if len(buf) % _F64_SIZE:
+                raise WireFormatError("Series buffer is not a whole number of float64 values")
+        return prices.cast("B"), volumes.cast("B")
+
+    raise WireFormatError(f"Unsupported content type: {kind}")
+
+
+def as_series(buf) -> np.ndarray:
+    """
+    Raw float64 buffer (split_series) → read-only array view.
+    NaN / inf are rejected (WireFormatError), like decode_bars.
+    """
+    import numpy as np
+
+    series = _series(buf)
+    if not np.isfinite(series).all():
+        raise WireFormatError("Series must be finite numbers")
+    return series
+
+
+def decode_series(body: bytes, content_type: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Request body → (prices, volumes) as read-only views on `body`
+    """
+    prices, volumes = split_series(body, content_type)
+    return as_series(prices), as_series(volumes)
+
+
+def encode_response(payload: dict, accept: Optional[str]) -> Optional[bytes]:
+    """
+    msgpack body when the client accepts it (and msgpack is installed),
+    otherwise None → default JSON response
+    """
+    if accept and MSGPACK in accept.lower():
+        msgpack = _msgpack()
+        if msgpack is not None:
+            return msgpack.packb(payload, use_bin_type=True)
+    return None
+
+
+def decode_bars(message: Union[bytes, str]) -> Tuple[List[float], List[float]]:
+    """
+    One stream message → (prices, volumes), no NumPy
+    - bytes: interleaved little-endian float64 (price, volume) pairs
+    - text: [price, volume], [[price, volume], ...]
+      or {"prices": [...], "volumes": [...]}
+    """
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        if not len(message) or len(message) % (2 * _F64_SIZE):
+            raise WireFormatError("Binary bars must be (price, volume) float64 pairs")
+        values = struct.unpack(f"<{len(message) // _F64_SIZE}d", message)
+        prices, volumes = list(values[0::2]), list(values[1::2])
+    else:
+        try:
+            obj = json.loads(message)
+            if isinstance(obj, dict):
+                prices = [float(x) for x in obj["prices"]]
+                volumes = [float(x) for x in obj["volumes"]]
+            elif obj and isinstance(obj[0], list):
+                prices = [float(bar[0]) for bar in obj]
+                volumes = [float(bar[1]) for bar in obj]
+            else:
+                prices, volumes = [float(obj[0])], [float(obj[1])]
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise WireFormatError(f"Invalid bar message: {e}") from e
+
+    if not prices or len(prices) != len(volumes):
+        raise WireFormatError("Bars need one volume per price")
+    if not all(map(math.isfinite, prices)) or not all(map(math.isfinite, volumes)):
+        raise WireFormatError("Bars must be finite numbers")
+    return prices, volumes
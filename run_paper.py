@@ -2,28 +2,45 @@
 Q-NEXUS OMEGA — Paper Trading Runtime
 - Fault-tolerant
 - Observable
-- Deterministic timing
+- Deterministic timing (per-symbol deadlines)
+- Injectable clock (wall time live, event-driven replay)
+- Multi-symbol (asyncio, one task per symbol)
 - Ready for live upgrade
 """
 
-import time
+import asyncio
+import os
 import logging
 import signal
 import sys
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
+from core.clock import Clock, ReplayClock, WALL_CLOCK
 from core.paper_trader import PaperTrader
 from core.engine import DecisionEngine
-from data.market_feed import fetch_crypto
+from core.metrics import METRICS
+from core.snapshot import SnapshotError, load_snapshot, save_snapshot, snapshot_path
+from data.archive import ArchiveFeed, ReplayExhausted
+from data.market_feed import MarketDataClient
+from db.history import open_journal
 
 
 # =========================
 # CONFIG
 # =========================
-SYMBOL = "BTCUSDT"
+SYMBOLS = os.getenv("QNEXUS_SYMBOLS", "BTCUSDT").split(",")
 INTERVAL = "1m"
 LOOP_SECONDS = 60
-MAX_RETRIES = 3
+MAX_RETRIES = 3                                  # per symbol
+MAX_CONCURRENT_FETCHES = 32
+DECIDE_WORKERS = min(8, os.cpu_count() or 1)     # bounded CPU executor
+JOURNAL_DIR = os.getenv("QNEXUS_JOURNAL_DIR")       # durable trade log (optional)
+METRICS_LOG_SECONDS = 300
+SNAPSHOT_DIR = os.getenv("QNEXUS_SNAPSHOT_DIR")     # warm restarts (optional)
+SNAPSHOT_SECONDS = 300
+ARCHIVE_DIR = os.getenv("QNEXUS_ARCHIVE_DIR")       # offline replay from the kline archive
+HISTORY_DIR = os.getenv("QNEXUS_HISTORY_DIR")       # evicted learning records (optional)
 
 
 # =========================
@@ -40,12 +57,18 @@ logger = logging.getLogger("Q-NEXUS")
 # GRACEFUL SHUTDOWN
 # =========================
 RUNNING = True
+STOP: Optional[asyncio.Event] = None
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
 
 def shutdown_handler(sig, frame):
     global RUNNING
     logger.warning("⛔ Shutdown signal received. Stopping safely...")
     RUNNING = False
 
+    # يوقظ كل المهام النائمة فورًا
+    if _LOOP is not None and STOP is not None and not _LOOP.is_closed():
+        _LOOP.call_soon_threadsafe(STOP.set)
+
 signal.signal(signal.SIGINT, shutdown_handler)
 signal.signal(signal.SIGTERM, shutdown_handler)
 
@@ -53,52 +76,186 @@ signal.signal(signal.SIGTERM, shutdown_handler)
 # =========================
 # ENGINE BOOTSTRAP
 # =========================
-def bootstrap():
-    engine = DecisionEngine()
-    trader = PaperTrader(engine, symbol=SYMBOL, market="crypto")
-    logger.info("🚀 Q-NEXUS Paper Trader initialized")
-    return engine, trader
+def bootstrap(clock: Clock = WALL_CLOCK) -> List[PaperTrader]:
+    if JOURNAL_DIR:
+        replayed = open_journal(JOURNAL_DIR)
+        logger.info("📼 Trade journal replayed | dir=%s trades=%d", JOURNAL_DIR, replayed)
+
+    traders = [
+        PaperTrader(
+            DecisionEngine(clock=clock, history_spill=history_path(symbol)),
+            symbol=symbol,
+            market="crypto"
+        )
+        for symbol in SYMBOLS
+    ]
+
+    if SNAPSHOT_DIR:
+        for trader in traders:
+            restore(trader)
+    logger.info("🚀 Q-NEXUS Paper Trader initialized | symbols=%d", len(traders))
+    return traders
+
+
+def restore(trader: PaperTrader):
+    path = snapshot_path(SNAPSHOT_DIR, trader.symbol)
+    try:
+        applied = load_snapshot(path, trader.engine, trader)
+    except SnapshotError:
+        logger.exception("⚠️ [%s] Unreadable snapshot, cold start | path=%s", trader.symbol, path)
+        return
+
+    if applied is None:
+        logger.info("🧊 [%s] No snapshot, cold start", trader.symbol)
+    else:
+        logger.info(
+            "♻️ [%s] State restored | t=%d history=%d position=%s",
+            trader.symbol, trader.engine.weighter.t, len(trader.engine.history), trader.position
+        )
+
+
+def history_path(symbol: str) -> Optional[str]:
+    return os.path.join(HISTORY_DIR, f"{symbol}.history.jsonl") if HISTORY_DIR else None
+
+
+def flush_history(trader: PaperTrader):
+    try:
+        trader.engine.history.flush()
+    except OSError:
+        logger.exception("⚠️ [%s] Learning history flush failed", trader.symbol)
+
+
+def checkpoint(trader: PaperTrader):
+    try:
+        save_snapshot(snapshot_path(SNAPSHOT_DIR, trader.symbol), trader.engine, trader)
+    except OSError:
+        logger.exception("⚠️ [%s] Snapshot write failed", trader.symbol)
 
 
 # =========================
-# MAIN LOOP
+# SYMBOL LOOP
 # =========================
-def run():
-    engine, trader = bootstrap()
+async def sleep_until(deadline: float):
+    """
+    Sleeps until loop time `deadline`, or until shutdown
+    """
+    timeout = deadline - asyncio.get_running_loop().time()
+    if timeout <= 0:
+        return
+    try:
+        await asyncio.wait_for(STOP.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def run_symbol(
+    trader: PaperTrader,
+    feed: MarketDataClient,
+    fetch_slots: asyncio.Semaphore,
+    executor: ThreadPoolExecutor,
+    clock: Clock = WALL_CLOCK
+):
+    loop = asyncio.get_running_loop()
+    symbol = trader.symbol
 
     retry_count = 0
     last_tick = None
+    deadline = clock.time()
+    next_snapshot = loop.time() + SNAPSHOT_SECONDS
 
     while RUNNING:
-        start = time.time()
-
         try:
-            prices, volumes = fetch_crypto(SYMBOL, INTERVAL)
+            async with fetch_slots:
+                prices, volumes = await feed.fetch_klines_async(symbol, INTERVAL)
 
             # --- Safety check ---
             if len(prices) < 20:
-                logger.warning("⚠️ Not enough market data, skipping tick")
-                time.sleep(LOOP_SECONDS)
-                continue
+                logger.warning("⚠️ [%s] Not enough market data, skipping tick", symbol)
+            else:
+                await loop.run_in_executor(executor, trader.step, prices, volumes)
+                retry_count = 0
 
-            trader.step(prices, volumes)
-            retry_count = 0
+                last_tick = clock.utcnow().isoformat()
+                logger.info("✅ [%s] Tick executed | last_tick=%s", symbol, last_tick)
 
-            last_tick = datetime.utcnow().isoformat()
-            logger.info("✅ Tick executed | last_tick=%s", last_tick)
+        except ReplayExhausted:
+            logger.info("🏁 [%s] Replay finished", symbol)
+            break
 
-        except Exception as e:
+        except Exception:
             retry_count += 1
-            logger.exception("❌ Runtime error (%d/%d)", retry_count, MAX_RETRIES)
+            logger.exception("❌ [%s] Runtime error (%d/%d)", symbol, retry_count, MAX_RETRIES)
 
             if retry_count >= MAX_RETRIES:
-                logger.critical("🔥 Max retries reached. Shutting down.")
+                logger.critical("🔥 [%s] Max retries reached. Stopping symbol.", symbol)
                 break
 
-        # --- Deterministic timing ---
-        elapsed = time.time() - start
-        sleep_time = max(0.0, LOOP_SECONDS - elapsed)
-        time.sleep(sleep_time)
+        # --- Periodic snapshot (wall time, between ticks: state is consistent) ---
+        if SNAPSHOT_DIR and loop.time() >= next_snapshot:
+            await loop.run_in_executor(executor, checkpoint, trader)
+            next_snapshot = loop.time() + SNAPSHOT_SECONDS
+
+        # --- Deterministic timing (per-symbol deadline, clock time) ---
+        deadline = max(deadline + LOOP_SECONDS, clock.time())
+        await clock.sleep_until(deadline, STOP)
+
+    # --- Final snapshot on shutdown (SIGTERM/SIGINT) ---
+    if SNAPSHOT_DIR:
+        await loop.run_in_executor(executor, checkpoint, trader)
+
+    # --- السجلات المُزاحة المتبقية في الذاكرة → الملف ---
+    await loop.run_in_executor(executor, flush_history, trader)
+
+
+async def report_metrics():
+    """
+    Periodic one-line latency summary
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + METRICS_LOG_SECONDS
+    while RUNNING:
+        await sleep_until(deadline)
+        deadline += METRICS_LOG_SECONDS
+        if RUNNING and METRICS.enabled:
+            logger.info("📊 %s", METRICS.summary())
+
+
+# =========================
+# MAIN LOOP
+# =========================
+async def run_async():
+    global STOP, _LOOP
+    _LOOP = asyncio.get_running_loop()
+    STOP = asyncio.Event()
+    if not RUNNING:
+        STOP.set()
+
+    if ARCHIVE_DIR:
+        # إعادة تشغيل بلا شبكة: الزمن يقفز من حدث إلى حدث
+        feed = ArchiveFeed(ARCHIVE_DIR)
+        clock = ReplayClock(feed.start_time(SYMBOLS, INTERVAL))
+        feed.clock = clock
+        logger.info("📼 Replaying kline archive | dir=%s from=%s", ARCHIVE_DIR, clock.utcnow().isoformat())
+    else:
+        feed = MarketDataClient(pool_size=MAX_CONCURRENT_FETCHES)
+        clock = WALL_CLOCK
+
+    traders = bootstrap(clock)
+    fetch_slots = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+
+    reporter = asyncio.create_task(report_metrics())
+
+    with ThreadPoolExecutor(max_workers=DECIDE_WORKERS, thread_name_prefix="decide") as executor:
+        await asyncio.gather(*(
+            clock.participate(run_symbol(trader, feed, fetch_slots, executor, clock))
+            for trader in traders
+        ))
+
+    reporter.cancel()
+
+
+def run():
+    asyncio.run(run_async())
 
     logger.info("🧠 Q-NEXUS stopped cleanly")
     sys.exit(0)
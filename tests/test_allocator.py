@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from core.engine import DecisionEngine
+from core.paper_trader import PaperTrader
+from core.position_sizing import PortfolioAllocator, PositionSizer
+
+
+def test_size_batch_matches_size_on_every_confidence():
+    # كل ثقة بثلاث خانات عشرية × كل Regime × كل مستوى مخاطرة (الحالات الحدّية للتقريب)
+    confidence = [k / 1000 for k in range(1001)]
+    for regime in ("TRENDING", "RANGING", "VOLATILE", "DEAD", "UNKNOWN"):
+        for risk in ("LOW", "MEDIUM", "HIGH"):
+            batch = PositionSizer.size_batch(
+                regime=[regime] * len(confidence),
+                risk=[risk] * len(confidence),
+                confidence=confidence
+            )
+            scalar = [PositionSizer.size(regime=regime, risk=risk, confidence=c).fraction for c in confidence]
+            assert batch.tolist() == scalar, (regime, risk)
+
+
+def test_flat_book_matches_sizer_fractions():
+    fractions = PositionSizer.size_batch(
+        regime=["TRENDING", "RANGING", "DEAD"],
+        risk=["LOW", "MEDIUM", "LOW"],
+        confidence=[0.8, 0.6, 0.9]
+    )
+    alloc = PortfolioAllocator(10_000).allocate(["BUY", "BUY", "BUY"], fractions, ["TRENDING", "RANGING", "DEAD"], [10.0, 20.0, 5.0])
+
+    np.testing.assert_allclose(alloc.fraction, fractions)
+    np.testing.assert_allclose(alloc.quantity, fractions * 10_000 / [10.0, 20.0, 5.0])
+    assert alloc.budget_scale == 1.0
+
+
+def test_buy_while_long_and_hold_keep_exact_quantity():
+    allocator = PortfolioAllocator(10_000)
+    current = [30.0, 12.5]
+    alloc = allocator.allocate(["BUY", "HOLD"], [0.4, 0.4], ["TRENDING", "RANGING"], [10.0, 20.0], current)
+    assert alloc.quantity.tolist() == current
+
+
+def test_new_entries_do_not_cut_held_positions():
+    allocator = PortfolioAllocator(10_000, budget=0.5)
+    # 0.3 held (HOLD) + two new BUYs of 0.25 → only 0.2 left for the new ones
+    alloc = allocator.allocate(
+        ["HOLD", "BUY", "BUY"], [0.0, 0.25, 0.25], ["RANGING", "TRENDING", "TRENDING"],
+        [10.0, 10.0, 10.0], [300.0, 0.0, 0.0]
+    )
+    assert alloc.quantity[0] == 300.0
+    np.testing.assert_allclose(alloc.fraction, [0.3, 0.1, 0.1])
+    assert alloc.gross == pytest.approx(0.5)
+
+
+def test_held_positions_cut_only_when_they_breach_a_cap():
+    allocator = PortfolioAllocator(10_000, regime_caps={"VOLATILE": 0.2})
+    alloc = allocator.allocate(["HOLD", "HOLD"], [0.0, 0.0], ["VOLATILE", "VOLATILE"], [10.0, 10.0], [200.0, 200.0])
+    np.testing.assert_allclose(alloc.fraction, [0.1, 0.1])
+    assert alloc.regime_scale[2] == pytest.approx(0.5)
+
+
+def test_small_changes_keep_current_but_full_exits_trade():
+    allocator = PortfolioAllocator(10_000, regime_caps={"VOLATILE": 0.1}, min_change=0.01)
+    # held 0.105 → cap 0.1 for VOLATILE: change 0.005 < min_change → no trade
+    alloc = allocator.allocate(["HOLD", "SELL"], [0.0, 0.0], ["VOLATILE", "RANGING"], [10.0, 10.0], [105.0, 5.0])
+    assert alloc.quantity.tolist() == [105.0, 0.0]
+
+
+def test_dead_regime_target_is_executed():
+    trader = PaperTrader(DecisionEngine(), "BTC", trade_log=lambda **_: None)
+    trader.rebalance(10.0, 100.0)
+    payload = {"decision": "HOLD", "confidence": 0.9, "explain": {}, "regime": "DEAD", "risk": "LOW"}
+    prices = [100.0] * 20
+
+    trader.step(prices, [1.0] * 20, decision_payload=payload)
+    assert trader.quantity == 10.0          # single-name: DEAD → no trading
+
+    trader.step(prices, [1.0] * 20, target=0.0, decision_payload=payload)
+    assert trader.quantity == 0.0 and trader.position is None
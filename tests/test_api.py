@@ -0,0 +1,123 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from models.schemas import MAX_BATCH_ITEMS
+from core.cache import pack_series
+
+PRICES = [100.0 + (i % 5) for i in range(30)]
+VOLUMES = [1_000.0] * 30
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture(scope="module")
+def headers(client):
+    key = client.post("/api/register", json={"email": "api@test.local", "plan": "enterprise"}).json()["api_key"]
+    return {"Authorization": key}
+
+
+def test_decide_json_and_binary_agree(client, headers):
+    by_json = client.post("/api/decide", json={"prices": PRICES, "volumes": VOLUMES}, headers=headers)
+    by_raw = client.post(
+        "/api/decide",
+        content=pack_series(PRICES) + pack_series(VOLUMES),
+        headers={**headers, "Content-Type": "application/octet-stream"}
+    )
+    assert by_json.status_code == by_raw.status_code == 200
+    assert by_json.json() == by_raw.json()
+
+
+@pytest.mark.parametrize("body", ["[1, 2]", "3", "not json"])
+def test_decide_rejects_non_object_json(client, headers, body):
+    r = client.post("/api/decide", content=body, headers={**headers, "Content-Type": "application/json"})
+    assert r.status_code in (400, 422)
+
+
+def test_decide_rejects_short_binary_series(client, headers):
+    r = client.post(
+        "/api/decide",
+        content=pack_series(PRICES[:5]) + pack_series(VOLUMES[:5]),
+        headers={**headers, "Content-Type": "application/octet-stream"}
+    )
+    assert r.status_code == 422
+
+
+def test_decide_batch_matches_single_decide(client, headers):
+    items = [{"prices": PRICES, "volumes": VOLUMES}, {"prices": PRICES[::-1], "volumes": VOLUMES}]
+    batch = client.post("/api/decide/batch", json={"items": items}, headers=headers)
+    assert batch.status_code == 200
+
+    for item, decision in zip(items, batch.json()["decisions"]):
+        single = client.post("/api/decide", json=item, headers=headers).json()
+        assert {k: v for k, v in decision.items() if k != "timestamp"} == \
+               {k: v for k, v in single.items() if k != "timestamp"}
+
+
+@pytest.mark.parametrize("items", [
+    [],
+    [{"prices": PRICES, "volumes": VOLUMES[:-1]}],
+    [{"prices": PRICES, "volumes": VOLUMES}] * (MAX_BATCH_ITEMS + 1),
+])
+def test_decide_batch_rejects_invalid_items(client, headers, items):
+    r = client.post("/api/decide/batch", json={"items": items}, headers=headers)
+    assert r.status_code == 422
+
+
+def test_decide_rejects_mismatched_json_lengths(client, headers):
+    r = client.post("/api/decide", json={"prices": PRICES, "volumes": VOLUMES[:-1]}, headers=headers)
+    assert r.status_code == 422
+
+
+def learn_body(strategy, old, new):
+    prices = [100.0 + i for i in range(len(new))]
+    return {"strategy": strategy, "realized_return": 0.01, "prices": prices,
+            "old_decisions": old, "new_decisions": new}
+
+
+def test_learn_applies_approved_updates(client, headers):
+    engine = main.ENGINES.get()
+    strategy = next(iter(engine.weighter.stats))
+    plays = engine.weighter.stats[strategy].plays
+
+    new = ["BUY"] + ["HOLD"] * 18 + ["SELL"]     # uptrend: one winning trade
+    r = client.post("/api/learn", json=learn_body(strategy, ["HOLD"] * 20, new), headers=headers)
+    assert r.status_code == 200
+    assert r.json()["status"] == "approved"
+    assert engine.weighter.stats[strategy].plays == plays + 1
+
+    r = client.post("/api/learn", json=learn_body(strategy, new, ["HOLD"] * 20), headers=headers)
+    assert r.json()["status"] == "rejected"
+    assert engine.weighter.stats[strategy].plays == plays + 1
+
+
+@pytest.mark.parametrize("body", [
+    learn_body("no-such-strategy", ["HOLD"] * 20, ["BUY"] * 20),
+    {**learn_body("x", ["HOLD"] * 20, ["BUY"] * 20), "new_decisions": ["BUY"] * 19},
+    {**learn_body("x", ["HOLD"] * 20, ["BUY"] * 20), "old_decisions": ["MAYBE"] * 20},
+])
+def test_learn_rejects_invalid_bodies(client, headers, body):
+    r = client.post("/api/learn", json=body, headers=headers)
+    assert r.status_code == 422
+
+
+@pytest.mark.parametrize("bad", [float("nan"), float("inf"), float("-inf")])
+def test_decide_rejects_non_finite_values(client, headers, bad):
+    prices = PRICES[:-1] + [bad]
+    raw = client.post(
+        "/api/decide",
+        content=pack_series(prices) + pack_series(VOLUMES),
+        headers={**headers, "Content-Type": "application/octet-stream"}
+    )
+    assert raw.status_code == 422
+
+    literal = {"nan": "NaN", "inf": "Infinity", "-inf": "-Infinity"}[repr(bad)]
+    body = '{"prices": [%s], "volumes": [%s]}' % (
+        ", ".join(map(repr, PRICES[:-1])) + ", " + literal,
+        ", ".join(map(repr, VOLUMES))
+    )
+    js = client.post("/api/decide", content=body, headers={**headers, "Content-Type": "application/json"})
+    assert js.status_code == 422
@@ -0,0 +1,136 @@
+import os
+
+import numpy as np
+import pytest
+
+from core.clock import ReplayClock
+from data.archive import (
+    ArchiveFeed, KlineArchive, ReplayExhausted, _file_size, archive_path, import_csv,
+)
+
+MINUTE = 60_000
+
+
+def bars(n, t0=1_700_000_000_000, close0=100.0):
+    t = t0 + MINUTE * np.arange(n, dtype=np.int64)
+    close = close0 + np.arange(n, dtype=float)
+    return t, close - 0.5, close + 1.0, close - 1.0, close, 10.0 + np.arange(n, dtype=float)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return KlineArchive(archive_path(str(tmp_path), "BTCUSDT", "1m"), writable=True, capacity=8)
+
+
+def test_append_and_range_views(archive):
+    t, o, h, l, c, v = bars(5)
+    assert archive.append(t, o, h, l, c, v) == 5
+    assert len(archive) == 5 and archive.last_open == t[-1]
+
+    closes, volumes = archive.range(t[1], t[4])
+    assert closes.tolist() == c[1:4].tolist() and volumes.tolist() == v[1:4].tolist()
+    assert not closes.flags.owndata          # view على الملف، بلا نسخ
+    assert archive.span(t[-1] + 1) == (5, 5)
+    assert [x.tolist() for x in archive.rows(-3, 2, ("open_time",))] == [t[:2].tolist()]
+
+
+def test_growth_remaps_and_readers_refresh(archive):
+    reader_path = archive.path
+    archive.append(*bars(6))
+    reader = KlineArchive(reader_path)
+    assert os.path.getsize(reader_path) == _file_size(8)
+
+    t, o, h, l, c, v = bars(30)
+    assert archive.append(t, o, h, l, c, v) == 24
+    assert archive.capacity == 32 and os.path.getsize(reader_path) == _file_size(32)
+    for name, col in zip(("open_time", "open", "high", "low", "close", "volume"), (t, o, h, l, c, v)):
+        assert archive.column(name).tolist() == col.tolist(), name
+
+    assert len(reader) == 6                  # الخريطة القديمة
+    reader.refresh()
+    assert len(reader) == 30 and reader.column("close").tolist() == c.tolist()
+
+
+def test_dedup_by_open_time(archive):
+    t, o, h, l, c, v = bars(4)
+    # مكرر داخل الدفعة: آخر نسخة هي الصحيحة، والترتيب لا يهم
+    shuffled = [3, 0, 2, 1, 2]
+    close = c[shuffled].copy()
+    close[-1] = 999.0
+    archive.append(t[shuffled], o[shuffled], h[shuffled], l[shuffled], close, v[shuffled])
+    assert archive.open_time.tolist() == t.tolist()
+    assert archive.column("close").tolist() == [c[0], c[1], 999.0, c[3]]
+
+    # الشمعة الأخيرة تُستبدل، الأقدم تُتجاهل، الأحدث تُضاف
+    added = archive.append([t[1], t[3], t[3] + MINUTE], [0] * 3, [0] * 3, [0] * 3, [-1.0, 50.0, 51.0], [1] * 3)
+    assert added == 1
+    assert archive.column("close").tolist() == [c[0], c[1], 999.0, 50.0, 51.0]
+    assert archive.append([t[0]], [0], [0], [0], [0], [0]) == 0
+
+
+def test_append_validation(tmp_path, archive):
+    with pytest.raises(ValueError):
+        archive.append([1, 2], [1.0], [1.0], [1.0], [1.0], [1.0])
+    assert archive.append([], [], [], [], [], []) == 0
+
+    archive.append(*bars(2))
+    with pytest.raises(PermissionError):
+        KlineArchive(archive.path).append(*bars(1))
+    with pytest.raises(FileNotFoundError):
+        KlineArchive(str(tmp_path / "missing.qka"))
+
+    bogus = tmp_path / "bogus.qka"
+    bogus.write_bytes(b"\0" * 256)
+    with pytest.raises(ValueError):
+        KlineArchive(str(bogus))
+
+
+@pytest.mark.parametrize("header,micros", [(True, False), (False, True)])
+def test_import_csv(tmp_path, archive, header, micros):
+    t, o, h, l, c, v = bars(10)
+    scale = 1000 if micros else 1
+    lines = ["open_time,open,high,low,close,volume,close_time,quote"] if header else []
+    lines += [f"{ti * scale},{oi},{hi},{li},{ci},{vi},{ti + MINUTE - 1},0" for ti, oi, hi, li, ci, vi in zip(t, o, h, l, c, v)]
+    path = tmp_path / "dump.csv"
+    path.write_text("\n".join(lines) + "\n")
+
+    assert import_csv(str(path), archive) == 10
+    assert archive.open_time.tolist() == t.tolist()
+    assert archive.column("close").tolist() == c.tolist()
+    assert import_csv(str(path), archive) == 0          # إعادة الاستيراد لا تكرر
+
+
+def test_feed_replays_then_raises(tmp_path, archive):
+    t, o, h, l, c, v = bars(8)
+    archive.append(t, o, h, l, c, v)
+    archive.flush()
+    feed = ArchiveFeed(str(tmp_path), step=2)
+
+    assert feed.remaining("BTCUSDT") == 8
+    seen = []
+    with pytest.raises(ReplayExhausted):
+        while True:
+            closes, _ = feed.fetch_klines("BTCUSDT", "1m", limit=4)
+            seen.append(closes.tolist())
+    assert seen == [c[0:4].tolist(), c[2:6].tolist(), c[4:8].tolist()]
+    assert feed.remaining("BTCUSDT") == 0
+
+
+def test_feed_follows_the_replay_clock(tmp_path, archive):
+    t, o, h, l, c, v = bars(8)
+    archive.append(t, o, h, l, c, v)
+    archive.flush()
+    feed = ArchiveFeed(str(tmp_path))
+    start = feed.start_time(["BTCUSDT"], limit=3)
+    assert start == t[3] / 1000.0
+
+    clock = ReplayClock(start)
+    feed.clock = clock
+    assert feed.fetch_klines("BTCUSDT", limit=3)[0].tolist() == c[0:3].tolist()
+    clock.advance_to((t[5] + 1) / 1000.0)
+    assert feed.fetch_klines("BTCUSDT", limit=3)[0].tolist() == c[3:6].tolist()
+
+    clock.advance_to(t[-1] / 1000.0 + 3600)
+    assert feed.fetch_klines("BTCUSDT", limit=3)[0].tolist() == c[5:8].tolist()
+    with pytest.raises(ReplayExhausted):
+        feed.fetch_klines("BTCUSDT", limit=3)
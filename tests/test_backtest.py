@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from core.backtest import BacktestEngine, encode_decisions, threshold_signals
+
+METRICS = ("final_capital", "net_profit", "trades", "win_rate", "max_drawdown", "sharpe_ratio")
+
+
+def random_case(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    decisions = rng.choice(["BUY", "HOLD", "SELL"], n, p=[0.2, 0.6, 0.2]).tolist()
+    return prices.tolist(), decisions
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_run_vectorized_matches_run(seed):
+    prices, decisions = random_case(seed=seed)
+    bt = BacktestEngine()
+    scalar, vector = bt.run(prices, decisions), bt.run_vectorized(prices, decisions)
+    for key in METRICS:
+        assert vector[key] == pytest.approx(scalar[key], rel=1e-9, abs=1e-9), key
+
+
+def test_run_many_matches_run_per_row():
+    prices, _ = random_case()
+    rng = np.random.default_rng(9)
+    signals = rng.integers(-1, 2, (7, len(prices))).astype(np.int8)
+    bt = BacktestEngine()
+
+    out = bt.run_many(prices, signals, max_cells=len(prices) * 3)      # several blocks
+    for i, row in enumerate(signals):
+        scalar = bt.run(prices, [{1: "BUY", -1: "SELL", 0: "HOLD"}[c] for c in row.tolist()])
+        for key in METRICS:
+            assert out[key][i] == pytest.approx(scalar[key], rel=1e-9, abs=1e-9), key
+
+
+def test_advance_resumes_a_run():
+    prices, decisions = random_case()
+    bt = BacktestEngine()
+    state = bt.advance(bt.start(), prices[:120], decisions[:120])
+    bt.advance(state, prices[120:], decisions[120:])
+    assert bt.metrics(state) == bt.run(prices, decisions)
+
+
+def test_decision_codes():
+    codes = encode_decisions(["BUY", "HOLD", "SELL", "???"])
+    assert codes.dtype == np.int8 and codes.tolist() == [1, 0, -1, 0]
+    assert encode_decisions(codes) is codes
+
+    signals = threshold_signals([0.5, 0.05, -0.2, -0.01], [0.1, 0.3])
+    assert signals.tolist() == [[1, 0, -1, 0], [1, 0, 0, 0]]
+
+
+def test_threshold_sweep_matches_decide_rule():
+    prices, _ = random_case(seed=3)
+    rng = np.random.default_rng(4)
+    scores = rng.normal(0, 0.2, len(prices))
+    thresholds = [0.0, 0.05, 0.15, 0.3, 1.0]
+    bt = BacktestEngine()
+
+    out = bt.run_many(prices, threshold_signals(scores, thresholds))
+    for i, t in enumerate(thresholds):
+        decisions = ["BUY" if s > t else "SELL" if s < -t else "HOLD" for s in scores]
+        scalar = bt.run(prices, decisions)
+        for key in METRICS:
+            assert out[key][i] == pytest.approx(scalar[key], rel=1e-9, abs=1e-9), (t, key)
+    assert out["trades"][-1] == 0 and out["net_profit"][-1] == 0.0
+
+
+def test_run_many_edge_shapes():
+    bt = BacktestEngine()
+    empty = bt.run_many([], np.zeros((3, 0), dtype=np.int8))
+    assert empty["final_capital"].tolist() == [bt.initial_capital] * 3
+
+    # signals longer than prices are cut to the price series
+    prices, decisions = random_case(n=50)
+    codes = encode_decisions(decisions + ["BUY"] * 10)[None, :]
+    assert bt.run_many(prices, codes)["final_capital"][0] == pytest.approx(
+        bt.run(prices, decisions)["final_capital"], rel=1e-12
+    )
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import core.cache as cache_module
+import main
+from core.cache import DecisionCache, decision_key, pack_series
+
+PRICES = [100.0 + (i % 7) * 0.5 for i in range(30)]
+VOLUMES = [500.0 + i for i in range(30)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(t=1_000.0)
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: now.t))
+    return now
+
+
+def test_lru_eviction_at_capacity(clock):
+    cache = DecisionCache(capacity=2, ttl=60)
+    cache.put(b"a", 1)
+    cache.put(b"b", 2)
+    assert cache.get(b"a") == 1             # a أحدث استخدامًا من b
+    cache.put(b"c", 3)
+
+    assert len(cache) == 2 and cache.evictions == 1
+    assert cache.get(b"b") is None
+    assert (cache.get(b"a"), cache.get(b"c")) == (1, 3)
+
+    cache.put(b"a", 10)                     # تحديث لا يطرد شيئًا
+    assert cache.get(b"a") == 10 and cache.evictions == 1
+
+
+def test_ttl_expiry(clock):
+    cache = DecisionCache(capacity=4, ttl=30)
+    cache.put(b"k", "v")
+
+    clock.t += 29.9
+    assert cache.get(b"k") == "v"
+    clock.t += 0.1
+    assert cache.get(b"k") is None
+    assert len(cache) == 0                  # المنتهي يُحذف عند القراءة
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_zero_capacity_disables_caching(clock):
+    cache = DecisionCache(capacity=0)
+    cache.put(b"k", "v")
+    assert cache.get(b"k") is None
+    assert len(cache) == 0 and cache.stats()["hit_rate"] == 0.0
+
+
+def test_key_covers_inputs_and_version():
+    p, v = pack_series(PRICES), pack_series(VOLUMES)
+    key = decision_key(p, v, 1)
+    assert key == decision_key(memoryview(p), memoryview(v), 1)
+    assert key != decision_key(p, v, 2)
+    assert key != decision_key(pack_series(PRICES[:-1] + [PRICES[-1] + 1e-9]), v, 1)
+    # نفس البايتات مقسومة بشكل مختلف → مفتاح مختلف
+    assert decision_key(p + v[:8], v[8:], 1) != key
+
+
+def test_learn_invalidates_cached_decisions():
+    client = TestClient(main.app)
+    key = client.post("/api/register", json={"email": "cache@test.local", "plan": "enterprise"}).json()["api_key"]
+    headers = {"Authorization": key}
+    cache = main.DECISION_CACHE
+    if cache.capacity <= 0:
+        pytest.skip("decision cache disabled (QNEXUS_DECISION_CACHE=0)")
+
+    body = {"prices": PRICES, "volumes": VOLUMES}
+    first = client.post("/api/decide", json=body, headers=headers)
+    hits, misses = cache.hits, cache.misses
+    again = client.post("/api/decide", json=body, headers=headers)
+    assert (cache.hits, cache.misses) == (hits + 1, misses)
+    assert again.json() == first.json()
+
+    engine = main.ENGINES.get()
+    version = engine.weighter.version
+    strategy = next(iter(engine.weighter.stats))
+    learn = {
+        "strategy": strategy, "realized_return": 0.01,
+        "prices": [100.0 + i for i in range(20)],
+        "old_decisions": ["HOLD"] * 20,
+        "new_decisions": ["BUY"] + ["HOLD"] * 18 + ["SELL"],
+    }
+    assert client.post("/api/learn", json=learn, headers=headers).json()["status"] == "approved"
+    assert engine.weighter.version > version
+
+    hits, misses = cache.hits, cache.misses
+    client.post("/api/decide", json=body, headers=headers)
+    assert (cache.hits, cache.misses) == (hits, misses + 1)
@@ -0,0 +1,70 @@
+import asyncio
+
+from core.clock import ReplayClock
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_sleepers_wake_in_deadline_order():
+    clock = ReplayClock(1_000.0)
+    woke = []
+
+    async def sleeper(name, deadlines):
+        for deadline in deadlines:
+            await clock.sleep_until(deadline)
+            woke.append((name, clock.time()))
+
+    async def main():
+        await asyncio.gather(
+            clock.participate(sleeper("a", [1_010.0, 1_030.0])),
+            clock.participate(sleeper("b", [1_020.0, 1_030.0, 1_050.0])),
+        )
+
+    run(main())
+    assert woke == [("a", 1010.0), ("b", 1020.0), ("a", 1030.0), ("b", 1030.0), ("b", 1050.0)]
+    assert clock._pending == 0 and clock._participants == 0
+
+
+def test_stopped_waiter_is_not_counted():
+    clock = ReplayClock(0.0)
+
+    async def main():
+        event = asyncio.Event()
+        ticks = []
+
+        async def ticker():
+            while not event.is_set():
+                await clock.sleep_until(clock.time() + 1.0, event)
+                ticks.append(clock.time())
+                if len(ticks) == 3:
+                    event.set()
+
+        async def idler():
+            await clock.sleep_until(1e9, event)
+
+        await asyncio.gather(clock.participate(ticker()), clock.participate(idler()))
+        return ticks
+
+    # idler waits for a far deadline: the ticker still advances time
+    assert run(main()) == [1.0, 2.0, 3.0]
+    assert clock._pending == 0
+
+
+def test_cancelled_sleeper_releases_the_others():
+    clock = ReplayClock(0.0)
+
+    async def main():
+        clock.join()
+        clock.join()
+        far = asyncio.ensure_future(clock.sleep_until(100.0))
+        await asyncio.sleep(0)
+        far.cancel()
+        await asyncio.gather(far, return_exceptions=True)
+        clock.leave()
+        await clock.sleep_until(5.0)
+        clock.leave()
+
+    run(main())
+    assert clock.time() == 5.0 and clock._pending == 0
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from core.engine import MarketStateEngine
+
+
+def windows(n=6, length=40, seed=11, drift=0.0, sigma=0.01):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(drift + rng.normal(0, sigma, (n, length)), axis=1))
+    volumes = rng.integers(100, 1000, (n, length)).astype(float)
+    return prices, volumes
+
+
+def test_batch_rows_are_plain_floats():
+    prices, volumes = windows()
+    batch = MarketStateEngine.compute_batch(prices, volumes)
+    for i in range(len(prices)):
+        row = batch.row(i)
+        assert all(type(getattr(row, f)) is float for f in
+                   ("momentum", "volatility", "entropy", "volume_pressure", "trend_strength"))
+
+
+def test_bandit_snapshot_is_a_copy():
+    from core.engine import DecisionEngine
+
+    weighter = DecisionEngine().weighter
+    name = next(iter(weighter.stats))
+    stats, t = weighter.snapshot()
+    weighter.update(name, 0.05)
+
+    assert (stats[name].plays, stats[name].ewma_return, t) == (0, 0.0, 0)
+    assert weighter.stats[name].plays == 1
+
+
+# =========================
+# VECTORIZED vs SCALAR
+# =========================
+from core.engine import DecisionEngine
+
+STATE_FIELDS = ("momentum", "volatility", "entropy", "volume_pressure", "trend_strength")
+
+
+def warm_engine(seed=5):
+    engine = DecisionEngine()
+    rng = np.random.default_rng(seed)
+    names = list(engine.weighter.stats)
+    for _ in range(60):
+        engine.weighter.update(names[int(rng.integers(len(names)))], float(rng.normal(0.01, 0.02)))
+    return engine
+
+
+def test_compute_batch_matches_compute():
+    prices, volumes = windows()
+    batch = MarketStateEngine.compute_batch(prices, volumes)
+    for i in range(len(prices)):
+        scalar = MarketStateEngine.compute(prices[i], volumes[i])
+        for f in STATE_FIELDS:
+            assert getattr(batch.row(i), f) == pytest.approx(getattr(scalar, f), rel=1e-12, abs=1e-12)
+
+
+def test_decide_batch_matches_decide():
+    engine = warm_engine()
+    # من هبوط قوي إلى صعود قوي: BUY / SELL / HOLD وكل الـ Regimes تقريبًا
+    prices, volumes = windows(n=12, seed=2, drift=np.linspace(-0.006, 0.006, 12)[:, None], sigma=0.003)
+    mixed_p = [list(p[i % 3:]) for i, p in enumerate(prices)]       # several window lengths
+    mixed_v = [list(v[i % 3:]) for i, v in enumerate(volumes)]
+
+    for batch_p, batch_v in ((prices, volumes), (mixed_p, mixed_v)):
+        batch = engine.decide_batch(batch_p, batch_v)
+        for p, v, out in zip(batch_p, batch_v, batch):
+            single = engine.decide(p, v)
+            assert (out["decision"], out["risk"], out["regime"]) == (single["decision"], single["risk"], single["regime"])
+            assert out["confidence"] == pytest.approx(single["confidence"], abs=1e-3)
+            for name, c in single["explain"].items():
+                assert out["explain"][name] == pytest.approx(c, rel=1e-9, abs=1e-12)
+
+    assert {d["decision"] for d in engine.decide_batch(prices, volumes)} != {"HOLD"}
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from core.engine import DecisionEngine
+from core.evaluator import LearningGate
+from core.paper_trader import PaperTrader
+from core.snapshot import dumps, loads
+
+
+def random_run(n=200, seed=3):
+    rng = np.random.default_rng(seed)
+    prices = (100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))).tolist()
+    decisions = rng.choice(["BUY", "HOLD", "SELL"], n).tolist()
+    return prices, decisions
+
+
+def test_running_state_matches_full_backtest():
+    prices, decisions = random_run()
+    gate = LearningGate()
+    state = gate.start()
+    for price, decision in zip(prices, decisions):
+        gate.feed(state, price, decision)
+
+    assert gate.metrics(state) == gate.backtester.run(prices, decisions)
+
+
+def test_judge_on_running_state_matches_approve():
+    prices, decisions = random_run()
+    gate = LearningGate()
+    for n in (11, 50, 120, 200):
+        state = gate.start()
+        for price, decision in zip(prices[:n - 1], decisions[:n - 1]):
+            gate.feed(state, price, decision)
+        old_metrics = gate.metrics(state)
+        gate.feed(state, prices[n - 1], decisions[n - 1])
+
+        running = gate.judge(old_metrics, gate.metrics(state))
+        assert running == gate.approve(prices[:n], decisions[:n - 1], decisions[:n])
+
+
+def test_approve_without_shared_prefix():
+    prices, decisions = random_run(60)
+    other = ["SELL" if d == "BUY" else d for d in decisions]
+    gate = LearningGate()
+    verdict = gate.approve(prices, decisions, other)
+    expected = gate.judge(gate.backtester.run(prices, decisions), gate.backtester.run(prices, other))
+    assert verdict == expected
+
+
+def test_snapshot_keeps_gate_state():
+    prices, decisions = random_run(40)
+    engine = DecisionEngine()
+    trader = PaperTrader(engine, "BTC", trade_log=lambda **_: None)
+    for price, decision in zip(prices, decisions):
+        trader.decisions_buffer.append(decision)
+        engine.gate.feed(trader.gate_state, price, decision)
+        trader.gate_prices.append(price)
+
+    restored = PaperTrader(DecisionEngine(), "BTC", trade_log=lambda **_: None)
+    loads(dumps(engine, trader), restored.engine, restored)
+
+    assert restored.decisions_buffer == trader.decisions_buffer
+    assert restored.gate_state == trader.gate_state
+
+
+# =========================
+# PaperTrader: same verdicts as approve(prices[-n:], buffer[:-1], buffer)
+# =========================
+from core.risk_control import KillSwitch, RiskLimits
+from core.simulation import prime_engine
+
+
+class ApproveOnly(PaperTrader):
+    """The pre-running-state gate: full approve() on every verdict"""
+
+    def _gate_verdict(self, prices, decision):
+        buffer = self.decisions_buffer
+        return self.engine.gate.approve(prices[-len(buffer):], buffer[:-1], buffer)
+
+
+def verdicts(trader_cls, prices, volumes, window, repeat_every):
+    engine = DecisionEngine()
+    prime_engine(engine, prices[:600], volumes[:600], 50)
+    trader = trader_cls(engine, "SIM", trade_log=lambda **_: None)
+    trader.kill_switch = KillSwitch(RiskLimits(-1.0, 10 ** 6, 10.0), clock=trader.clock)
+
+    out, full = [], []
+    approve = engine.gate.approve
+    engine.gate.approve = lambda *a, **kw: full.append(1) or approve(*a, **kw)
+    judge = trader._gate_verdict
+    trader._gate_verdict = lambda prices, decision: out.append(judge(prices, decision)) or out[-1]
+
+    end, tick = 600, 0
+    while end <= len(prices):
+        trader.step(prices[end - window:end], volumes[end - window:end])
+        tick += 1
+        if not repeat_every or tick % repeat_every:     # أحيانًا نفس النافذة مرتين
+            end += 1
+    return out, len(full)
+
+
+# (window, repeat_every): buffers longer than the window, repeated windows
+# and (300, 0) where the running state holds the exact approve() pairs
+@pytest.mark.parametrize("window, repeat_every", [(50, 0), (20, 0), (300, 0), (300, 7)])
+def test_paper_trader_verdicts_match_full_approve(window, repeat_every):
+    rng = np.random.default_rng(4)
+    n = 3000
+    drift = np.repeat(rng.choice([-0.004, 0.0, 0.004], n // 30 + 1), 30)[:n]
+    prices = 100 * np.exp(np.cumsum(drift + rng.normal(0, 0.008, n)))
+    volumes = rng.integers(100, 1000, n).astype(float)
+
+    expected, _ = verdicts(ApproveOnly, prices, volumes, window, repeat_every)
+    got, full = verdicts(PaperTrader, prices, volumes, window, repeat_every)
+    assert len(expected) >= 5
+    assert got == expected
+    if (window, repeat_every) == (300, 0):
+        assert full < len(got)          # some verdicts came from the running state
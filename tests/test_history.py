@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+import pytest
+
+import db.history as history
+from db.history import TradeStore
+
+MARKETS = ("crypto", "gold", "energy", "stocks")
+STRATEGIES = ("momentum", "mean_reversion", "breakout", "volatility")
+
+
+@pytest.fixture
+def store(monkeypatch):
+    fresh = TradeStore(meta_retention=5)
+    monkeypatch.setattr(history, "TRADE_STORE", fresh)
+    return fresh
+
+
+@pytest.fixture
+def trades(store):
+    rng = np.random.default_rng(3)
+    logged = []
+    for i in range(400):
+        market = MARKETS[int(rng.choice(4, p=[0.55, 0.25, 0.15, 0.05]))]
+        logged.append(history.log_trade(
+            market=market,
+            symbol=f"{market[:3].upper()}{int(rng.integers(5))}",
+            strategy=STRATEGIES[int(rng.integers(4))],
+            decision=("BUY", "SELL", "HOLD")[int(rng.integers(3))],
+            price=float(rng.uniform(10, 100)),
+            confidence=float(rng.random()),
+            volume=float(rng.integers(1, 1000)),
+            pnl=float(rng.choice([0.0, rng.normal(0, 1)])),
+            meta={"i": i},
+            timestamp=1_700_000_000 + i,
+        ))
+    return logged
+
+
+def strip_meta(rows):
+    return [{k: v for k, v in r.items() if k != "meta"} for r in rows]
+
+
+@pytest.mark.parametrize("market", [None, *MARKETS, "unknown"])
+@pytest.mark.parametrize("strategy", [None, *STRATEGIES, "unknown"])
+def test_get_history_matches_a_list_scan(trades, market, strategy):
+    expected = [t for t in trades
+                if (market is None or t["market"] == market)
+                and (strategy is None or t["strategy"] == strategy)]
+    assert strip_meta(history.get_history(market, strategy)) == strip_meta(expected)
+
+
+def test_indexes_hold_every_row_once(store, trades):
+    for index, column in ((store.by_market, store.market), (store.by_strategy, store.strategy)):
+        rows = sorted(r for rs in index.values() for r in rs)
+        assert rows == list(range(len(trades)))
+        for code, rs in index.items():
+            assert all(column[r] == code for r in rs)
+            assert list(rs) == sorted(rs)
+
+
+def test_aggregates_match_a_list_scan(trades):
+    assert history.calculate_pnl() == pytest.approx(math.fsum(t["pnl"] for t in trades), abs=1e-9)
+    assert history.win_rate() == sum(t["pnl"] > 0 for t in trades) / len(trades)
+
+
+def test_empty_store(store):
+    assert history.get_history() == [] and history.get_history("crypto", "momentum") == []
+    assert (history.calculate_pnl(), history.win_rate()) == (0.0, 0.0)
+
+
+def test_sequence_view_and_meta_retention(store, trades):
+    assert len(store) == len(trades)
+    assert store[-1]["id"] == trades[-1]["id"] and store[0]["id"] == trades[0]["id"]
+    assert [r["id"] for r in store[10:13]] == [t["id"] for t in trades[10:13]]
+    with pytest.raises(IndexError):
+        store[len(trades)]
+
+    # meta فقط لآخر meta_retention صفوف
+    assert [r["meta"] for r in store[-6:]] == [{}] + [{"i": i} for i in range(395, 400)]
@@ -0,0 +1,40 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from bench.imports import _PROBE, BUDGETS
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# هامش واسع فوق BUDGETS (أجهزة CI البطيئة)؛ QNEXUS_IMPORT_MARGIN=0 يعطّل التوقيت
+MARGIN = float(os.getenv("QNEXUS_IMPORT_MARGIN", "3"))
+
+
+def run_python(code, *args):
+    out = subprocess.run([sys.executable, "-c", code, *args], cwd=ROOT, check=True, capture_output=True, text=True)
+    return out.stdout.strip().splitlines()[-1]
+
+
+def test_main_does_not_import_engine_numpy_or_requests():
+    code = "import sys, main; print(sorted(m for m in ('numpy', 'core.engine', 'requests') if m in sys.modules))"
+    assert run_python(code) == "[]"
+
+
+@pytest.mark.parametrize("budget", BUDGETS, ids=lambda b: b.module)
+def test_import_budget_lazy_modules(budget):
+    # bench.imports --check, minus the timing: only which modules got imported
+    probe = json.loads(run_python(_PROBE, budget.module, ",".join(budget.floor), ",".join(budget.lazy)))
+    assert probe["eager"] == []
+
+
+@pytest.mark.skipif(MARGIN <= 0, reason="import timing disabled (QNEXUS_IMPORT_MARGIN=0)")
+@pytest.mark.parametrize("budget", BUDGETS, ids=lambda b: b.module)
+def test_import_budget_time(budget):
+    args = (budget.module, ",".join(budget.floor), ",".join(budget.lazy))
+    ms = statistics.median(json.loads(run_python(_PROBE, *args))["ms"] for _ in range(3))
+    assert ms <= budget.budget_ms * MARGIN, f"{budget.module}: {ms:.1f} ms (budget {budget.budget_ms:.0f} ms)"
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from db import journal as journal_module
+from db.history import TradeStore
+from db.journal import MAX_STRING_BYTES, RECORD_SIZE, TradeJournal, segment_paths
+
+
+def trade(i, **overrides):
+    row = dict(
+        trade_id=i.to_bytes(16, "little"), market="crypto", symbol=f"SYM{i % 3}",
+        strategy=("momentum", "mean_reversion")[i % 2], decision=("BUY", "SELL", "HOLD")[i % 3],
+        price=100.0 + i, volume=float(i), confidence=0.5, pnl=(i % 5 - 2) * 0.1, timestamp=1_700_000_000 + i
+    )
+    row.update(overrides)
+    return row
+
+
+def journaled_store(directory, **options):
+    store = TradeStore()
+    replayed = store.attach_journal(TradeJournal(str(directory), **options))
+    return store, replayed
+
+
+def test_replay_round_trip(tmp_path):
+    store, replayed = journaled_store(tmp_path, flush_interval=3600)
+    assert replayed == 0
+    for i in range(50):
+        store.append(**trade(i))
+    store.journal.close()
+
+    again, replayed = journaled_store(tmp_path)
+    assert replayed == 50
+    assert [again.record(r) for r in range(50)] == [{**store.record(r), "meta": {}} for r in range(50)]
+    assert again.total_pnl == pytest.approx(store.total_pnl)
+    assert list(again.rows(strategy="momentum")) == list(store.rows(strategy="momentum"))
+
+
+def test_segments_rotate_and_torn_tail_is_ignored(tmp_path):
+    store, _ = journaled_store(tmp_path, segment_bytes=RECORD_SIZE * 8, flush_bytes=RECORD_SIZE, flush_interval=0)
+    for i in range(20):
+        store.append(**trade(i))
+    store.journal.close()
+    assert len(segment_paths(str(tmp_path))) > 1
+
+    with open(segment_paths(str(tmp_path))[-1], "ab") as f:
+        f.write(b"\x01" * (RECORD_SIZE // 2))
+    again, replayed = journaled_store(tmp_path)
+    assert replayed == 20
+
+
+def test_oversized_string_leaves_store_unchanged(tmp_path):
+    store, _ = journaled_store(tmp_path)
+    store.append(**trade(0))
+
+    with pytest.raises(ValueError):
+        store.append(**trade(1, symbol="X" * (MAX_STRING_BYTES + 1)))
+    assert len(store) == 1 and "X" * (MAX_STRING_BYTES + 1) not in store.codes
+
+    store.append(**trade(2))
+    store.journal.close()
+    assert journaled_store(tmp_path)[1] == 2
+
+
+def test_fsync_runs_outside_the_store_lock(tmp_path, monkeypatch):
+    store, _ = journaled_store(tmp_path, flush_interval=0)
+    held = []
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        held.append(store._lock.locked())
+        real_fsync(fd)
+
+    monkeypatch.setattr(journal_module.os, "fsync", fsync)
+    for i in range(3):
+        store.append(**trade(i))
+    assert held and not any(held)
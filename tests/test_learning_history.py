@@ -0,0 +1,100 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from core.engine import DecisionEngine
+from core.learning_history import SPILL_BATCH, LearningHistory
+
+
+def test_ring_keeps_the_newest_records():
+    history = LearningHistory(capacity=3)
+    for i in range(5):
+        history.record("approved", strategy=f"s{i}", pnl=float(i))
+
+    assert len(history) == 3
+    assert [r["strategy"] for r in history] == ["s2", "s3", "s4"]
+    assert history[0]["strategy"] == "s2" and history[-1]["strategy"] == "s4"
+    with pytest.raises(IndexError):
+        history[3]
+
+    # العدّادات تغطي كل ما سُجّل، لا ما بقي فقط
+    stats = history.stats()
+    assert (stats["total"], stats["retained"], stats["pnl"]) == (5, 3, 10.0)
+
+
+def test_append_keeps_the_legacy_dict_shape():
+    history = LearningHistory(capacity=4)
+    history.append({"status": "approved", "strategy": "momentum", "return": 0.5, "extra": "dropped"})
+    history.append({})
+
+    first = history[0]
+    assert (first["status"], first["strategy"], first["pnl"]) == ("approved", "momentum", 0.5)
+    assert "extra" not in first
+    assert history[1]["status"] == "unknown"
+
+
+def test_stats_match_a_full_scan():
+    rng = np.random.default_rng(2)
+    history = LearningHistory(capacity=16)
+    rows = []
+    for _ in range(200):
+        status = str(rng.choice(["approved", "rejected", "KILLED"]))
+        imp = float(rng.normal(0.01, 0.05)) if status != "KILLED" else None
+        pnl = float(rng.normal(0, 1))
+        history.record(status, pnl=pnl, improvement=imp)
+        rows.append((status, pnl, imp))
+
+    stats = history.stats()
+    counts = {s: sum(r[0] == s for r in rows) for s in ("approved", "rejected", "KILLED")}
+    imps = np.array([r[2] for r in rows if r[2] is not None])
+
+    assert stats["counts"] == counts
+    assert stats["approval_rate"] == counts["approved"] / (counts["approved"] + counts["rejected"])
+    assert stats["pnl"] == pytest.approx(math.fsum(r[1] for r in rows), abs=1e-9)
+    assert stats["improvement"]["count"] == len(imps)
+    assert stats["improvement"]["mean"] == pytest.approx(imps.mean(), rel=1e-9)
+    assert stats["improvement"]["std"] == pytest.approx(imps.std(), rel=1e-9)
+    assert (stats["improvement"]["min"], stats["improvement"]["max"]) == (imps.min(), imps.max())
+
+
+def test_empty_stats():
+    stats = LearningHistory(capacity=1).stats()
+    assert stats["approval_rate"] == 0.0 and stats["improvement"]["std"] == 0.0
+    with pytest.raises(ValueError):
+        LearningHistory(capacity=0)
+
+
+def test_evicted_records_spill_in_batches(tmp_path):
+    path = tmp_path / "history.jsonl"
+    history = LearningHistory(capacity=2, spill_path=str(path))
+    total = SPILL_BATCH + 2 + 10            # أول دفعة كاملة + 10 في الذاكرة
+    for i in range(total):
+        history.record("approved", strategy=f"s{i}")
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == SPILL_BATCH
+
+    history.flush()
+    spilled = [json.loads(line)["strategy"] for line in path.read_text().splitlines()]
+    assert spilled == [f"s{i}" for i in range(total - 2)]
+    assert [r["strategy"] for r in history] == [f"s{total - 2}", f"s{total - 1}"]
+
+    history.flush()                          # لا شيء جديد
+    assert len(path.read_text().splitlines()) == total - 2
+
+
+def test_no_spill_without_a_path():
+    history = LearningHistory(capacity=1)
+    for i in range(SPILL_BATCH * 2):
+        history.record("approved")
+    history.flush()
+    assert history._spill == []
+
+
+def test_engine_history_spill_path(tmp_path):
+    path = tmp_path / "engine.jsonl"
+    engine = DecisionEngine(plugins=False, history_spill=str(path))
+    assert engine.history.spill_path == str(path)
+    assert DecisionEngine(plugins=False).history.spill_path is None
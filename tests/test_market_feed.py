@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from data.market_feed import KlineCache, MarketDataClient, Transport
+
+MINUTE = 60_000
+
+
+class StubExchange(Transport):
+    """
+    Binance /klines semantics: without startTime the last `limit` bars,
+    with startTime the first `limit` bars opened at or after it
+    """
+
+    def __init__(self, bars=60, t0=1_700_000_000_000):
+        self.t0 = t0
+        self.rows = []
+        self.calls = []
+        self.posts = []
+        self.add(bars)
+
+    def add(self, n):
+        for _ in range(n):
+            i = len(self.rows)
+            close = 100.0 + i
+            self.rows.append([self.t0 + i * MINUTE, close, close + 1, close - 1, close, 10.0 + i])
+
+    def update_last(self, close, volume):
+        self.rows[-1][4] = close
+        self.rows[-1][5] = volume
+
+    def get_json(self, url, params=None, timeout=10):
+        self.calls.append(dict(params))
+        limit = params["limit"]
+        if "startTime" in params:
+            rows = [r for r in self.rows if r[0] >= params["startTime"]][:limit]
+        else:
+            rows = self.rows[-limit:]
+        return [list(r) for r in rows]
+
+    def post_json(self, url, payload, headers=None, timeout=10):
+        self.posts.append((url, payload, headers))
+        return {"decision": "HOLD"}
+
+    def window(self, limit):
+        rows = self.rows[-limit:]
+        return [r[4] for r in rows], [r[5] for r in rows]
+
+
+@pytest.fixture
+def exchange():
+    return StubExchange()
+
+
+@pytest.fixture
+def client(exchange):
+    return MarketDataClient(transport=exchange)
+
+
+def test_incremental_fetch_uses_start_time(client, exchange):
+    assert client.fetch_klines("BTCUSDT", "1m", limit=50) == exchange.window(50)
+    assert "startTime" not in exchange.calls[-1]
+
+    exchange.add(3)
+    assert client.fetch_klines("BTCUSDT", "1m", limit=50) == exchange.window(50)
+    assert len(exchange.calls) == 2
+    assert exchange.calls[-1]["startTime"] == exchange.rows[-4][0]   # آخر شمعة مخزنة
+
+
+def test_still_forming_bar_is_replaced(client, exchange):
+    client.fetch_klines(limit=50)
+    exchange.update_last(close=123.45, volume=999.0)
+
+    prices, volumes = client.fetch_klines(limit=50)
+    assert len(prices) == 50
+    assert (prices[-1], volumes[-1]) == (123.45, 999.0)
+    assert (prices, volumes) == exchange.window(50)
+
+
+def test_gap_larger_than_window_reloads(client, exchange):
+    client.fetch_klines(limit=20)
+    exchange.add(25)
+
+    assert client.fetch_klines(limit=20) == exchange.window(20)
+    incremental, full = exchange.calls[-2:]
+    assert "startTime" in incremental and "startTime" not in full
+
+
+def test_larger_limit_reloads_and_keys_are_separate(client, exchange):
+    client.fetch_klines("BTCUSDT", limit=20)
+    assert client.fetch_klines("BTCUSDT", limit=40) == exchange.window(40)
+    assert "startTime" not in exchange.calls[-1]
+
+    client.fetch_klines("ETHUSDT", limit=20)
+    assert exchange.calls[-1]["symbol"] == "ETHUSDT" and "startTime" not in exchange.calls[-1]
+    client.fetch_klines("BTCUSDT", "5m", limit=20)
+    assert "startTime" not in exchange.calls[-1]
+
+
+def test_cache_merge_ignores_stale_rows():
+    cache = KlineCache(3)
+    cache.merge([[t, 0, 0, 0, float(t), 1.0] for t in (1, 2, 3, 4)])
+    cache.merge([[2, 0, 0, 0, -1.0, 1.0], [4, 0, 0, 0, 40.0, 2.0], [5, 0, 0, 0, 5.0, 1.0]])
+
+    assert list(cache.open_times) == [3, 4, 5]
+    assert cache.window(10) == ([3.0, 40.0, 5.0], [1.0, 2.0, 1.0])
+    assert cache.window(2) == ([40.0, 5.0], [2.0, 1.0])
+
+
+def test_async_api(client, exchange):
+    async def go():
+        return await asyncio.gather(
+            client.fetch_klines_async("BTCUSDT", limit=30),
+            client.request_decision_async([1.0], [2.0], "crypto"),
+        )
+
+    klines, decision = asyncio.run(go())
+    assert klines == exchange.window(30)
+    assert decision == {"decision": "HOLD"}
+    url, payload, _ = exchange.posts[-1]
+    assert url == client.decision_url and payload["context"] == {"market": "crypto"}
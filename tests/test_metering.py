@@ -0,0 +1,104 @@
+import multiprocessing as mp
+import os
+import tempfile
+import uuid
+
+import pytest
+
+from db.metering import SharedUsageMeter, UsageMeter
+
+PLANS = {
+    "tiny": {"limit": 10, "window": 100},      # 0.1 token/s
+    "flat": {"limit": 50, "window": 10 ** 9},   # لا تعبئة تُذكر أثناء الاختبار
+}
+
+
+class FakeClock:
+    def __init__(self, t=0.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def meter():
+    clock = FakeClock()
+    m = UsageMeter(PLANS, shards=4, clock=clock)
+    m.register("k", {"email": "m@test.local", "plan": "tiny"})
+    return m, clock
+
+
+def test_burst_up_to_capacity_then_denied(meter):
+    m, _ = meter
+    assert [m.consume("k")[1] for _ in range(12)] == [True] * 10 + [False] * 2
+    assert m.usage("k") == 12               # المرفوض يُحتسب أيضًا
+    assert m.remaining("k") == 0.0
+
+
+def test_refill_is_linear_and_capped(meter):
+    m, clock = meter
+    m.consume("k", 10)
+    clock.t = 25.0                           # 2.5 tokens
+    assert m.remaining("k") == pytest.approx(2.5)
+    assert m.consume("k", 2)[1]
+    assert not m.consume("k", 1)[1]          # 0.5 متبقٍ
+    assert m.remaining("k") == pytest.approx(0.5)
+
+    clock.t = 10_000.0
+    assert m.remaining("k") == 10.0
+
+
+def test_multi_unit_consume_is_all_or_nothing(meter):
+    m, _ = meter
+    assert m.consume("k", 7)[1]
+    assert not m.consume("k", 4)[1]
+    assert m.remaining("k") == pytest.approx(3.0)
+    assert m.consume("k", 3)[1]
+    assert m.usage("k") == 14
+
+
+def test_unknown_key(meter):
+    m, _ = meter
+    assert m.consume("nope") == (None, False)
+    assert (m.user("nope"), m.usage("nope"), m.remaining("nope")) == (None, 0, 0.0)
+    assert m.user("k")["plan"] == "tiny"
+
+
+# =========================
+# SHARED (multi-process)
+# =========================
+def _frozen_clock():
+    return 0.0
+
+
+def _worker(name, attempts, results):
+    m = SharedUsageMeter(PLANS, name=name, slots=64, shards=4, clock=_frozen_clock)
+    m.register("shared", {"email": "s@test.local", "plan": "flat"})
+    results.put(sum(m.consume("shared")[1] for _ in range(attempts)))
+    m.close()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX shared memory + fcntl locks")
+def test_shared_meter_enforces_one_limit_across_processes():
+    name = f"qnx-test-{uuid.uuid4().hex[:12]}"
+    ctx = mp.get_context("fork")
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_worker, args=(name, 30, results)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    allowed = [results.get(timeout=30) for _ in workers]
+    for w in workers:
+        w.join(timeout=30)
+        assert w.exitcode == 0
+
+    parent = SharedUsageMeter(PLANS, name=name, slots=64, shards=4, clock=_frozen_clock)
+    try:
+        parent.register("shared", {"email": "s@test.local", "plan": "flat"})
+        assert sum(allowed) == PLANS["flat"]["limit"]
+        assert not parent.consume("shared")[1]
+        assert parent.usage("shared") == 4 * 30 + 1
+    finally:
+        parent._shm.unlink()
+        parent.close()
+        os.unlink(os.path.join(tempfile.gettempdir(), f"qnexus-{name}.lock"))
@@ -0,0 +1,107 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from core.metrics import BUCKETS, METRICS, Registry, Stopwatch
+
+
+def parse(text):
+    """name{labels} → value (comment lines skipped)"""
+    out = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            key, value = line.rsplit(" ", 1)
+            out[key] = float(value)
+    return out
+
+
+def test_render_counters_and_histograms():
+    reg = Registry()
+    reg.counter("jobs_total", "Jobs by outcome", result="ok").inc(3)
+    reg.counter("jobs_total", "Jobs by outcome", result="error").inc()
+    reg.counter("plain_total", "No labels").inc(2)
+    hist = reg.histogram("work_seconds", "Work latency", stage="parse")
+    for value in (2e-6, 2e-6, 3e-4, 10.0):
+        hist.observe(value)
+
+    text = reg.render()
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    assert lines.count("# TYPE jobs_total counter") == 1
+    assert "# HELP work_seconds Work latency" in lines and "# TYPE work_seconds histogram" in lines
+
+    values = parse(text)
+    assert values['jobs_total{result="ok"}'] == 3 and values['jobs_total{result="error"}'] == 1
+    assert values["plain_total"] == 2
+
+    buckets = [values[f'work_seconds_bucket{{stage="parse",le="{b:g}"}}'] for b in BUCKETS]
+    assert buckets == sorted(buckets)                            # تراكمي
+    assert values['work_seconds_bucket{stage="parse",le="1e-06"}'] == 0
+    assert values['work_seconds_bucket{stage="parse",le="2.5e-06"}'] == 2
+    assert values['work_seconds_bucket{stage="parse",le="0.0005"}'] == 3
+    assert values['work_seconds_bucket{stage="parse",le="2.5"}'] == 3
+    assert values['work_seconds_bucket{stage="parse",le="+Inf"}'] == 4
+    assert values['work_seconds_count{stage="parse"}'] == 4
+    assert values['work_seconds_sum{stage="parse"}'] == pytest.approx(10.000304)
+
+
+def test_render_unlabelled_histogram_and_reset():
+    reg = Registry()
+    reg.histogram("lat_seconds", "Latency").observe(0.01)
+    values = parse(reg.render())
+    assert values['lat_seconds_bucket{le="0.01"}'] == 1
+    assert (values["lat_seconds_sum"], values["lat_seconds_count"]) == (0.01, 1)
+
+    reg.reset()
+    values = parse(reg.render())
+    assert (values['lat_seconds_bucket{le="+Inf"}'], values["lat_seconds_count"]) == (0, 0)
+    assert reg.summary() == ""
+
+
+def test_quantile_and_stopwatch():
+    reg = Registry()
+    hist = reg.histogram("q_seconds")
+    assert hist.quantile(0.5) == 0.0
+    for value in [1e-5] * 98 + [0.2, 5.0]:
+        hist.observe(value)
+    assert (hist.quantile(0.5), hist.quantile(0.99), hist.quantile(1.0)) == (1e-5, 0.25, float("inf"))
+
+    sw = Stopwatch()
+    sw.lap(hist)
+    sw.total(hist)
+    assert hist.count == 102
+
+
+@pytest.fixture
+def client():
+    client = TestClient(main.app)
+    key = client.post("/api/register", json={"email": "metrics@test.local", "plan": "enterprise"}).json()["api_key"]
+    client.headers["Authorization"] = key
+    return client
+
+
+def decide_counts(client):
+    r = client.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    values = parse(r.text)
+    return (
+        sum(v for k, v in values.items() if k.startswith("qnexus_decisions_total")),
+        values.get('qnexus_decide_seconds_count{stage="total"}', 0),
+    )
+
+
+@pytest.mark.skipif(not METRICS.enabled, reason="QNEXUS_METRICS=0")
+def test_metrics_endpoint_counts_decisions(client):
+    before = decide_counts(client)
+    body = {"prices": [200.0 + (i % 4) * 0.3 for i in range(25)], "volumes": [700.0] * 25}
+    assert client.post("/api/decide", json=body).status_code == 200
+    after = decide_counts(client)
+    assert after[0] == before[0] + 1 and after[1] == before[1] + 1
+
+
+def test_metrics_disabled_skips_instrumentation(client, monkeypatch):
+    monkeypatch.setattr(METRICS, "enabled", False)
+    before = decide_counts(client)
+    body = {"prices": [300.0 + (i % 6) * 0.2 for i in range(25)], "volumes": [800.0] * 25}
+    assert client.post("/api/decide", json=body).status_code == 200
+    assert decide_counts(client) == before      # /metrics يعمل، والعدادات لا تتحرك
@@ -0,0 +1,127 @@
+import importlib.metadata
+
+import numpy as np
+import pytest
+
+import core.engine as engine_module
+from core.engine import (
+    STRATEGY_ENTRY_POINT, DecisionEngine, MarketStateBatch, MarketStateEngine, Strategy, discover_strategies,
+)
+
+
+class SignalOnly(Strategy):
+    name = "plugin_signal"
+
+    def signal(self, s):
+        return float(np.tanh(5.0 * s.momentum))
+
+
+class BatchOnly(Strategy):
+    name = "plugin_batch"
+
+    def signal_batch(self, s):
+        return -np.tanh(4.0 * s.momentum) * s.volume_pressure
+
+
+class Shadow(Strategy):
+    name = "trend"
+
+    def signal(self, s):
+        return 1.0
+
+
+class FakeEntryPoint:
+    def __init__(self, name, target):
+        self.name = name
+        self.group = STRATEGY_ENTRY_POINT
+        self.target = target
+
+    def load(self):
+        if isinstance(self.target, Exception):
+            raise self.target
+        return self.target
+
+
+class FakeEntryPoints:
+    def __init__(self, groups):
+        self.groups = groups
+
+    def select(self, group):
+        return self.groups.get(group, [])
+
+
+@pytest.fixture
+def plugins(monkeypatch):
+    groups = {
+        STRATEGY_ENTRY_POINT: [
+            FakeEntryPoint("signal", SignalOnly),
+            FakeEntryPoint("broken", ImportError("no module named plugin_x")),
+            FakeEntryPoint("batch", BatchOnly),
+            FakeEntryPoint("shadow", Shadow),
+        ],
+        "other.group": [FakeEntryPoint("batch", BatchOnly)],
+    }
+    calls = []
+
+    def entry_points():
+        calls.append(1)
+        return FakeEntryPoints(groups)
+
+    monkeypatch.setattr(importlib.metadata, "entry_points", entry_points)
+    monkeypatch.setattr(engine_module, "_PLUGINS", {})
+    return calls
+
+
+def windows(n=8, length=40, seed=21):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n, length)), axis=1))
+    volumes = rng.integers(100, 1000, (n, length)).astype(float)
+    return prices, volumes
+
+
+def test_discovery_is_cached_per_group(plugins):
+    with pytest.warns(UserWarning, match="broken"):
+        names = [st.name for st in discover_strategies()]
+    assert names == ["plugin_signal", "plugin_batch", "trend"]
+    assert [st.name for st in discover_strategies("other.group")] == ["plugin_batch"]
+    assert discover_strategies("empty.group") == []
+
+    discover_strategies()
+    discover_strategies("other.group")
+    assert len(plugins) == 3                 # مرة واحدة لكل مجموعة
+    assert discover_strategies()[0] is not discover_strategies()[0]   # نسخ جديدة
+
+
+def test_signal_fallbacks():
+    prices, volumes = windows()
+    batch = MarketStateEngine.compute_batch(prices, volumes)
+    states = [batch.row(i) for i in range(len(batch))]
+
+    signal_only, batch_only = SignalOnly(), BatchOnly()
+    assert signal_only.signal_batch(batch).tolist() == [signal_only.signal(s) for s in states]
+    for s, expected in zip(states, batch_only.signal_batch(batch)):
+        assert batch_only.signal(s) == pytest.approx(expected, rel=1e-12, abs=1e-15)
+
+    with pytest.raises(NotImplementedError):
+        Strategy().signal(states[0])
+    with pytest.raises(NotImplementedError):
+        Strategy().signal_batch(MarketStateBatch.from_states(states))
+
+
+def test_engine_loads_plugins_and_skips_shadows(plugins):
+    with pytest.warns(UserWarning) as caught:
+        engine = DecisionEngine()
+    assert any("shadows" in str(w.message) for w in caught)
+
+    names = [st.name for st in engine.strategies]
+    assert names[-2:] == ["plugin_signal", "plugin_batch"] and names.count("trend") == 1
+    assert set(engine.weighter.stats) == set(names)
+
+    prices, volumes = windows()
+    for out, p, v in zip(engine.decide_batch(prices, volumes), prices, volumes):
+        single = engine.decide(p.tolist(), v.tolist())
+        assert out["decision"] == single["decision"]
+        for name in ("plugin_signal", "plugin_batch"):
+            assert out["explain"][name] == pytest.approx(single["explain"][name], rel=1e-9, abs=1e-12)
+
+    assert [st.name for st in DecisionEngine(plugins=False).strategies] == names[:-2]
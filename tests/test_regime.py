@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from core.engine import MarketStateEngine, label_regimes
+from core.regime import REGIMES, RegimeDetector, regime_names
+
+
+def baseline_detect(momentum, volatility, entropy):
+    """RegimeDetector.detect before the math/code-table rewrite (NumPy scalars)"""
+    m, v, e = abs(momentum), volatility, entropy
+    if v < 0.006 and m < 0.008:
+        return "DEAD", round(1.0 - (v + m), 3)
+    if v > 0.04 and e > 1.5:
+        return "VOLATILE", round(np.tanh(v + e / 2), 3)
+    if m > 0.03 and v < 0.03:
+        return "TRENDING", round(np.tanh(m * 4), 3)
+    return "RANGING", round(np.clip(1.0 - m * 10, 0.5, 0.9), 3)
+
+
+def near_ties():
+    """np.float64 inputs whose DEAD / RANGING confidence sits next to x.xxx5"""
+    rng = np.random.default_rng(0)
+    v = rng.uniform(0.0, 0.006, 4000)
+    k = rng.integers(0, 12, 4000)
+    jitter = rng.integers(-3, 4, 4000) * 2.0 ** -52
+    m_dead = (0.0005 + k / 1000.0) - v + jitter             # 1 - (v + m) ≈ tie
+    m_range = (rng.integers(10, 50, 4000) + 0.5) / 1e4 + jitter
+    m = np.concatenate((m_dead[(m_dead > 0) & (m_dead < 0.008)], m_range, -m_range))
+    v = np.concatenate((v[(m_dead > 0) & (m_dead < 0.008)], np.full(8000, 0.02)))
+    return m, v, np.full(len(m), 1.0)
+
+
+def random_inputs(n=3000, seed=1):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 0.04, n), rng.uniform(0, 0.06, n), rng.uniform(0, 3, n)
+
+
+@pytest.mark.parametrize("inputs", [near_ties(), random_inputs()], ids=["near-ties", "random"])
+def test_detect_matches_baseline_bit_for_bit(inputs):
+    for m, v, e in zip(*inputs):      # np.float64, as from MarketStateEngine.compute
+        r = RegimeDetector.detect(m, v, e)
+        assert (r.name, r.confidence) == baseline_detect(m, v, e)
+
+
+@pytest.mark.parametrize("inputs", [near_ties(), random_inputs()], ids=["near-ties", "random"])
+def test_detect_batch_matches_detect(inputs):
+    m, v, e = inputs
+    codes, conf = RegimeDetector.detect_batch(m, v, e)
+    names = regime_names(codes).tolist()
+    for i in range(len(m)):
+        r = RegimeDetector.detect(m[i], v[i], e[i])
+        assert (names[i], conf[i]) == (r.name, r.confidence)
+
+
+def test_regime_codes_table():
+    codes, _ = RegimeDetector.detect_batch(*random_inputs())
+    assert codes.dtype == np.int8
+    assert set(regime_names(np.arange(len(REGIMES))).tolist()) == set(REGIMES)
+
+
+def test_label_regimes_matches_detect():
+    rng = np.random.default_rng(11)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 300)))
+    volumes = rng.integers(100, 1000, 300).astype(float)
+
+    codes, conf = label_regimes(prices, volumes, window=50, chunk=64)
+    names = regime_names(codes).tolist()
+    for j, end in enumerate(range(50, 301)):
+        s = MarketStateEngine.compute(prices[end - 50:end], volumes[end - 50:end])
+        r = RegimeDetector.detect(s.momentum, s.volatility, s.entropy)
+        assert (names[j], conf[j]) == (r.name, r.confidence)
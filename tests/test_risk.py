@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from core.clock import ReplayClock
+from core.risk_control import (
+    TRIP_DRAWDOWN, TRIP_LOSSES, TRIP_NONE, TRIP_VOLATILITY,
+    KillSwitch, RiskBook, RiskLimits,
+)
+
+
+def random_limits(rng, n):
+    return [
+        RiskLimits(
+            max_drawdown=float(rng.uniform(-0.2, -0.01)),
+            max_consecutive_losses=int(rng.integers(1, 6)),
+            max_volatility=float(rng.uniform(0.02, 0.08)),
+        )
+        for _ in range(n)
+    ]
+
+
+def assert_book_matches(book, switches):
+    for i, ks in enumerate(switches):
+        state = book.state(i)
+        assert state["equity"] == ks.equity, i
+        assert state["peak_equity"] == ks.peak_equity, i
+        assert state["consecutive_losses"] == ks.consecutive_losses, i
+        assert state["active"] == ks.active, i
+        assert state["tripped_at"] == ks.tripped_at, i
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_risk_book_matches_kill_switches(seed):
+    rng = np.random.default_rng(seed)
+    n, steps = 64, 120
+    clock = ReplayClock(1_700_000_000.0)
+    limits = random_limits(rng, n)
+    switches = [KillSwitch(l, clock=clock) for l in limits]
+    book = RiskBook(clock)
+    book.add(n, limits)
+
+    # PnL موزّع بحيث تتوقف بعض المحافظ لكل سبب وتبقى أخرى نشطة
+    pnl = rng.normal(0.001, 0.01, (steps, n))
+    pnl[rng.random((steps, n)) < 0.05] = 0.0
+    vol = rng.gamma(2.0, 0.008, (steps, n))
+
+    for t in range(steps):
+        clock.advance_to(clock.time() + 60)
+        for i, ks in enumerate(switches):
+            ks.update(float(pnl[t, i]), float(vol[t, i]))
+        mask = book.update(pnl[t], vol[t])
+        assert mask.tolist() == [ks.can_trade() for ks in switches]
+
+    assert_book_matches(book, switches)
+    assert set(book.reason[~book.active].tolist()) <= {TRIP_DRAWDOWN, TRIP_LOSSES, TRIP_VOLATILITY}
+    assert (book.reason[book.active] == TRIP_NONE).all()
+
+
+def test_trip_reasons():
+    clock = ReplayClock(0.0)
+    book = RiskBook(clock)
+    book.add(4, RiskLimits(max_drawdown=-0.05, max_consecutive_losses=2, max_volatility=0.05))
+
+    book.update([0.1, -0.01, 0.0, 0.0], [0.0, 0.0, 0.06, 0.0])
+    clock.advance_to(5.0)
+    book.update([-0.2, -0.01, 0.0, 0.0], 0.0)
+
+    assert book.can_trade().tolist() == [False, False, False, True]
+    assert book.reason.tolist() == [TRIP_DRAWDOWN, TRIP_LOSSES, TRIP_VOLATILITY, TRIP_NONE]
+    assert book.tripped_at[:3].tolist() == [5.0, 5.0, 0.0]
+
+    book.update(-1.0, 1.0)                   # المتوقفة لا تتغير
+    assert book.state(0)["equity"] == pytest.approx(-0.1)
+    assert book.reason.tolist() == [TRIP_DRAWDOWN, TRIP_LOSSES, TRIP_VOLATILITY, TRIP_DRAWDOWN]
+
+    book.reset(slice(0, 3))
+    assert book.can_trade().tolist() == [True, True, True, False]
+    assert (book.reason[:3] == TRIP_NONE).all() and np.isnan(book.tripped_at[:3]).all()
+
+
+def test_from_switches_resumes_their_state():
+    clock = ReplayClock(0.0)
+    rng = np.random.default_rng(7)
+    limits = random_limits(rng, 16)
+    switches = [KillSwitch(l, clock=clock) for l in limits]
+    for _ in range(20):
+        for ks in switches:
+            ks.update(float(rng.normal(0, 0.01)), float(rng.gamma(2.0, 0.01)))
+
+    book = RiskBook.from_switches(switches)
+    assert_book_matches(book, switches)
+    for _ in range(20):
+        clock.advance_to(clock.time() + 1)
+        pnl, vol = rng.normal(0, 0.01, 16), rng.gamma(2.0, 0.01, 16)
+        for i, ks in enumerate(switches):
+            ks.update(float(pnl[i]), float(vol[i]))
+        book.update(pnl, vol)
+    assert_book_matches(book, switches)
+
+
+def test_limits_must_match_count():
+    with pytest.raises(ValueError):
+        RiskBook().add(3, [RiskLimits()] * 2)
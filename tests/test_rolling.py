@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from core.engine import MarketStateEngine, RollingMarketState
+
+STATE_FIELDS = ("momentum", "volatility", "entropy", "volume_pressure", "trend_strength")
+
+
+def series(length=400, seed=11, sigma=0.01):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, sigma, length)))
+    volumes = rng.integers(100, 1000, length).astype(float)
+    return prices.tolist(), volumes.tolist()
+
+
+@pytest.mark.parametrize("window", [10, 50])
+def test_rolling_state_matches_compute(window):
+    prices, volumes = series()
+    rolling = RollingMarketState(window)
+    for i, (p, v) in enumerate(zip(prices, volumes)):
+        state = rolling.push(p, v)
+        if i < 9:
+            assert state is None
+            continue
+        lo = max(0, i + 1 - window)
+        exact = MarketStateEngine.compute(prices[lo:i + 1], volumes[lo:i + 1])
+        for f in STATE_FIELDS:
+            assert getattr(state, f) == pytest.approx(getattr(exact, f), rel=1e-6, abs=1e-6), (i, f)
+
+
+def test_rolling_rejects_short_window():
+    with pytest.raises(ValueError):
+        RollingMarketState(9)
+    with pytest.raises(ValueError):
+        RollingMarketState(20).state()
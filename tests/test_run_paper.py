@@ -0,0 +1,116 @@
+import asyncio
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# run_paper يثبّت معالجات SIGINT/SIGTERM عند الاستيراد → نعيد معالجات pytest
+_HANDLERS = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+import run_paper  # noqa: E402
+for _sig, _handler in _HANDLERS.items():
+    signal.signal(_sig, _handler)
+
+from core.clock import WALL_CLOCK, ReplayClock
+from core.engine import DecisionEngine
+from core.paper_trader import PaperTrader
+from data.archive import ReplayExhausted
+
+START = 1_700_000_000.0
+PRICES = [100.0 + (i % 5) * 0.2 for i in range(30)]
+VOLUMES = [1_000.0] * 30
+
+
+class ScriptedFeed:
+    """
+    Per-symbol script: "ok" → 30 bars, "short" → 5 bars,
+    "fail" → RuntimeError; the replay ends after the script
+    """
+
+    def __init__(self, clock, scripts):
+        self.clock = clock
+        self.scripts = {symbol: list(script) for symbol, script in scripts.items()}
+        self.calls = {symbol: [] for symbol in scripts}
+
+    async def fetch_klines_async(self, symbol, interval="1m", limit=50):
+        self.calls[symbol].append(self.clock.time())
+        script = self.scripts[symbol]
+        if not script:
+            raise ReplayExhausted(symbol)
+        action = script.pop(0)
+        if action == "fail":
+            raise RuntimeError("feed down")
+        if action == "short":
+            return PRICES[:5], VOLUMES[:5]
+        return PRICES, VOLUMES
+
+
+def trader(symbol, clock):
+    return PaperTrader(DecisionEngine(plugins=False, clock=clock), symbol, trade_log=lambda **_: None)
+
+
+@pytest.fixture(autouse=True)
+def runtime(monkeypatch):
+    monkeypatch.setattr(run_paper, "RUNNING", True)
+    monkeypatch.setattr(run_paper, "STOP", None)
+    monkeypatch.setattr(run_paper, "_LOOP", None)
+    monkeypatch.setattr(run_paper, "SNAPSHOT_DIR", None)
+
+
+def run_symbols(feed, clock, symbols):
+    async def main():
+        run_paper.STOP = asyncio.Event()
+        run_paper._LOOP = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(4)
+        traders = [trader(symbol, clock) for symbol in symbols]
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            await asyncio.gather(*(
+                clock.participate(run_paper.run_symbol(t, feed, slots, executor, clock)) for t in traders
+            ))
+        return traders
+
+    return asyncio.run(main())
+
+
+def test_retries_stop_the_symbol_after_max_retries():
+    clock = ReplayClock(START)
+    feed = ScriptedFeed(clock, {"A": ["fail", "fail", "ok", "fail", "short", "fail", "fail", "ok"]})
+    run_symbols(feed, clock, ["A"])
+
+    # ok يصفّر العداد؛ short (بيانات ناقصة) لا يصفّره ولا يُحتسب خطأ
+    assert len(feed.calls["A"]) == 7 == 3 + run_paper.MAX_RETRIES + 1
+    assert feed.scripts["A"] == ["ok"]
+
+
+def test_each_symbol_keeps_its_own_deadline():
+    clock = ReplayClock(START)
+    feed = ScriptedFeed(clock, {"A": ["fail"] * run_paper.MAX_RETRIES, "B": ["ok"] * 6})
+    run_symbols(feed, clock, ["A", "B"])
+
+    step = run_paper.LOOP_SECONDS
+    assert feed.calls["A"] == [START + i * step for i in range(run_paper.MAX_RETRIES)]
+    assert feed.calls["B"] == [START + i * step for i in range(7)]   # 6 ticks + نهاية الإعادة
+    assert clock.time() == START + 6 * step
+
+
+def test_shutdown_wakes_sleeping_symbols_promptly():
+    feed = ScriptedFeed(WALL_CLOCK, {"A": ["ok"] * 5, "B": ["ok"] * 5})
+
+    async def main():
+        run_paper.STOP = asyncio.Event()
+        run_paper._LOOP = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(4)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            tasks = [
+                asyncio.create_task(run_paper.run_symbol(trader(s, WALL_CLOCK), feed, slots, executor))
+                for s in ("A", "B")
+            ]
+            await asyncio.sleep(0.2)                 # كلاهما نفّذ شمعة ونام 60 ثانية
+            started = time.monotonic()
+            run_paper.shutdown_handler(None, None)
+            await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+            return time.monotonic() - started
+
+    assert asyncio.run(main()) < 1.0
+    assert not run_paper.RUNNING
+    assert [len(c) for c in feed.calls.values()] == [1, 1]
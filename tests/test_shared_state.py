@@ -0,0 +1,100 @@
+import multiprocessing as mp
+import os
+import tempfile
+import uuid
+from multiprocessing import shared_memory
+
+import pytest
+
+from core.engine import BUILTIN_STRATEGIES, BanditWeighter
+from core.shared_state import SharedBanditWeighter
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="POSIX shared memory + fcntl locks")
+
+
+def strategies():
+    return [cls() for cls in BUILTIN_STRATEGIES]
+
+
+@pytest.fixture
+def name():
+    name = f"qnx-bandit-{uuid.uuid4().hex[:12]}"
+    yield name
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+        segment.unlink()
+        segment.close()
+    except FileNotFoundError:
+        pass
+    lock = os.path.join(tempfile.gettempdir(), f"qnexus-{name}.lock")
+    if os.path.exists(lock):
+        os.unlink(lock)
+
+
+def _writer(name, updates, ready, go):
+    weighter = SharedBanditWeighter(strategies(), name=name)
+    names = weighter.names
+    ready.set()
+    go.wait(30)
+    for i in range(updates):
+        weighter.update(names[i % len(names)], 0.01 * ((i % 7) - 3))
+    weighter.close()
+
+
+def run_writer(name, updates):
+    ctx = mp.get_context("fork")
+    ready, go = ctx.Event(), ctx.Event()
+    proc = ctx.Process(target=_writer, args=(name, updates, ready, go))
+    proc.start()
+    assert ready.wait(30)
+    return proc, go
+
+
+def test_updates_are_visible_across_processes(name):
+    reader = SharedBanditWeighter(strategies(), name=name)
+    local = BanditWeighter(strategies())
+    assert reader.version == 0
+
+    proc, go = run_writer(name, 400)
+    go.set()
+    proc.join(30)
+    assert proc.exitcode == 0
+
+    names = list(local.stats)
+    for i in range(400):
+        local.update(names[i % len(names)], 0.01 * ((i % 7) - 3))
+
+    stats, t = reader.snapshot()
+    assert t == local.t == 400 and reader.version == 800
+    for n, st in local.stats.items():
+        assert (stats[n].plays, stats[n].ewma_return) == (st.plays, pytest.approx(st.ewma_return, abs=1e-15))
+    assert reader.normalized_weights() == pytest.approx(local.normalized_weights())
+    reader.close()
+
+
+def test_reads_are_never_torn(name):
+    reader = SharedBanditWeighter(strategies(), name=name)
+    proc, go = run_writer(name, 20_000)
+    go.set()
+
+    reads, last_version = 0, 0
+    while proc.is_alive() or reads == 0:
+        version = reader.version
+        stats, t = reader.snapshot()
+        # كل update يزيد t و plays لاستراتيجية واحدة معًا
+        assert sum(st.plays for st in stats.values()) == t
+        assert version % 2 == 0 and version >= last_version
+        last_version = version
+        reads += 1
+
+    proc.join(30)
+    assert proc.exitcode == 0
+    assert reader.t == 20_000 and reader.version == 40_000
+    reader.close()
+
+
+def test_strategy_set_must_match(name):
+    first = SharedBanditWeighter(strategies(), name=name)
+    with pytest.raises(ValueError):
+        SharedBanditWeighter(strategies()[:2], name=name)
+    first.close()
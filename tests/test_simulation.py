@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from core.risk_control import RiskLimits
+from core.simulation import (
+    InactiveSimulationError,
+    check_activity,
+    distribution,
+    monte_carlo,
+    walk_forward,
+)
+
+
+def trending_series(n=3000, seed=7):
+    rng = np.random.default_rng(seed)
+    drift = np.repeat(rng.choice([-0.0015, 0.0, 0.0015], n // 200 + 1), 200)[:n]
+    prices = 100 * np.exp(np.cumsum(drift + rng.normal(0, 0.004, n)))
+    return prices, rng.integers(100, 1000, n).astype(float)
+
+
+def test_walk_forward_trades_and_learns():
+    prices, volumes = trending_series()
+    result = walk_forward(prices, volumes)
+
+    assert result["killed_at"] is None
+    assert result["bars"] == len(prices) - 1000
+    assert result["trades"] > 0
+    assert set(result["priors"]) == set(result["weights"])
+    assert sum(result["weights"].values()) == pytest.approx(1.0, abs=1e-6)
+
+
+def test_default_limits_do_not_kill_on_calm_market():
+    # risk=HIGH (entropy) is not a volatility spike
+    prices, volumes = trending_series()
+    result = walk_forward(prices, volumes, limits=None)
+    assert result["killed_at"] is None or result["killed_at"] > 1000 + 60
+
+
+def test_check_activity_rejects_idle_or_killed_paths():
+    ok = {"trades": 3, "killed_at": None}
+    check_activity([ok, {"trades": 1, "killed_at": 120}])
+
+    with pytest.raises(InactiveSimulationError):
+        check_activity([ok, {"trades": 0, "killed_at": None}])
+    with pytest.raises(InactiveSimulationError):
+        check_activity([{"trades": 2, "killed_at": 70}, {"trades": 1, "killed_at": 90}])
+
+
+def test_monte_carlo_paths_trade_and_are_reproducible():
+    prices, volumes = trending_series(2000)
+    a = monte_carlo(prices, volumes, paths=3, method="block", block=200, seed=1, workers=1)
+    b = monte_carlo(prices, volumes, paths=3, method="block", block=200, seed=1, workers=2)
+
+    assert [r["trades"] for r in a["runs"]] == [r["trades"] for r in b["runs"]]
+    assert all(r["trades"] > 0 for r in a["runs"])
+    assert a["distribution"]["idle_rate"] == 0.0
+    assert a["distribution"]["killed_rate"] < 1.0
+
+
+def test_cold_strict_run_fails_loudly():
+    # bandit بلا warm-up → HOLD دائمًا → المحاكاة يجب أن تفشل لا أن تُرجع أصفارًا
+    prices, volumes = trending_series(600)
+    with pytest.raises(InactiveSimulationError):
+        monte_carlo(prices, volumes, paths=2, method="block", seed=0, workers=1, warmup=0)
+
+
+def test_distribution_keys():
+    runs = [
+        {"net_profit": 1.0, "max_drawdown": 0.0, "sharpe_ratio": 0.1, "trades": 2,
+         "win_rate": 0.5, "killed_at": None, "weights": {"a": 1.0}},
+        {"net_profit": -1.0, "max_drawdown": 1.0, "sharpe_ratio": -0.1, "trades": 0,
+         "win_rate": 0.0, "killed_at": 80, "weights": {"a": 1.0}},
+    ]
+    out = distribution(runs)
+    assert out["prob_loss"] == 0.5
+    assert out["killed_rate"] == 0.5
+    assert out["idle_rate"] == 0.5
+
+
+def test_limits_are_applied():
+    prices, volumes = trending_series(1500)
+    tight = RiskLimits(max_drawdown=-0.05, max_consecutive_losses=3, max_volatility=1e-6)
+    result = walk_forward(prices, volumes, limits=tight)
+    assert result["killed_at"] == 1000
+    assert result["learning"] == {"KILLED": 1}
+
+
+def test_kill_switch_volatility_is_injectable():
+    from core.engine import DecisionEngine
+    from core.paper_trader import PaperTrader
+
+    prices = [100.0 + i * 0.1 for i in range(30)]
+    volumes = [1_000.0] * 30
+    payload = {"decision": "HOLD", "confidence": 0.5, "explain": {}, "regime": "TREND", "risk": "HIGH"}
+
+    # الافتراضي الحي كما كان: risk == "HIGH" يوقف التداول
+    live = PaperTrader(DecisionEngine(plugins=False), "LIVE", trade_log=lambda **_: None)
+    live.step(prices, volumes, decision_payload=payload)
+    assert not live.kill_switch.can_trade()
+
+    seen = []
+    sim = PaperTrader(
+        DecisionEngine(plugins=False), "SIM", trade_log=lambda **_: None,
+        volatility_of=lambda window, decision: seen.append((len(window), decision["risk"])) or 0.0
+    )
+    sim.step(prices, volumes, decision_payload=payload)
+    assert sim.kill_switch.can_trade() and seen == [(30, "HIGH")]
@@ -0,0 +1,134 @@
+import json
+import zlib
+
+import pytest
+
+import main
+from core import snapshot
+from core.engine import DecisionEngine
+from core.paper_trader import PaperTrader
+from core.snapshot import SnapshotError, dumps, load_snapshot, loads, save_snapshot
+
+
+def trained():
+    engine = DecisionEngine()
+    names = list(engine.weighter.stats)
+    for i in range(30):
+        engine.weighter.update(names[i % len(names)], 0.01 * (i % 3 - 1))
+    engine.history.record("approved", strategy=names[0], pnl=0.02, improvement=0.1)
+    engine.history.record("rejected", reason="Insufficient improvement")
+
+    trader = PaperTrader(engine, "BTC", trade_log=lambda **_: None)
+    trader.rebalance(2.5, 100.0)
+    trader.decisions_buffer = ["BUY", "HOLD", "SELL"]
+    for price, decision in zip((100.0, 101.0, 99.0), trader.decisions_buffer):
+        engine.gate.feed(trader.gate_state, price, decision)
+        trader.gate_prices.append(price)
+    trader.kill_switch.update(pnl=-0.01, volatility=0.0)
+    return engine, trader
+
+
+def fresh():
+    engine = DecisionEngine()
+    return engine, PaperTrader(engine, "BTC", trade_log=lambda **_: None)
+
+
+def reframe(blob, **replace):
+    """Same snapshot with some section payloads replaced (valid CRC)"""
+    sections = dict(snapshot._sections(blob))
+    sections.update({getattr(snapshot, f"TAG_{k.upper()}"): v for k, v in replace.items()})
+    body = b"".join(snapshot._SECTION.pack(tag, len(p)) + bytes(p) for tag, p in sections.items())
+    header = snapshot._HEADER.pack(snapshot.MAGIC, snapshot.VERSION, len(body))
+    return header + body + snapshot._CRC.pack(zlib.crc32(body))
+
+
+def test_round_trip():
+    engine, trader = trained()
+    engine2, trader2 = fresh()
+
+    applied = loads(dumps(engine, trader), engine2, trader2)
+
+    assert applied == {"bandit": True, "history": True, "trader": True}
+    assert engine2.weighter.snapshot()[1] == engine.weighter.t
+    assert engine2.weighter.normalized_weights() == engine.weighter.normalized_weights()
+    assert list(engine2.history) == list(engine.history)
+    assert (trader2.position, trader2.entry_price, trader2.quantity) == ("LONG", 100.0, 2.5)
+    assert trader2.decisions_buffer == trader.decisions_buffer
+    assert trader2.gate_state == trader.gate_state
+    assert trader2.gate_prices == trader.gate_prices
+    ks, ks2 = trader.kill_switch, trader2.kill_switch
+    assert (ks2.equity, ks2.consecutive_losses, ks2.active) == (ks.equity, ks.consecutive_losses, ks.active)
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda b: b[:-1],
+    lambda b: b"XXXX" + b[4:],
+    lambda b: b[:20] + bytes([b[20] ^ 0xFF]) + b[21:],
+])
+def test_damaged_blob_is_rejected(mutate):
+    engine, trader = trained()
+    with pytest.raises(SnapshotError):
+        loads(mutate(dumps(engine, trader)), *fresh())
+
+
+def test_corrupt_section_changes_nothing():
+    engine, trader = trained()
+    bad_history = zlib.compress(json.dumps({"records": [[1, 2]], "total": 1}).encode())
+    blob = reframe(dumps(engine, trader), history=bad_history)
+
+    engine2, trader2 = fresh()
+    weights = engine2.weighter.normalized_weights()
+    with pytest.raises(SnapshotError):
+        loads(blob, engine2, trader2)
+
+    assert trader2.position is None and trader2.decisions_buffer == []
+    assert engine2.weighter.t == 0 and engine2.weighter.normalized_weights() == weights
+
+
+def test_snapshot_for_another_symbol_is_rejected():
+    engine, trader = trained()
+    other = PaperTrader(DecisionEngine(), "ETH", trade_log=lambda **_: None)
+    with pytest.raises(SnapshotError):
+        loads(dumps(engine, trader), other.engine, other)
+
+
+def test_build_engine_cold_starts_on_unreadable_snapshot(tmp_path, monkeypatch):
+    path = tmp_path / "engine.qnxs"
+    path.write_bytes(b"garbage")
+    monkeypatch.setattr(main, "SNAPSHOT_PATH", str(path))
+    assert main.build_engine().weighter.t == 0
+
+    engine, _ = trained()
+    save_snapshot(str(path), engine)
+    assert main.build_engine().weighter.t == engine.weighter.t
+
+
+def test_save_snapshot_leaves_no_temp_files(tmp_path):
+    engine, trader = trained()
+    path = tmp_path / "state" / "BTC.qnxs"
+    for _ in range(2):
+        size = save_snapshot(str(path), engine, trader)
+    assert path.stat().st_size == size
+    assert [p.name for p in path.parent.iterdir()] == ["BTC.qnxs"]
+
+    other_engine, other = fresh()
+    assert load_snapshot(str(path), other_engine, other) is not None
+    assert other_engine.weighter.t == engine.weighter.t
+
+
+def test_failed_save_keeps_the_old_snapshot(tmp_path, monkeypatch):
+    engine, trader = trained()
+    path = tmp_path / "BTC.qnxs"
+    save_snapshot(str(path), engine, trader)
+    before = path.read_bytes()
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    engine.weighter.update(next(iter(engine.weighter.stats)), 0.05)
+    monkeypatch.setattr(snapshot.os, "replace", fail)
+    with pytest.raises(OSError):
+        save_snapshot(str(path), engine, trader)
+
+    assert path.read_bytes() == before
+    assert [p.name for p in tmp_path.iterdir()] == ["BTC.qnxs"]
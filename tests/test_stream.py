@@ -0,0 +1,94 @@
+import struct
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import main
+from core.engine import DecisionEngine, MarketStateEngine
+from core.stream import MAX_STREAM_WINDOW, SessionRegistry, StreamSession
+
+
+def bars(n, start=100.0, step=0.5):
+    return [start + i * step for i in range(n)], [1_000.0 + (i % 7) * 10 for i in range(n)]
+
+
+@pytest.fixture(scope="module")
+def api_key():
+    client = TestClient(main.app)
+    return client.post("/api/register", json={"email": "stream@test.local", "plan": "pro"}).json()["api_key"]
+
+
+def test_session_pushes_only_decision_changes():
+    engine = DecisionEngine()
+    session = StreamSession("BTC", window=20)
+    prices, volumes = bars(40)
+
+    assert session.push(engine, prices[:9], volumes[:9]) is None       # < 10 bars
+    first = session.push(engine, prices[9:20], volumes[9:20])
+    assert first is not None and session.bars == 20
+    expected = engine.decide(prices[:20], volumes[:20])
+    assert first["decision"] == expected["decision"]
+    assert session.push(engine, prices[20:21], volumes[20:21]) is None  # same decision
+
+
+def test_registry_resumes_and_evicts_lru():
+    registry = SessionRegistry(max_sessions=2)
+    a = registry.open("k", "A")
+    registry.open("k", "B")
+    assert registry.open("k", "A") is a
+    registry.open("k", "C")                 # B is least recently used
+    assert len(registry) == 2 and registry.evictions == 1
+    assert registry.open("k", "A") is a
+
+    assert registry.evict_idle(now=a.touched + registry.idle_seconds + 1) == 2
+
+
+def test_websocket_stream(api_key):
+    client = TestClient(main.app)
+    prices, volumes = bars(12)
+    with client.websocket_connect(f"/api/stream?symbol=ETH&window=20&api_key={api_key}") as ws:
+        ws.send_text("not a bar")
+        assert "error" in ws.receive_json()
+
+        # 9 JSON bars, then 3 binary (price, volume) pairs → first decision at bar 10+
+        ws.send_text(str([[p, v] for p, v in zip(prices[:9], volumes[:9])]))
+        ws.send_bytes(struct.pack("<6d", *[x for pair in zip(prices[9:], volumes[9:]) for x in pair]))
+        out = ws.receive_json()
+
+    assert (out["symbol"], out["bar"]) == ("ETH", 12)
+    state = MarketStateEngine.compute(prices, volumes)
+    assert out["decision"] == main.ENGINES.get().decide_state(state)["decision"]
+
+
+def test_websocket_rejects_unknown_key():
+    client = TestClient(main.app)
+    with pytest.raises(WebSocketDisconnect) as e:
+        with client.websocket_connect("/api/stream?symbol=ETH&api_key=nope") as ws:
+            ws.receive_json()
+    assert e.value.code == 1008
+
+
+def test_websocket_reconnect_resumes_window(api_key):
+    client = TestClient(main.app)
+    prices, volumes = bars(13, step=-0.25)
+    url = f"/api/stream?symbol=SOL&window=20&api_key={api_key}"
+
+    with client.websocket_connect(url) as ws:
+        ws.send_text(str([[p, v] for p, v in zip(prices[:12], volumes[:12])]))
+        assert ws.receive_json()["bar"] == 12
+
+    with client.websocket_connect(url) as ws:
+        ws.send_bytes(struct.pack("<2d", prices[12], volumes[12]))
+
+    session = main.STREAMS.open(api_key, "SOL", 20)
+    assert session.bars == 13
+    assert list(session.rolling.prices) == prices
+
+
+@pytest.mark.parametrize("window", [9, MAX_STREAM_WINDOW + 1])
+def test_websocket_rejects_window_out_of_range(api_key, window):
+    client = TestClient(main.app)
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/api/stream?symbol=ETH&window={window}&api_key={api_key}") as ws:
+            ws.receive_json()
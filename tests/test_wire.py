@@ -0,0 +1,73 @@
+import struct
+
+import msgpack
+import numpy as np
+import pytest
+
+from core.cache import decision_key, pack_series
+from models.wire import (
+    MSGPACK,
+    RAW_F64,
+    WireFormatError,
+    decode_bars,
+    decode_series,
+    series_length,
+    split_series,
+)
+
+PRICES = [100.0 + i * 0.25 for i in range(12)]
+VOLUMES = [1_000.0 + i for i in range(12)]
+
+
+def test_pack_series_is_little_endian_f64():
+    assert pack_series(PRICES) == struct.pack("<12d", *PRICES)
+    assert pack_series(PRICES) == np.asarray(PRICES, dtype="<f8").tobytes()
+
+
+def test_raw_body_round_trip_and_shared_cache_key():
+    body = pack_series(PRICES) + pack_series(VOLUMES)
+    prices, volumes = split_series(body, RAW_F64)
+
+    assert series_length(prices) == series_length(volumes) == 12
+    assert bytes(prices) == pack_series(PRICES)
+    assert decision_key(prices, volumes, 3) == decision_key(pack_series(PRICES), pack_series(VOLUMES), 3)
+
+    p, v = decode_series(body, RAW_F64)
+    assert p.tolist() == PRICES and v.tolist() == VOLUMES
+
+
+def test_msgpack_body_round_trip():
+    body = msgpack.packb({"prices": pack_series(PRICES), "volumes": pack_series(VOLUMES)}, use_bin_type=True)
+    p, v = decode_series(body, f"{MSGPACK}; charset=binary")
+    assert p.tolist() == PRICES and v.tolist() == VOLUMES
+
+
+@pytest.mark.parametrize("body, kind", [
+    (b"\x00" * 24, RAW_F64),
+    (msgpack.packb({"prices": b"\x00" * 7, "volumes": b""}), MSGPACK),
+    (msgpack.packb([1, 2]), MSGPACK),
+    (b"", "text/plain"),
+])
+def test_split_series_rejects_bad_bodies(body, kind):
+    with pytest.raises(WireFormatError):
+        split_series(body, kind)
+
+
+def test_decode_bars_binary_and_json():
+    pairs = struct.pack("<4d", 10.0, 1.0, 11.0, 2.0)
+    assert decode_bars(pairs) == ([10.0, 11.0], [1.0, 2.0])
+    assert decode_bars("[10, 1]") == ([10.0], [1.0])
+    assert decode_bars("[[10, 1], [11, 2]]") == ([10.0, 11.0], [1.0, 2.0])
+    assert decode_bars('{"prices": [10], "volumes": [1]}') == ([10.0], [1.0])
+
+
+@pytest.mark.parametrize("message", [b"\x00" * 8, "[]", '{"prices": [1]}', "[NaN, 1]", "nope"])
+def test_decode_bars_rejects_bad_messages(message):
+    with pytest.raises(WireFormatError):
+        decode_bars(message)
+
+
+def test_as_series_rejects_non_finite():
+    body = pack_series(PRICES[:-1] + [float("nan")]) + pack_series(VOLUMES)
+    with pytest.raises(WireFormatError):
+        decode_series(body, RAW_F64)